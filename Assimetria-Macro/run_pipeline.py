@@ -3,29 +3,332 @@ Script Orquestrador: Pipeline Completo de Análise
 Framework: Preparação Assimétrica e Crises Sistêmicas
 Autor: Gabriel W. Soares
 
-Executa toda a pipeline analítica em sequência:
+Executa toda a pipeline analítica:
 1. Download de dados públicos
 2. Processamento e construção de índices
 3. Análise lead-lag e causalidade de Granger
 4. Análise de sincronização e event studies
 
+Cada script declara em TASKS as funções que o compõem e os artefatos que
+elas leem e escrevem. O orquestrador monta um grafo de dependências e
+executa tarefas independentes em paralelo (ex.: lead-lag e sincronização).
+
 Uso:
-    python run_pipeline.py [--skip-download] [--verbose]
+    python run_pipeline.py [--skip-download] [--verbose] [--jobs N] [--force]
+                           [--in-process] [--format {csv,npz,parquet}] [--update]
+
+Tarefas cujas entradas, parâmetros e código não mudaram desde a última
+execução são puladas (ver output/build_manifest.json); --force refaz tudo.
+
+Com --in-process as tarefas rodam como funções neste interpretador e trocam
+DataFrames por um armazenamento em memória (scripts/artifacts.py); os CSVs
+são gravados em segundo plano, ou não são gravados com SAVE_INTERMEDIATE=False.
+
+Com --update apenas os dados novos são baixados e os índices diários são
+estendidos pelas linhas novas (scripts/streaming.py), sem reprocessar o
+histórico nem refazer as análises.
 """
 
-import subprocess
+import ast
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
 import sys
 import os
 import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from datetime import datetime
 import argparse
 
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts')
+# Módulos auxiliares (config, artifacts, ...) ficam junto aos scripts
+sys.path.insert(0, SCRIPTS_DIR)
+
+import artifacts
+import config
+MANIFEST_PATH = 'output/build_manifest.json'
+PERFORMANCE_REPORT_PATH = 'output/performance_report.json'
+
+# Módulos de scripts já carregados neste processo (reaproveitados entre tarefas)
+_loaded_scripts = {}
+
+
+def load_task_specs(script_path):
+    """Lê o dicionário TASKS de um script sem importá-lo"""
+    with open(script_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=script_path)
+    
+    for statement in tree.body:
+        if (isinstance(statement, ast.Assign)
+                and any(isinstance(t, ast.Name) and t.id == 'TASKS'
+                        for t in statement.targets)):
+            return ast.literal_eval(statement.value)
+    
+    raise ValueError(f"{script_path} não declara TASKS")
+
+
+def load_script(script_path):
+    """Importa um script numerado (ex.: 02_leadlag_analysis.py) como módulo"""
+    script_path = os.path.abspath(script_path)
+    
+    if script_path not in _loaded_scripts:
+        name = 'stage_' + os.path.splitext(os.path.basename(script_path))[0]
+        spec = importlib.util.spec_from_file_location(name, script_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded_scripts[script_path] = module
+    
+    return _loaded_scripts[script_path]
+
+
+def _read_io_counters():
+    """Bytes lidos/escritos pelo processo (Linux: /proc/self/io)"""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            fields = dict(line.split(':') for line in f.read().splitlines() if ':' in line)
+        return int(fields['rchar']), int(fields['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _reset_peak_rss():
+    """Zera o pico de memória do processo, quando o kernel permite (Linux)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    """Pico de memória residente do processo em MB"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é reportado em bytes no macOS e em KB nos demais Unix
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except (ImportError, OSError):
+        return None
+
+
+class TaskProbe:
+    """Mede tempo de parede, CPU, pico de memória e I/O de uma tarefa
+    
+    Os contadores são do processo inteiro: no modo --in-process incluem a
+    gravação em segundo plano de artefatos que ocorra durante a tarefa.
+    """
+    
+    def __init__(self):
+        _reset_peak_rss()
+        self.started = time.time()
+        self.io_start = _read_io_counters()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+    
+    def stop(self):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        io_end = _read_io_counters()
+        
+        if self.io_start is not None and io_end is not None:
+            read_bytes = io_end[0] - self.io_start[0]
+            write_bytes = io_end[1] - self.io_start[1]
+        else:
+            read_bytes = write_bytes = None
+        
+        return {
+            'started': self.started,
+            'finished': self.started + wall,
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'peak_rss_mb': _peak_rss_mb(),
+            'read_bytes': read_bytes,
+            'write_bytes': write_bytes,
+        }
+
+
+def execute_task(script_path, task_name, capture_output=True):
+    """Executa uma função de um script (roda dentro do pool de processos)
+    
+    Retorna (sucesso, output, erro, métricas). O tempo de importação do script
+    é medido à parte (load_seconds) para não ser atribuído à tarefa.
+    """
+    buffer = io.StringIO()
+    redirect = contextlib.redirect_stdout(buffer) if capture_output else contextlib.nullcontext()
+    probe = None
+    load_start = time.perf_counter()
+    
+    try:
+        with redirect:
+            task = getattr(load_script(script_path), task_name)
+            load_seconds = time.perf_counter() - load_start
+            probe = TaskProbe()
+            task()
+        metrics = probe.stop()
+        metrics['load_seconds'] = load_seconds
+        return True, buffer.getvalue(), '', metrics
+    except Exception:
+        metrics = probe.stop() if probe is not None else {}
+        return False, buffer.getvalue(), traceback.format_exc(), metrics
+
+
+class InlineExecutor:
+    """Executor que roda as tarefas no próprio processo (modo --in-process)"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class BuildManifest:
+    """Registra hashes de entradas, parâmetros e código de cada tarefa
+    
+    Uma tarefa é pulada quando a chave calculada no momento da execução é
+    igual à registrada e seus outputs continuam com o conteúdo gravado.
+    """
+    
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self._file_hashes = {}
+        self._code_hashes = {}
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+    
+    def file_hash(self, path):
+        """Hash do conteúdo de um arquivo (memorizado por mtime e tamanho)"""
+        if not os.path.exists(path):
+            return None
+        
+        stat = os.stat(path)
+        cache_key = (path, stat.st_mtime_ns, stat.st_size)
+        
+        if cache_key not in self._file_hashes:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            self._file_hashes[cache_key] = digest.hexdigest()
+        
+        return self._file_hashes[cache_key]
+    
+    def code_hash(self, script_path, task_name):
+        """Hash do código que afeta a tarefa
+        
+        Considera o script sem as demais funções declaradas em TASKS (alterar
+        compare_periods não invalida calculate_rolling_correlation) e os
+        módulos auxiliares não numerados da pasta scripts/.
+        """
+        cache_key = (script_path, task_name)
+        
+        if cache_key not in self._code_hashes:
+            with open(script_path, 'r', encoding='utf-8') as f:
+                tree = ast.parse(f.read(), filename=script_path)
+            
+            tasks = load_task_specs(script_path)
+            tree.body = [
+                statement for statement in tree.body
+                if not (isinstance(statement, ast.FunctionDef)
+                        and statement.name in tasks and statement.name != task_name)
+                and not (isinstance(statement, ast.Assign)
+                         and any(isinstance(t, ast.Name) and t.id == 'TASKS'
+                                 for t in statement.targets))
+            ]
+            
+            digest = hashlib.sha256(ast.dump(tree).encode('utf-8'))
+            for name in sorted(os.listdir(SCRIPTS_DIR)):
+                if name.endswith('.py') and not name[0].isdigit():
+                    digest.update(self.file_hash(os.path.join(SCRIPTS_DIR, name)).encode('utf-8'))
+            
+            self._code_hashes[cache_key] = digest.hexdigest()
+        
+        return self._code_hashes[cache_key]
+    
+    def task_key(self, node):
+        """Chave da tarefa: código, parâmetros declarados e conteúdo das entradas"""
+        payload = {
+            'code': self.code_hash(node['script'], node['task']),
+            'params': {name: config.get_str(name) for name in node['params']},
+            'format': artifacts.current_format(),
+            'inputs': {path: self.file_hash(artifacts.resolve(path))
+                       for path in node['inputs'] + node['optional_inputs']},
+            'outputs': node['outputs'],
+        }
+        encoded = json.dumps(payload, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+    
+    def is_fresh(self, node, key):
+        """Verifica se a tarefa pode ser pulada"""
+        entry = self.entries.get(node['id'])
+        
+        if entry is None or entry['key'] != key:
+            return False
+        
+        return all(self.file_hash(artifacts.resolve(path)) == digest
+                   for path, digest in entry['outputs'].items())
+    
+    def record(self, node, key):
+        """Registra execução bem-sucedida e persiste o manifesto"""
+        self.entries[node['id']] = {
+            'key': key,
+            'outputs': {path: self.file_hash(artifacts.resolve(path))
+                        for path in node['outputs']},
+            'updated': datetime.now().isoformat(timespec='seconds'),
+        }
+        
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
 class PipelineOrchestrator:
     """Gerencia execução completa do pipeline analítico"""
     
-    def __init__(self, skip_download=False, verbose=False):
+    def __init__(self, skip_download=False, verbose=False, jobs=1, force=False,
+                 in_process=False, artifact_format=None, update=False):
         self.skip_download = skip_download
+        self.update = update
         self.verbose = verbose
+        self.force = force
+        self.in_process = in_process
+        self.persist = config.get_bool('SAVE_INTERMEDIATE', True)
+        
+        if artifact_format:
+            # Via ambiente para valer também nos processos do pool
+            os.environ['ARTIFACT_FORMAT'] = artifact_format
+        self.jobs = 1 if in_process else (jobs if jobs > 0 else (os.cpu_count() or 1))
+        if self.jobs > 1:
+            # Tarefas com pool próprio (Granger, IRF, estacionariedade,
+            # reamostragens) dividem o orçamento de N_JOBS entre as tarefas
+            # simultâneas, em vez de cada uma abrir N_JOBS processos
+            os.environ['N_JOBS'] = str(max(1, config.n_jobs() // self.jobs))
+        self.metrics = {}
         self.start_time = time.time()
         self.scripts = [
             ('00_download_data.py', 'Download de Dados Públicos', not skip_download),
@@ -42,60 +345,115 @@ class PipelineOrchestrator:
         print("="*70)
         print(f"Início: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        if self.skip_download:
+        if self.update:
+            print("Modo: Atualização incremental dos índices")
+        elif self.skip_download:
             print("Modo: Processamento apenas (download de dados pulado)")
         else:
             print("Modo: Análise completa (incluindo download)")
         
         print("="*70 + "\n")
     
-    def print_step(self, step_num, total_steps, script_name, description):
+    def print_step(self, step_num, total_steps, task_id, description):
         """Imprime informação do passo atual"""
         print("\n" + "-"*70)
         print(f"[{step_num}/{total_steps}] {description}")
-        print(f"Script: {script_name}")
+        print(f"Tarefa: {task_id}")
         print("-"*70)
     
-    def run_script(self, script_path):
-        """Executa um script Python e captura output"""
+    def run_task(self, node, future):
+        """Coleta o resultado de uma tarefa executada no pool de processos"""
         try:
-            if self.verbose:
-                # Mostrar output completo
-                result = subprocess.run(
-                    [sys.executable, script_path],
-                    check=True,
-                    capture_output=False
-                )
-            else:
-                # Capturar output e mostrar apenas resumo
-                result = subprocess.run(
-                    [sys.executable, script_path],
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
-                
-                # Extrair linhas com ✓ ou ✗ para resumo
-                lines = result.stdout.split('\n')
-                summary_lines = [line for line in lines 
-                               if '✓' in line or '✗' in line or 'ERRO' in line.upper()]
-                
-                if summary_lines:
-                    print("\nResumo da execução:")
-                    for line in summary_lines[:10]:  # Mostrar até 10 linhas de resumo
-                        print(line)
-            
-            return True
-            
-        except subprocess.CalledProcessError as e:
-            print(f"\n✗ ERRO na execução de {script_path}")
-            if hasattr(e, 'stderr') and e.stderr:
-                print(f"Mensagem de erro:\n{e.stderr}")
+            success, output, error, metrics = future.result()
+        except Exception as e:
+            print(f"\n✗ ERRO inesperado em {node['id']}: {str(e)}")
             return False
         
-        except Exception as e:
-            print(f"\n✗ ERRO inesperado: {str(e)}")
+        self.metrics[node['id']] = dict(metrics, status='ok' if success else 'erro')
+        
+        if not self.verbose:
+            # Mostrar apenas linhas de resumo do output capturado
+            summary_lines = [line for line in output.split('\n')
+                           if '✓' in line or '✗' in line or 'ERRO' in line.upper()]
+            
+            if summary_lines:
+                print(f"\nResumo da execução ({node['id']}):")
+                for line in summary_lines[:10]:  # Mostrar até 10 linhas de resumo
+                    print(line)
+        
+        if not success:
+            print(f"\n✗ ERRO na execução de {node['id']}")
+            if error:
+                print(f"Mensagem de erro:\n{error}")
             return False
+        
+        return True
+    
+    def build_graph(self):
+        """Monta o grafo de tarefas a partir dos artefatos declarados em TASKS"""
+        nodes = []
+        
+        for script_name, description, active in self.scripts:
+            if not active:
+                continue
+            
+            script_path = f'scripts/{script_name}'
+            stem = os.path.splitext(script_name)[0]
+            
+            for task_name, spec in load_task_specs(script_path).items():
+                nodes.append({
+                    'id': f'{stem}:{task_name}',
+                    'script': script_path,
+                    'task': task_name,
+                    'description': description,
+                    'inputs': spec.get('inputs', []),
+                    'optional_inputs': spec.get('optional_inputs', []),
+                    'outputs': spec.get('outputs', []),
+                    'params': spec.get('params', []),
+                    'cache': spec.get('cache', True),
+                    'after': [f'{stem}:{name}' for name in spec.get('after', [])],
+                })
+        
+        producers = {}
+        for node in nodes:
+            for output in node['outputs']:
+                producers[output] = node['id']
+        
+        # Arestas: produtor do artefato -> consumidor, mais ordens explícitas
+        for node in nodes:
+            upstream = set(node['after'])
+            for artifact in node['inputs'] + node['optional_inputs']:
+                producer = producers.get(artifact)
+                if producer is not None and producer != node['id']:
+                    upstream.add(producer)
+            node['upstream'] = upstream
+        
+        if self.update:
+            # Download (se ativo) seguido da extensão incremental dos índices
+            downloads = [node for node in nodes if node['id'].startswith('00_')]
+            nodes = downloads + [{
+                'id': '01_process_data:update_indices',
+                'script': 'scripts/01_process_data.py',
+                'task': 'update_indices',
+                'description': 'Atualização Incremental dos Índices',
+                'inputs': ['data/processed/stress_index.csv'],
+                'optional_inputs': [],
+                'outputs': [],
+                'params': [],
+                'cache': False,
+                'after': [],
+                'upstream': {node['id'] for node in downloads},
+            }]
+        
+        return nodes
+    
+    def missing_inputs(self, node):
+        """Lista entradas obrigatórias ausentes no momento da execução"""
+        return [path for path in node['inputs'] if not artifacts.exists(path)]
+    
+    def flush(self, paths):
+        """Aguarda a gravação em disco (write-behind) dos artefatos informados"""
+        artifacts.flush(paths)
     
     def check_dependencies(self):
         """Verifica se dependências necessárias estão instaladas"""
@@ -154,34 +512,201 @@ class PipelineOrchestrator:
         # Criar estrutura
         self.create_directories()
         
-        # Executar scripts em sequência
-        active_scripts = [(s, d) for s, d, active in self.scripts if active]
-        total_steps = len(active_scripts)
-        
-        for idx, (script_name, description) in enumerate(active_scripts, 1):
+        # Verificar se scripts existem
+        for script_name, _, active in self.scripts:
             script_path = f'scripts/{script_name}'
-            
-            # Verificar se script existe
-            if not os.path.exists(script_path):
+            if active and not os.path.exists(script_path):
                 print(f"\n✗ ERRO: Script {script_path} não encontrado!")
                 print(f"✗ Certifique-se de que todos os scripts estão na pasta 'scripts/'")
                 return False
-            
-            # Executar
-            self.print_step(idx, total_steps, script_name, description)
-            
-            success = self.run_script(script_path)
-            
-            if not success:
-                print(f"\n✗ Pipeline interrompido devido a erro em {script_name}")
-                return False
-            
-            print(f"✓ {description} concluído com sucesso")
+        
+        nodes = self.build_graph()
+        success = self.run_graph(nodes)
+        self.write_performance_report(nodes)
+        
+        if not success:
+            return False
         
         # Finalização
         self.print_completion_summary()
         return True
     
+    def run_graph(self, nodes):
+        """Executa o grafo de tarefas, em paralelo quando não há dependência"""
+        by_id = {node['id']: node for node in nodes}
+        order = {node['id']: idx for idx, node in enumerate(nodes)}
+        remaining = {node['id']: set(node['upstream']) for node in nodes}
+        dependents = {node['id']: [] for node in nodes}
+        for node in nodes:
+            for upstream in node['upstream']:
+                dependents[upstream].append(node['id'])
+        
+        ready = sorted((nid for nid, deps in remaining.items() if not deps),
+                       key=order.get)
+        total_steps = len(nodes)
+        step = 0
+        failed = False
+        completed = 0
+        skipped = 0
+        manifest = BuildManifest()
+        keys = {}
+        # Sem persistência os outputs não chegam ao disco: manifesto desativado
+        use_manifest = self.persist or not self.in_process
+        
+        if self.in_process:
+            # Etapas compartilham DataFrames em memória neste interpretador
+            artifacts.use_memory_store(persist=self.persist)
+            executor = InlineExecutor()
+            disk = "gravação em segundo plano" if self.persist else "sem gravação em disco"
+            print(f"Tarefas: {total_steps} | Modo em processo ({disk})")
+        else:
+            executor = ProcessPoolExecutor(max_workers=self.jobs)
+            print(f"Tarefas: {total_steps} | Processos paralelos: {self.jobs} "
+                  f"(N_JOBS por tarefa: {config.n_jobs()})")
+        
+        def release(node_id):
+            for dependent in dependents[node_id]:
+                remaining[dependent].discard(node_id)
+                if not remaining[dependent]:
+                    ready.append(dependent)
+            ready.sort(key=order.get)
+        
+        with executor as pool:
+            running = {}
+            
+            while ready or running:
+                # Submeter tarefas prontas (nenhuma nova após falha)
+                while ready and not failed:
+                    node = by_id[ready.pop(0)]
+                    
+                    missing = self.missing_inputs(node)
+                    if missing:
+                        print(f"\n✗ ERRO: {node['id']} requer {', '.join(missing)}")
+                        failed = True
+                        break
+                    
+                    step += 1
+                    
+                    if node['cache'] and use_manifest:
+                        self.flush(node['inputs'] + node['optional_inputs'])
+                        keys[node['id']] = manifest.task_key(node)
+                        if not self.force and manifest.is_fresh(node, keys[node['id']]):
+                            print(f"↷ [{step}/{total_steps}] {node['id']} inalterado (pulado)")
+                            self.metrics[node['id']] = {'status': 'pulado'}
+                            completed += 1
+                            skipped += 1
+                            release(node['id'])
+                            continue
+                    
+                    self.print_step(step, total_steps, node['id'], node['description'])
+                    future = pool.submit(execute_task, node['script'], node['task'],
+                                         not self.verbose)
+                    running[future] = node
+                
+                if not running:
+                    break
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    node = running.pop(future)
+                    
+                    if not self.run_task(node, future):
+                        print(f"\n✗ Pipeline interrompido devido a erro em {node['id']}")
+                        failed = True
+                        continue
+                    
+                    completed += 1
+                    print(f"✓ {node['id']} concluído com sucesso")
+                    
+                    if node['cache'] and use_manifest:
+                        self.flush(node['outputs'])
+                        manifest.record(node, keys[node['id']])
+                    release(node['id'])
+        
+        self.flush(None)
+        
+        if skipped:
+            print(f"\n↷ {skipped} tarefa(s) pulada(s) sem alterações (use --force para refazer)")
+        
+        if failed:
+            return False
+        
+        if completed < total_steps:
+            pending = [nid for nid, deps in remaining.items() if deps]
+            print(f"\n✗ ERRO: dependências circulares entre {', '.join(pending)}")
+            return False
+        
+        return True
+    
+    def write_performance_report(self, nodes):
+        """Agrega métricas por tarefa e por etapa e grava o relatório JSON"""
+        tasks = {node['id']: self.metrics[node['id']]
+                 for node in nodes if node['id'] in self.metrics}
+        stages = {}
+        
+        for task_id, metrics in tasks.items():
+            if metrics.get('status') != 'ok':
+                continue
+            
+            stage = stages.setdefault(task_id.split(':')[0], {
+                'tasks': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                'load_seconds': 0.0, 'peak_rss_mb': None,
+                'read_bytes': 0, 'write_bytes': 0,
+                'started': metrics['started'], 'finished': metrics['finished'],
+            })
+            stage['tasks'] += 1
+            for key in ('wall_seconds', 'cpu_seconds', 'load_seconds'):
+                stage[key] += metrics[key]
+            for key in ('read_bytes', 'write_bytes'):
+                if stage[key] is not None and metrics[key] is not None:
+                    stage[key] += metrics[key]
+                else:
+                    stage[key] = None
+            if metrics['peak_rss_mb'] is not None:
+                stage['peak_rss_mb'] = max(stage['peak_rss_mb'] or 0, metrics['peak_rss_mb'])
+            stage['started'] = min(stage['started'], metrics['started'])
+            stage['finished'] = max(stage['finished'], metrics['finished'])
+        
+        for stage in stages.values():
+            # Duração real da etapa (menor que a soma quando há paralelismo)
+            stage['elapsed_seconds'] = stage['finished'] - stage['started']
+        
+        self.performance = {
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'mode': 'in-process' if self.in_process else 'process-pool',
+            'jobs': self.jobs,
+            'total_seconds': time.time() - self.start_time,
+            'stages': stages,
+            'tasks': tasks,
+        }
+        
+        os.makedirs(os.path.dirname(PERFORMANCE_REPORT_PATH), exist_ok=True)
+        with open(PERFORMANCE_REPORT_PATH, 'w', encoding='utf-8') as f:
+            json.dump(self.performance, f, indent=2)
+    
+    def print_performance_report(self):
+        """Imprime tabela de desempenho por tarefa e por etapa"""
+        def fmt_mb(value, scale=1):
+            return f"{value / scale:9.1f}" if value is not None else f"{'-':>9s}"
+        
+        header = f"  {'Tarefa':50s} {'Wall(s)':>8s} {'CPU(s)':>8s} {'RSS(MB)':>9s} {'Lido(MB)':>9s} {'Escr(MB)':>9s}"
+        print(header)
+        print("  " + "-"*(len(header) - 2))
+        
+        rows = list(self.performance['tasks'].items())
+        rows += [(f"{stem} (total)", stage) for stem, stage in self.performance['stages'].items()]
+        
+        for name, metrics in rows:
+            if metrics.get('status', 'ok') != 'ok':
+                print(f"  {name:50s} {metrics['status']:>8s}")
+                continue
+            print(f"  {name:50s} {metrics['wall_seconds']:8.2f} {metrics['cpu_seconds']:8.2f} "
+                  f"{fmt_mb(metrics['peak_rss_mb'])} {fmt_mb(metrics['read_bytes'], 1024**2)} "
+                  f"{fmt_mb(metrics['write_bytes'], 1024**2)}")
+        
+        print(f"\n  Relatório completo: {PERFORMANCE_REPORT_PATH}")
+    
     def print_completion_summary(self):
         """Imprime resumo de conclusão"""
         elapsed_time = time.time() - self.start_time
@@ -194,6 +719,9 @@ class PipelineOrchestrator:
         print(f"Tempo total de execução: {minutes}m {seconds}s")
         print(f"Conclusão: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
+        print("\n⏱  DESEMPENHO POR TAREFA:")
+        self.print_performance_report()
+        
         print("\n📊 OUTPUTS GERADOS:")
         
         # Listar arquivos gerados
@@ -204,6 +732,8 @@ class PipelineOrchestrator:
                 'data/processed/exposure_proxy.csv',
                 'data/processed/defensive_concentration.csv',
                 'data/processed/synchronization_index.csv',
+                'data/processed/absorption_ratio.csv',
+                'data/processed/weekly_data.csv',
                 'data/processed/monthly_data.csv'
             ],
             'Figuras e Gráficos': [
@@ -217,6 +747,7 @@ class PipelineOrchestrator:
         for category, files in output_files.items():
             print(f"\n  {category}:")
             for file in files:
+                file = artifacts.resolve(file)
                 if os.path.exists(file):
                     size_kb = os.path.getsize(file) / 1024
                     print(f"    ✓ {file:45s} ({size_kb:.1f} KB)")
@@ -233,6 +764,11 @@ class PipelineOrchestrator:
         print("  python run_pipeline.py           # Execução completa")
         print("  python run_pipeline.py --skip-download  # Pular download")
         print("  python run_pipeline.py --verbose        # Output detalhado")
+        print("  python run_pipeline.py --jobs 2         # Tarefas em paralelo")
+        print("  python run_pipeline.py --force          # Refazer etapas inalteradas")
+        print("  python run_pipeline.py --in-process     # Etapas no mesmo interpretador")
+        print("  python run_pipeline.py --format npz     # Artefatos em formato binário")
+        print("  python run_pipeline.py --update         # Anexar apenas os dias novos")
         
         print("\n" + "="*70 + "\n")
 
@@ -247,6 +783,11 @@ Exemplos de uso:
   python run_pipeline.py --skip-download    # Pular download de dados
   python run_pipeline.py --verbose          # Mostrar output completo
   python run_pipeline.py --skip-download --verbose  # Combinação
+  python run_pipeline.py --skip-download --jobs 2   # Lead-lag e sincronização em paralelo
+  python run_pipeline.py --skip-download --force    # Ignorar manifesto e refazer tudo
+  python run_pipeline.py --skip-download --in-process  # DataFrames em memória entre etapas
+  python run_pipeline.py --skip-download --format npz  # Artefatos binários (sem parsing de CSV)
+  python run_pipeline.py --update           # Baixar e anexar apenas os dias novos
         """
     )
     
@@ -262,12 +803,51 @@ Exemplos de uso:
         help='Mostra output completo de cada script'
     )
     
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Máximo de tarefas executadas em paralelo (0 = número de CPUs, 1 = serial)'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Reexecuta todas as tarefas, mesmo sem alterações desde a última execução'
+    )
+    
+    parser.add_argument(
+        '--in-process',
+        action='store_true',
+        help='Executa as etapas como funções em um único interpretador, '
+             'compartilhando DataFrames em memória (gravação em disco em segundo plano)'
+    )
+    
+    parser.add_argument(
+        '--format',
+        choices=sorted(artifacts.FORMATS),
+        help='Formato dos artefatos intermediários (padrão: ARTIFACT_FORMAT ou csv)'
+    )
+    
+    parser.add_argument(
+        '--update',
+        action='store_true',
+        help='Estende os índices diários apenas pelos dias novos (estado incremental, '
+             'sem reprocessar o histórico nem refazer as análises)'
+    )
+    
     args = parser.parse_args()
     
     # Executar pipeline
     orchestrator = PipelineOrchestrator(
         skip_download=args.skip_download,
-        verbose=args.verbose
+        verbose=args.verbose,
+        jobs=args.jobs,
+        force=args.force,
+        in_process=args.in_process,
+        artifact_format=args.format,
+        update=args.update
     )
     
     success = orchestrator.run()
@@ -8,11 +8,46 @@ Framework: Preparacao Assimetrica e Crises Sistemicas
 Autor: Gabriel W. Soares
 """
 
-import yfinance as yf
 import pandas as pd
+import json
 import os
 from datetime import datetime
-import time
+
+import artifacts
+import config
+import fetching
+import providers
+
+PRICE_CACHE_DIR = 'data/raw/cache'
+
+# Artefatos de cada etapa (lidos pelo run_pipeline.py para montar o grafo
+# de dependencias e executar etapas independentes em paralelo). Downloads
+# usam 'cache': False pois dependem de dados remotos, nao de entradas locais.
+TASKS = {
+    'download_etf_data': {
+        'inputs': [],
+        'outputs': ['data/raw/etf_prices.csv'],
+        'params': ['USE_CACHE', 'CACHE_OVERLAP_DAYS', 'ETFS', 'CUSTOM_ETFS',
+                   'PRICE_PROVIDER', 'DATA_PROVIDER', 'SYNTHETIC_UNIVERSE',
+                   'RATIO_PAIRS', 'DOWNLOAD_CHUNK_SIZE'],
+        'cache': False,
+    },
+    'download_macro_indicators': {
+        'inputs': [],
+        'outputs': ['data/raw/macro_indicators.csv'],
+        'params': ['FRED_SERIES', 'MACRO_PROVIDER', 'DATA_PROVIDER'],
+        'cache': False,
+    },
+    'calculate_cny_volatility': {
+        'inputs': ['data/raw/etf_prices.csv'],
+        'outputs': ['data/raw/volatility_proxy.csv'],
+    },
+    'generate_summary': {
+        'inputs': [],
+        'after': ['download_etf_data', 'download_macro_indicators',
+                  'calculate_cny_volatility'],
+    },
+}
 
 def create_directories():
     """Cria estrutura de pastas necessaria"""
@@ -26,10 +61,77 @@ def create_directories():
         os.makedirs(directory, exist_ok=True)
     print("[OK] Estrutura de pastas criada")
 
-def download_etf_data():
+def fetch_close_prices(provider, tickers, start_date, end_date, chunk_size=None):
+    """Busca precos no provedor em lotes de ate `chunk_size` tickers
+    
+    Retorna dict ticker -> serie; um lote que falha nao derruba os demais.
+    """
+    chunk_size = chunk_size or config.get_int('DOWNLOAD_CHUNK_SIZE', 100)
+    prices = {}
+    
+    for i in range(0, len(tickers), chunk_size):
+        chunk = tickers[i:i + chunk_size]
+        try:
+            prices.update(provider.fetch_prices(chunk, start_date, end_date))
+        except Exception as e:
+            label = ', '.join(chunk) if len(chunk) <= 10 else f"{chunk[0]}..{chunk[-1]}"
+            print(f"    [ERRO] Falha no download ({label}): {str(e)}")
+    
+    return prices
+
+def load_price_cache(cache_dir):
+    """Carrega o cache local de precos (um arquivo por ticker + indice)"""
+    index_path = os.path.join(cache_dir, 'index.json')
+    
+    if not os.path.exists(index_path):
+        return {}, {}
+    
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    
+    cached = {}
+    for ticker in index:
+        path = os.path.join(cache_dir, f'{ticker}.csv')
+        if artifacts.exists(path):
+            cached[ticker] = artifacts.read_frame(path)['Close']
+    
+    return cached, index
+
+def save_price_cache(cache_dir, prices, index):
+    """Grava historico atualizado de cada ticker e o indice do cache"""
+    os.makedirs(cache_dir, exist_ok=True)
+    
+    for ticker, series in prices.items():
+        path = os.path.join(cache_dir, f'{ticker}.csv')
+        artifacts.write_frame(series.to_frame('Close'), path)
+    
+    with open(os.path.join(cache_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+
+def merge_price_history(cached, fresh, tolerance=1e-6):
+    """Anexa dados novos ao historico em cache
+    
+    Os dias sobrepostos servem de verificacao: se o preco ajustado mudou
+    (dividendo, desdobramento, revisao), o historico inteiro foi reajustado
+    pela fonte e a funcao retorna None para forcar download completo.
+    """
+    overlap = cached.index.intersection(fresh.index)
+    
+    if len(overlap) > 0:
+        old = cached.loc[overlap]
+        drift = ((fresh.loc[overlap] - old).abs() / old.abs()).max()
+        if drift > tolerance:
+            return None
+    
+    merged = pd.concat([cached[~cached.index.isin(fresh.index)], fresh])
+    return merged.sort_index()
+
+def download_etf_data(provider=None):
     """Download de dados de ETFs publicos"""
     print("\n[1/3] Baixando dados de ETFs...")
     
+    provider = provider or providers.price_provider()
+    
     etfs = {
         'FXI': 'iShares China Large-Cap ETF',
         'MCHI': 'iShares MSCI China ETF',
@@ -42,93 +144,163 @@ def download_etf_data():
     start_date = "2015-01-01"
     end_date = datetime.now().strftime("%Y-%m-%d")
     
-    tickers_list = list(etfs.keys())
-    tickers_str = ' '.join(tickers_list)
+    tickers_list = config.get_list('ETFS', etfs.keys()) + config.get_list('CUSTOM_ETFS', [])
+    if provider.name == 'synthetic':
+        tickers_list += providers.synthetic_tickers(config.get_int('SYNTHETIC_UNIVERSE', 0))
     
-    print(f"  -> Baixando {len(tickers_list)} ETFs...")
+    # Tickers usados nas razoes configuradas tambem entram no universo
+    for pair in config.get_pairs('RATIO_PAIRS', []):
+        tickers_list += list(pair)
+    tickers_list = list(dict.fromkeys(tickers_list))
     
-    try:
-        data = yf.download(tickers_str, start=start_date, end=end_date, 
-                          progress=False, auto_adjust=True, group_by='ticker')
+    # Cache separado por provedor; fontes locais/sinteticas nao precisam dele
+    use_cache = config.get_bool('USE_CACHE', True) and provider.cacheable
+    cache_dir = os.path.join(PRICE_CACHE_DIR, provider.name)
+    overlap_days = config.get_int('CACHE_OVERLAP_DAYS', 5)
+    
+    cached, cache_index = load_price_cache(cache_dir) if use_cache else ({}, {})
+    
+    # Agrupar tickers pela data inicial que falta buscar (um request por grupo)
+    groups = {}
+    for ticker in tickers_list:
+        history = cached.get(ticker)
+        covers_start = cache_index.get(ticker, {}).get('start', '9999') <= start_date
         
-        df_etfs = pd.DataFrame()
+        if history is not None and covers_start and len(history) > overlap_days:
+            fetch_start = history.index[-overlap_days].strftime("%Y-%m-%d")
+        else:
+            cached.pop(ticker, None)
+            fetch_start = start_date
         
-        for ticker in tickers_list:
-            try:
-                if len(tickers_list) > 1:
-                    prices = data[ticker]['Close']
-                else:
-                    prices = data['Close']
-                
-                df_etfs[ticker] = prices
-                print(f"    [OK] {ticker}: {len(prices.dropna())} observacoes")
-            except Exception as e:
-                print(f"    [ERRO] {ticker}: {str(e)}")
+        groups.setdefault(fetch_start, []).append(ticker)
+    
+    incremental = sum(len(t) for start, t in groups.items() if start != start_date)
+    print(f"  -> Baixando {len(tickers_list)} ETFs de '{provider.name}' "
+          f"({incremental} incrementais via cache)...")
+    
+    prices = {}
+    full_refresh = []
+    
+    for fetch_start, tickers in sorted(groups.items()):
+        fresh = fetch_close_prices(provider, tickers, fetch_start, end_date)
         
-        if not df_etfs.empty:
-            output_path = "data/raw/etf_prices.csv"
-            df_etfs.to_csv(output_path)
-            print(f"\n  [OK] Dados salvos em {output_path}")
-            print(f"  [OK] Periodo: {df_etfs.index[0].date()} ate {df_etfs.index[-1].date()}")
-            print(f"  [OK] {len(df_etfs)} dias de negociacao")
-            return df_etfs
-        else:
-            print("\n  [ERRO] Nenhum dado foi baixado")
-            return None
+        for ticker in tickers:
+            history = cached.get(ticker)
+            
+            if ticker not in fresh:
+                if history is not None:
+                    print(f"    [AVISO] {ticker}: usando cache ate {history.index[-1].date()}")
+                    prices[ticker] = history
+                continue
+            
+            if history is None:
+                prices[ticker] = fresh[ticker]
+                print(f"    [OK] {ticker}: {len(fresh[ticker])} observacoes")
+                continue
             
-    except Exception as e:
-        print(f"\n  [ERRO] Falha no download: {str(e)}")
+            merged = merge_price_history(history, fresh[ticker])
+            if merged is None:
+                print(f"    [INFO] {ticker}: precos ajustados revisados, baixando historico completo")
+                full_refresh.append(ticker)
+            else:
+                prices[ticker] = merged
+                print(f"    [OK] {ticker}: {len(merged)} observacoes "
+                      f"(+{len(merged) - len(history)} novas)")
+    
+    if full_refresh:
+        fresh = fetch_close_prices(provider, full_refresh, start_date, end_date)
+        for ticker in full_refresh:
+            if ticker in fresh:
+                prices[ticker] = fresh[ticker]
+                print(f"    [OK] {ticker}: {len(fresh[ticker])} observacoes")
+            else:
+                prices[ticker] = cached[ticker]
+                print(f"    [AVISO] {ticker}: usando cache ate {cached[ticker].index[-1].date()}")
+    
+    if use_cache and prices:
+        for ticker, series in prices.items():
+            cache_index[ticker] = {'start': start_date,
+                                   'end': series.index[-1].strftime("%Y-%m-%d")}
+        save_price_cache(cache_dir, prices, cache_index)
+    
+    if prices:
+        df_etfs = pd.DataFrame({ticker: prices[ticker]
+                                for ticker in tickers_list if ticker in prices})
+        output_path = "data/raw/etf_prices.csv"
+        artifacts.write_frame(df_etfs, output_path)
+        print(f"\n  [OK] Dados salvos em {output_path}")
+        print(f"  [OK] Periodo: {df_etfs.index[0].date()} ate {df_etfs.index[-1].date()}")
+        print(f"  [OK] {len(df_etfs)} dias de negociacao")
+        return df_etfs
+    else:
+        print("\n  [ERRO] Nenhum dado foi baixado")
         return None
 
-def download_macro_indicators():
+def download_macro_indicators(provider=None):
     """Download de indicadores macroeconomicos do FRED"""
     print("\n[2/3] Baixando indicadores macroeconomicos (FRED)...")
     
-    try:
-        from pandas_datareader import data as pdr
-        
-        indicators = {
-            'VIXCLS': 'CBOE Volatility Index',
-            'TEDRATE': 'TED Spread',
-            'T10Y2Y': 'Treasury Yield Curve',
-            'DEXCHUS': 'China/USD Exchange Rate'
-        }
-        
-        start_date = "2015-01-01"
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        all_indicators = {}
-        
-        for code, name in indicators.items():
-            try:
-                print(f"  -> Baixando {code}...")
-                series = pdr.DataReader(code, 'fred', start_date, end_date)
-                all_indicators[code] = series.iloc[:, 0]
-                print(f"    [OK] {len(series)} observacoes")
-                time.sleep(0.5)
-            except Exception as e:
-                print(f"    [ERRO] {str(e)}")
-        
-        if all_indicators:
-            df_macro = pd.DataFrame(all_indicators)
-            output_path = "data/raw/macro_indicators.csv"
-            df_macro.to_csv(output_path)
-            print(f"\n  [OK] Indicadores salvos em {output_path}")
-            return df_macro
+    provider = provider or providers.macro_provider()
+    
+    indicators = {
+        'VIXCLS': 'CBOE Volatility Index',
+        'TEDRATE': 'TED Spread',
+        'T10Y2Y': 'Treasury Yield Curve',
+        'DEXCHUS': 'China/USD Exchange Rate'
+    }
+    codes = config.get_list('FRED_SERIES', indicators.keys())
+    
+    start_date = "2015-01-01"
+    end_date = datetime.now().strftime("%Y-%m-%d")
+    
+    max_retries = config.get_int('MAX_RETRIES', 3)
+    retry_delay = config.get_float('RETRY_DELAY', 5)
+    workers = config.get_int('DOWNLOAD_WORKERS', 4)
+    limiter = (fetching.RateLimiter(provider.rate_limit, burst=workers)
+               if provider.rate_limit else None)
+    
+    print(f"  -> Baixando {len(codes)} series de '{provider.name}' ({workers} conexoes, "
+          f"ate {max_retries} novas tentativas)...")
+    
+    def report(code, series, error, attempts):
+        if error is None:
+            retry_note = f" apos {attempts} tentativas" if attempts > 1 else ""
+            print(f"    [OK] {code}: {len(series)} observacoes{retry_note}")
         else:
-            print("\n  [AVISO] Nenhum indicador baixado")
-            return None
-            
-    except ImportError:
-        print("\n  [AVISO] pandas-datareader nao instalado")
-        print("  [INFO] Instale com: pip install pandas-datareader")
-        print("  [INFO] Continuando sem indicadores FRED...")
+            print(f"    [ERRO] {code}: {str(error)}")
+    
+    fetchers = {
+        code: (lambda code=code: provider.fetch_series(code, start_date, end_date))
+        for code in codes
+    }
+    all_indicators, failures = fetching.fetch_all(
+        fetchers, max_workers=workers, limiter=limiter,
+        max_retries=max_retries, retry_delay=retry_delay, on_result=report
+    )
+    
+    if failures:
+        print(f"\n  [AVISO] {len(failures)}/{len(codes)} series falharam (erros permanentes "
+              f"sem novas tentativas): {', '.join(sorted(failures))}")
+    
+    if all_indicators:
+        # Manter a ordem configurada, independente da ordem de conclusao
+        df_macro = pd.DataFrame({code: all_indicators[code]
+                                 for code in codes if code in all_indicators})
+        output_path = "data/raw/macro_indicators.csv"
+        artifacts.write_frame(df_macro, output_path)
+        print(f"\n  [OK] Indicadores salvos em {output_path}")
+        return df_macro
+    else:
+        print("\n  [AVISO] Nenhum indicador baixado")
         return None
 
-def calculate_cny_volatility(etf_data):
+def calculate_cny_volatility(etf_data=None):
     """Calcula volatilidade CNY/USD usando proxy de ETFs"""
     print("\n[3/3] Calculando volatilidade implicita...")
     
+    if etf_data is None and artifacts.exists('data/raw/etf_prices.csv'):
+        etf_data = artifacts.read_frame('data/raw/etf_prices.csv')
+    
     if etf_data is None or 'FXI' not in etf_data.columns or 'SPY' not in etf_data.columns:
         print("  [ERRO] ETFs necessarios nao disponiveis")
         return None
@@ -148,7 +320,7 @@ def calculate_cny_volatility(etf_data):
     })
     
     output_path = "data/raw/volatility_proxy.csv"
-    df_vol.to_csv(output_path)
+    artifacts.write_frame(df_vol, output_path)
     print(f"  [OK] Volatilidade salva em {output_path}")
     return df_vol
 
@@ -165,9 +337,9 @@ def generate_summary():
     }
     
     for file, description in files_status.items():
-        if os.path.exists(file):
-            df = pd.read_csv(file, index_col=0)
-            print(f"[OK] {description:30s} -> {len(df):5d} observacoes")
+        if artifacts.exists(file):
+            rows = artifacts.row_count(file)
+            print(f"[OK] {description:30s} -> {rows:5d} observacoes")
         else:
             print(f"[--] {description:30s} -> Nao disponivel")
     
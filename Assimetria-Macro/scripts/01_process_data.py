@@ -10,21 +10,105 @@ Autor: Gabriel W. Soares
 """
 
 import pandas as pd
-import numpy as np
 import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
-def calculate_returns():
+import artifacts
+import config
+import features
+import streaming
+
+# Artefatos de cada etapa (lidos pelo run_pipeline.py para montar o grafo
+# de dependencias e executar etapas independentes em paralelo)
+TASKS = {
+    'compute_features': {
+        'inputs': ['data/raw/etf_prices.csv'],
+        'optional_inputs': ['data/raw/macro_indicators.csv',
+                            'data/raw/volatility_proxy.csv'],
+        'outputs': ['data/processed/etf_returns.csv',
+                    'data/processed/stress_index.csv',
+                    'data/processed/exposure_proxy.csv',
+                    'data/processed/defensive_concentration.csv',
+                    'data/processed/pair_ratios.csv'],
+        'params': ['RATIO_PAIRS'],
+    },
+    'aggregate_frequencies': {
+        'inputs': [],
+        'optional_inputs': ['data/processed/stress_index.csv',
+                            'data/processed/exposure_proxy.csv',
+                            'data/processed/defensive_concentration.csv'],
+        'outputs': ['data/processed/daily_data.csv',
+                    'data/processed/weekly_data.csv',
+                    'data/processed/monthly_data.csv'],
+        'params': ['AGGREGATION_FREQ'],
+    },
+    'generate_summary': {
+        'inputs': [],
+        'after': ['compute_features', 'aggregate_frequencies'],
+    },
+}
+
+# Features derivadas das matrizes de origem (prices, macro, volatility),
+# calculadas em uma unica passada pelo motor de scripts/features.py
+FEATURES = {
+    'LOG_RETURNS': {'op': 'log_return', 'source': 'prices', 'dropna': True},
+    'VOL_30D': {'op': 'rolling_vol', 'source': 'prices', 'window': 30, 'annualize': 252},
+    'Z_VOL_30D': {'op': 'zscore', 'source': 'VOL_30D', 'columns': ['FXI']},
+    'Z_MACRO': {'op': 'zscore', 'source': 'macro'},
+    'Z_VOL_PROXY': {'op': 'zscore', 'source': 'volatility', 'columns': ['VOL_RATIO']},
+    'EXPOSURE_RATIO': {'op': 'ratio', 'source': 'prices', 'num': 'FXI', 'den': 'SPY', 'base': 100},
+    'DEFENSIVE_RATIO': {'op': 'ratio', 'source': 'prices', 'num': 'GLD', 'den': 'FXI', 'base': 100},
+    'DEFENSIVE_CHANGE_6M': {'op': 'diff', 'source': 'DEFENSIVE_RATIO', 'periods': 126},
+    'PAIR_RATIOS': {'op': 'ratios', 'source': 'prices', 'pairs': [], 'base': 100},
+}
+
+# Pares padrao do screen de razoes (sobrescritos por RATIO_PAIRS no .env)
+DEFAULT_RATIO_PAIRS = ['FXI/SPY', 'GLD/FXI']
+
+def build_feature_engine():
+    """Le as matrizes de origem uma unica vez e prepara o motor de features"""
+    sources = {'prices': artifacts.read_frame('data/raw/etf_prices.csv')}
+    
+    if artifacts.exists('data/raw/macro_indicators.csv'):
+        sources['macro'] = artifacts.read_frame('data/raw/macro_indicators.csv')
+    
+    if artifacts.exists('data/raw/volatility_proxy.csv'):
+        sources['volatility'] = artifacts.read_frame('data/raw/volatility_proxy.csv')
+    
+    specs = dict(FEATURES)
+    specs['PAIR_RATIOS'] = dict(FEATURES['PAIR_RATIOS'],
+                                pairs=config.get_pairs('RATIO_PAIRS', DEFAULT_RATIO_PAIRS))
+    
+    return features.FeatureEngine(sources, specs)
+
+def compute_features():
+    """Calcula todas as features em uma passada e grava os quatro artefatos"""
+    engine = build_feature_engine()
+    engine.compute_all()
+    
+    # Processamento completo renormaliza o historico: estado incremental obsoleto
+    if os.path.exists(streaming.STATE_PATH):
+        os.remove(streaming.STATE_PATH)
+    
+    return {
+        'returns': calculate_returns(engine),
+        'stress': construct_stress_index(engine),
+        'exposure': calculate_exposure_proxy(engine),
+        'defensive': calculate_defensive_concentration(engine),
+        'pair_ratios': calculate_pair_ratios(engine),
+    }
+
+def calculate_returns(engine=None):
     """Calcula retornos logaritmicos"""
     print("\n[1/5] Calculando retornos logaritmicos...")
     
-    prices = pd.read_csv('data/raw/etf_prices.csv', index_col=0, parse_dates=True)
-    returns = np.log(prices / prices.shift(1))
-    returns = returns.dropna()
+    engine = engine or build_feature_engine()
+    returns = engine.feature('LOG_RETURNS')
     
     output_path = 'data/processed/etf_returns.csv'
-    returns.to_csv(output_path)
+    artifacts.write_frame(returns, output_path)
     
     print(f"  [OK] Retornos calculados: {len(returns)} observacoes")
     print(f"  [OK] ETFs processados: {', '.join(returns.columns)}")
@@ -32,35 +116,32 @@ def calculate_returns():
     
     return returns
 
-def construct_stress_index():
+def construct_stress_index(engine=None):
     """Constroi Indice de Estresse Sistemico"""
     print("\n[2/5] Construindo Indice de Estresse Sistemico...")
     
+    engine = engine or build_feature_engine()
     components = {}
     
-    if os.path.exists('data/raw/macro_indicators.csv'):
-        macro = pd.read_csv('data/raw/macro_indicators.csv', index_col=0, parse_dates=True)
+    if 'macro' in engine.sources:
+        macro = engine.sources['macro']
+        z_macro = engine.feature('Z_MACRO')
         
         for col in macro.columns:
             if not macro[col].isna().all():
-                z_score = (macro[col] - macro[col].mean()) / macro[col].std()
-                components[f'Z_{col}'] = z_score
+                components[f'Z_{col}'] = z_macro[col]
                 print(f"  -> Adicionado: {col}")
     
-    if os.path.exists('data/raw/volatility_proxy.csv'):
-        vol = pd.read_csv('data/raw/volatility_proxy.csv', index_col=0, parse_dates=True)
+    if 'volatility' in engine.sources:
+        z_vol = engine.feature('Z_VOL_PROXY')
         
-        if 'VOL_RATIO' in vol.columns:
-            z_vol = (vol['VOL_RATIO'] - vol['VOL_RATIO'].mean()) / vol['VOL_RATIO'].std()
-            components['Z_VOL_RATIO'] = z_vol
+        if 'VOL_RATIO' in z_vol.columns:
+            components['Z_VOL_RATIO'] = z_vol['VOL_RATIO']
             print(f"  -> Adicionado: VOL_RATIO (proxy)")
     
-    prices = pd.read_csv('data/raw/etf_prices.csv', index_col=0, parse_dates=True)
-    if 'FXI' in prices.columns:
-        returns_fxi = prices['FXI'].pct_change()
-        vol_fxi_30d = returns_fxi.rolling(30).std() * (252 ** 0.5)
-        z_vol_fxi = (vol_fxi_30d - vol_fxi_30d.mean()) / vol_fxi_30d.std()
-        components['Z_VOL_FXI_30D'] = z_vol_fxi
+    z_vol_30d = engine.feature('Z_VOL_30D')
+    if 'FXI' in z_vol_30d.columns:
+        components['Z_VOL_FXI_30D'] = z_vol_30d['FXI']
         print(f"  -> Adicionado: VOL_FXI_30D")
     
     if components:
@@ -73,7 +154,7 @@ def construct_stress_index():
         })
         
         output_path = 'data/processed/stress_index.csv'
-        df_stress.to_csv(output_path)
+        artifacts.write_frame(df_stress, output_path)
         
         print(f"\n  [OK] Indice construido com {len(components)} componentes")
         print(f"  [OK] Periodo: {df_stress.index[0]} ate {df_stress.index[-1]}")
@@ -90,22 +171,22 @@ def construct_stress_index():
         print("  [ERRO] Nenhum componente disponivel")
         return None
 
-def calculate_exposure_proxy():
+def calculate_exposure_proxy(engine=None):
     """Calcula proxy de exposicao institucional"""
     print("\n[3/5] Calculando proxy de exposicao institucional...")
     
-    prices = pd.read_csv('data/raw/etf_prices.csv', index_col=0, parse_dates=True)
+    engine = engine or build_feature_engine()
+    prices = engine.sources['prices']
     
     if 'FXI' in prices.columns and 'SPY' in prices.columns:
-        exposure_ratio = prices['FXI'] / prices['SPY']
-        exposure_ratio = (exposure_ratio / exposure_ratio.iloc[0]) * 100
+        exposure_ratio = engine.feature('EXPOSURE_RATIO')['EXPOSURE_RATIO']
         
         df_exposure = pd.DataFrame({
             'EXPOSURE_RATIO': exposure_ratio,
         })
         
         output_path = 'data/processed/exposure_proxy.csv'
-        df_exposure.to_csv(output_path)
+        artifacts.write_frame(df_exposure, output_path)
         
         print(f"  [OK] Proxy calculado: FXI/SPY ratio")
         print(f"  [OK] Variacao: {exposure_ratio.iloc[-1] - exposure_ratio.iloc[0]:.2f} pontos")
@@ -116,16 +197,16 @@ def calculate_exposure_proxy():
         print("  [ERRO] ETFs necessarios nao disponiveis")
         return None
 
-def calculate_defensive_concentration():
+def calculate_defensive_concentration(engine=None):
     """Calcula concentracao em ativos defensivos"""
     print("\n[4/5] Calculando concentracao defensiva (GLD/FXI)...")
     
-    prices = pd.read_csv('data/raw/etf_prices.csv', index_col=0, parse_dates=True)
+    engine = engine or build_feature_engine()
+    prices = engine.sources['prices']
     
     if 'GLD' in prices.columns and 'FXI' in prices.columns:
-        defensive_ratio = prices['GLD'] / prices['FXI']
-        defensive_ratio = (defensive_ratio / defensive_ratio.iloc[0]) * 100
-        defensive_change_6m = defensive_ratio.diff(126)
+        defensive_ratio = engine.feature('DEFENSIVE_RATIO')['DEFENSIVE_RATIO']
+        defensive_change_6m = engine.feature('DEFENSIVE_CHANGE_6M')['DEFENSIVE_RATIO']
         
         df_defensive = pd.DataFrame({
             'DEFENSIVE_RATIO': defensive_ratio,
@@ -133,7 +214,7 @@ def calculate_defensive_concentration():
         })
         
         output_path = 'data/processed/defensive_concentration.csv'
-        df_defensive.to_csv(output_path)
+        artifacts.write_frame(df_defensive, output_path)
         
         print(f"  [OK] Ratio GLD/FXI calculado")
         print(f"  [OK] Variacao: {defensive_ratio.iloc[-1] - defensive_ratio.iloc[0]:.2f} pontos")
@@ -144,9 +225,34 @@ def calculate_defensive_concentration():
         print("  [ERRO] ETFs necessarios nao disponiveis")
         return None
 
-def prepare_monthly_data():
-    """Agrega dados para frequencia mensal"""
-    print("\n[5/5] Preparando dados mensais para analise VAR...")
+def calculate_pair_ratios(engine=None):
+    """Calcula razoes de todos os pares configurados em RATIO_PAIRS"""
+    print("\n  Calculando razoes do universo (RATIO_PAIRS)...")
+    
+    engine = engine or build_feature_engine()
+    requested = engine.specs['PAIR_RATIOS']['pairs']
+    ratios = engine.feature('PAIR_RATIOS')
+    
+    skipped = len(requested) - ratios.shape[1]
+    if skipped:
+        print(f"  [AVISO] {skipped} pares ignorados (tickers ausentes)")
+    
+    output_path = 'data/processed/pair_ratios.csv'
+    artifacts.write_frame(ratios, output_path)
+    
+    print(f"  [OK] {ratios.shape[1]} razoes calculadas")
+    print(f"  [OK] Salvo em {output_path}")
+    
+    return ratios
+
+def aggregate_frequencies():
+    """Agrega as series processadas para cada frequencia de AGGREGATION_FREQ
+    
+    As series diarias sao lidas e alinhadas uma unica vez; cada frequencia e
+    um resample (ultimo valor do periodo) da mesma matriz. A frequencia
+    mensal e sempre gerada (base das analises VAR do script 02).
+    """
+    print("\n[5/5] Agregando dados por frequencia (D/W/M)...")
     
     files_to_aggregate = {
         'data/processed/stress_index.csv': 'STRESS_INDEX',
@@ -154,32 +260,89 @@ def prepare_monthly_data():
         'data/processed/defensive_concentration.csv': 'DEFENSIVE_RATIO'
     }
     
-    monthly_data = {}
+    series = {}
     
     for file, col_name in files_to_aggregate.items():
-        if os.path.exists(file):
-            df = pd.read_csv(file, index_col=0, parse_dates=True)
+        if artifacts.exists(file):
+            df = artifacts.read_frame(file)
             if col_name in df.columns:
-                monthly = df[col_name].resample('ME').last()
-                monthly_data[col_name] = monthly
+                series[col_name] = df[col_name]
     
-    if monthly_data:
-        df_monthly = pd.DataFrame(monthly_data)
-        
-        for col in df_monthly.columns:
-            df_monthly[f'DELTA_{col}'] = df_monthly[col].diff()
+    if not series:
+        print("  [ERRO] Nenhum dado disponivel")
+        return None
+    
+    daily = pd.DataFrame(series)
+    freqs = [freq for freq in config.FREQUENCIES
+             if freq in config.aggregation_freqs() or freq == 'M']
+    
+    aggregated = {}
+    
+    for freq in freqs:
+        spec = config.FREQUENCIES[freq]
+        df_freq = daily.copy() if spec['rule'] is None else daily.resample(spec['rule']).last()
         
-        output_path = 'data/processed/monthly_data.csv'
-        df_monthly.to_csv(output_path)
+        for col in series:
+            df_freq[f'DELTA_{col}'] = df_freq[col].diff()
         
-        print(f"  [OK] Dados mensais agregados: {len(df_monthly)} meses")
-        print(f"  [OK] Variaveis: {len(df_monthly.columns)} colunas")
-        print(f"  [OK] Salvo em {output_path}")
+        artifacts.write_frame(df_freq, spec['path'])
+        aggregated[freq] = df_freq
         
-        return df_monthly
+        print(f"  [OK] Frequencia {spec['label']:8s}: {len(df_freq):5d} obs -> {spec['path']}")
+    
+    print(f"  [OK] Variaveis: {len(aggregated['M'].columns)} colunas")
+    
+    return aggregated
+
+def update_indices():
+    """Modo incremental: estende os artefatos processados so com os dias novos
+    
+    O estado (janelas moveis, momentos, ultimas linhas) fica em
+    data/processed/stream_state.npz; na primeira execucao e montado a partir
+    do historico ja processado. Dias posteriores ao cursor da fonte mais
+    atrasada (precos, macro, volatilidade) sao reprocessados a cada execucao.
+    Um processamento completo (sem --update) renormaliza o historico e
+    descarta o estado.
+    """
+    print("\n[UPDATE] Atualizacao incremental dos indices...")
+    
+    engine = build_feature_engine()
+    
+    if os.path.exists(streaming.STATE_PATH):
+        stream = streaming.IndexStream.load()
+    elif artifacts.exists('data/processed/stress_index.csv'):
+        print("  [INFO] Estado nao encontrado; montando a partir do historico processado")
+        stream = streaming.IndexStream.initialize(engine.sources, engine.specs, config.FREQUENCIES,
+                                                  config.get_int('ROLLING_WINDOW', 90), config.sync_etfs,
+                                                  (config.get_float('ABSORPTION_FRACTION', 0.2),
+                                                   config.get_str('ABSORPTION_SOLVER', 'warm'),
+                                                   config.get_str('ABSORPTION_MATRIX', 'corr'),
+                                                   config.get_float('ABSORPTION_TOL', 1e-3)),
+                                                  config.sync_half_lives())
     else:
-        print("  [ERRO] Nenhum dado disponivel")
+        print("  [ERRO] Execute primeiro o processamento completo")
         return None
+    
+    start = stream.end_date
+    updates = stream.update(engine.sources)
+    
+    for path, (rows, replace_last) in updates.items():
+        if len(rows) or replace_last:
+            artifacts.append_frame(rows, path, replace_last=replace_last)
+            print(f"  [OK] {path}: +{len(rows) - replace_last} linhas"
+                  + (f" ({replace_last} reprocessadas)" if replace_last else ""))
+    
+    stream.save()
+    
+    if stream.end_date == start:
+        print(f"  [OK] Nenhum dado novo apos {start.date()}")
+    else:
+        print(f"  [OK] Indices estendidos de {start.date()} ate {stream.end_date.date()}")
+    if stream.last_date < stream.end_date:
+        print(f"  [INFO] Fontes atrasadas: dias apos {stream.last_date.date()} serao reprocessados "
+              f"na proxima atualizacao")
+    
+    return updates
 
 def generate_summary():
     """Gera resumo do processamento"""
@@ -192,13 +355,15 @@ def generate_summary():
         'data/processed/stress_index.csv': 'Indice de Estresse',
         'data/processed/exposure_proxy.csv': 'Proxy de Exposicao',
         'data/processed/defensive_concentration.csv': 'Concentracao Defensiva',
+        'data/processed/daily_data.csv': 'Dados Diarios (D)',
+        'data/processed/weekly_data.csv': 'Dados Semanais (W)',
         'data/processed/monthly_data.csv': 'Dados Mensais (VAR)'
     }
     
     for file, description in processed_files.items():
-        if os.path.exists(file):
-            df = pd.read_csv(file, index_col=0)
-            print(f"[OK] {description:30s} -> {len(df):5d} obs")
+        if artifacts.exists(file):
+            rows = artifacts.row_count(file)
+            print(f"[OK] {description:30s} -> {rows:5d} obs")
         else:
             print(f"[--] {description:30s} -> Nao gerado")
     
@@ -213,16 +378,17 @@ def main():
     print("Script 01: Processamento de Dados")
     print("="*60)
     
-    if not os.path.exists('data/raw/etf_prices.csv'):
+    if not artifacts.exists('data/raw/etf_prices.csv'):
         print("\n[ERRO] Dados brutos nao encontrados!")
         print("[ERRO] Execute primeiro: python scripts/00_download_data.py")
         return
     
-    returns = calculate_returns()
-    stress = construct_stress_index()
-    exposure = calculate_exposure_proxy()
-    defensive = calculate_defensive_concentration()
-    monthly = prepare_monthly_data()
+    if '--update' in sys.argv[1:]:
+        update_indices()
+        return
+    
+    outputs = compute_features()
+    aggregated = aggregate_frequencies()
     
     generate_summary()
 
@@ -11,52 +11,127 @@ matplotlib.use('Agg')  # Backend nao-interativo para evitar problemas de memoria
 import matplotlib.pyplot as plt
 import seaborn as sns
 from statsmodels.tsa.api import VAR
-from statsmodels.tsa.stattools import grangercausalitytests, adfuller
 import warnings
 import os
 warnings.filterwarnings('ignore')
 
+import artifacts
+import config
+import leadlag
+import model_cache
+import stationarity
+
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
-def check_stationarity(series, name):
-    """Testa estacionariedade usando Augmented Dickey-Fuller"""
-    result = adfuller(series.dropna())
-    
-    print(f"\n  Teste ADF para {name}:")
-    print(f"    ADF Statistic: {result[0]:.4f}")
-    print(f"    p-value: {result[1]:.4f}")
-    
-    if result[1] <= 0.05:
-        print(f"    -> Serie e estacionaria (p<0.05)")
-        return True
-    else:
-        print(f"    -> Serie NAO e estacionaria (p>0.05)")
-        return False
+# Artefatos de cada etapa (lidos pelo run_pipeline.py para montar o grafo
+# de dependencias e executar etapas independentes em paralelo)
+TASKS = {
+    'cross_correlation_analysis': {
+        'inputs': ['data/processed/monthly_data.csv'],
+        'outputs': ['figures/cross_correlation.png', 'output/ccf_significance.csv'],
+        'params': ['CCF_MAX_LAG', 'CCF_SURROGATES', 'CCF_SURROGATE_METHOD',
+                   'SIGNIFICANCE_LEVEL', 'RANDOM_SEED'],
+    },
+    'cross_correlation_screen': {
+        'inputs': ['data/processed/etf_returns.csv'],
+        'outputs': ['output/ccf_screen.npz', 'output/ccf_screen.csv'],
+        'params': ['CCF_SCREEN_MAX_LAG'],
+    },
+    'stationarity_screen': {
+        'inputs': ['data/processed/monthly_data.csv'],
+        'outputs': ['output/stationarity.csv'],
+        'params': ['SIGNIFICANCE_LEVEL', 'STATIONARITY_MAX_LAGS'],
+    },
+    'granger_causality_test': {
+        'inputs': ['data/processed/monthly_data.csv'],
+        'outputs': [],
+        'params': ['GRANGER_MAX_LAG', 'SIGNIFICANCE_LEVEL', 'STATIONARITY_MAX_DIFF'],
+    },
+    'granger_matrix_test': {
+        'inputs': ['data/processed/monthly_data.csv'],
+        'outputs': ['output/granger_matrix.csv'],
+        'params': ['GRANGER_MAX_LAG', 'GRANGER_VARIABLES', 'SIGNIFICANCE_LEVEL',
+                   'STATIONARITY_MAX_DIFF'],
+    },
+    'var_estimation': {
+        'inputs': ['data/processed/monthly_data.csv'],
+        'outputs': ['output/irf_bands.npz'],
+        'params': ['VAR_MAX_LAG', 'VAR_IC_CRITERION', 'IRF_HORIZON',
+                   'IRF_REPLICATIONS', 'RANDOM_SEED', 'SIGNIFICANCE_LEVEL'],
+    },
+    'render_impulse_response': {
+        # opcional: se o VAR falhar (sem bandas) so o grafico e pulado
+        'inputs': [],
+        'optional_inputs': ['output/irf_bands.npz'],
+        'outputs': ['figures/impulse_response.png'],
+    },
+    'rolling_var_monitor': {
+        'inputs': ['data/processed/monthly_data.csv'],
+        'outputs': ['output/rolling_leadlag.csv', 'figures/rolling_leadlag.png'],
+        'params': ['VAR_MAX_LAG', 'VAR_IC_CRITERION', 'ROLLING_VAR_WINDOW',
+                   'ROLLING_VAR_FORGETTING'],
+    },
+    'frequency_battery': {
+        'inputs': [],
+        'optional_inputs': ['data/processed/daily_data.csv',
+                            'data/processed/weekly_data.csv',
+                            'data/processed/monthly_data.csv'],
+        'outputs': ['output/leadlag_by_frequency.csv'],
+        'params': ['AGGREGATION_FREQ', 'CCF_MAX_LAG', 'GRANGER_MAX_LAG', 'VAR_MAX_LAG',
+                   'VAR_IC_CRITERION', 'CCF_SURROGATES', 'CCF_SURROGATE_METHOD',
+                   'RANDOM_SEED'],
+    },
+    'interpret_results': {
+        'inputs': [],
+        'after': ['cross_correlation_analysis', 'cross_correlation_screen',
+                  'stationarity_screen', 'granger_causality_test', 'granger_matrix_test',
+                  'var_estimation', 'render_impulse_response',
+                  'rolling_var_monitor', 'frequency_battery'],
+    },
+    'generate_summary': {
+        'inputs': [],
+        'after': ['interpret_results'],
+    },
+}
+
+# Bandas bootstrap da impulso-resposta (redesenhadas sem recalculo)
+IRF_BANDS_PATH = 'output/irf_bands.npz'
+
+# Criterios de informacao aceitos em VAR_IC_CRITERION
+VAR_CRITERIA = ('aic', 'bic', 'hqic', 'fpe')
+
+def make_stationary(data, cache):
+    """Diferencia automaticamente as colunas com raiz unitaria (ADF em lote)
+    
+    STATIONARITY_MAX_DIFF limita o numero de diferencas (0 desativa).
+    Devolve os dados transformados e a tabela de testes da ultima rodada.
+    """
+    data, summary = stationarity.auto_difference(
+        data, max_diff=config.get_int('STATIONARITY_MAX_DIFF', 1),
+        signif=config.get_float('SIGNIFICANCE_LEVEL', 0.05), cache=cache)
+    
+    print(f"\n  {'Serie':<24} {'ADF':>8} {'p ADF':>8} {'p KPSS':>8} {'Dif.':>5} {'Decisao'}")
+    print("  " + "-"*68)
+    for _, row in summary.iterrows():
+        print(f"  {row['series']:<24} {row['adf_stat']:8.3f} {row['adf_p_value']:8.4f} "
+              f"{row['kpss_p_value']:8.4f} {row['diff_order']:5d} {row['decision']}")
+    
+    differenced = summary.loc[summary['diff_order'] > 0, 'series'].tolist()
+    if differenced:
+        print(f"  [AVISO] Diferenciadas por raiz unitaria: {', '.join(differenced)}")
+    
+    return data, summary
 
 def compute_cross_correlation(x, y, max_lag=12):
-    """Calcula correlacao cruzada entre duas series"""
-    correlations = []
-    lags = range(-max_lag, max_lag + 1)
-    
-    for lag in lags:
-        if lag < 0:
-            corr = x.iloc[:lag].corr(y.iloc[-lag:])
-        elif lag > 0:
-            corr = x.iloc[lag:].corr(y.iloc[:-lag])
-        else:
-            corr = x.corr(y)
-        
-        correlations.append(corr)
-    
-    return pd.Series(correlations, index=lags)
+    """Calcula correlacao cruzada entre duas series (lag < 0: x precede y)"""
+    return leadlag.cross_correlation(x, y, max_lag)
 
 def cross_correlation_analysis():
     """Analise de correlacao cruzada"""
     print("\n[1/4] Analise de Correlacao Cruzada...")
     
-    monthly = pd.read_csv('data/processed/monthly_data.csv', 
-                          index_col=0, parse_dates=True)
+    monthly = artifacts.read_frame('data/processed/monthly_data.csv')
     
     if 'DELTA_EXPOSURE_RATIO' not in monthly.columns or 'DELTA_STRESS_INDEX' not in monthly.columns:
         print("  [ERRO] Variaveis necessarias nao encontradas")
@@ -69,14 +144,30 @@ def cross_correlation_analysis():
     exposure = exposure.loc[common_index]
     stress = stress.loc[common_index]
     
-    ccf = compute_cross_correlation(exposure, stress, max_lag=6)
-    
-    print(f"\n  Correlacoes Cruzadas (Exposure x Stress):")
-    print(f"  {'Lag':<6} {'Corr':<8} {'Interpretacao'}")
-    print("  " + "-"*50)
-    
-    for lag in range(-6, 7):
-        corr = ccf[lag]
+    # Significancia por surrogates: nula com a mesma autocorrelacao de Exposure
+    n_surrogates = config.get_int('CCF_SURROGATES', 2000)
+    method = config.get_str('CCF_SURROGATE_METHOD', 'iaaft').lower()
+    signif = config.get_float('SIGNIFICANCE_LEVEL', 0.05)
+    if method not in leadlag.SURROGATE_METHODS:
+        print(f"  [AVISO] CCF_SURROGATE_METHOD={method} invalido; usando iaaft")
+        method = 'iaaft'
+    
+    significance = leadlag.surrogate_ccf_test(exposure, stress, max_lag=config.get_int('CCF_MAX_LAG', 6),
+                                              n_surrogates=n_surrogates, method=method, signif=signif,
+                                              seed=config.get_int('RANDOM_SEED', 42))
+    significance.to_csv('output/ccf_significance.csv')
+    
+    # tabela, grafico e lag de pico usam a mesma amostra do teste
+    ccf = significance['corr']
+    if significance.attrs['n_obs'] < len(common_index):
+        print(f"  [INFO] CCF sobre as ultimas {significance.attrs['n_obs']} de {len(common_index)} "
+              f"observacoes (comprimento com FFT rapida para os surrogates)")
+    
+    print(f"\n  Correlacoes Cruzadas (Exposure x Stress), {n_surrogates} surrogates {method}:")
+    print(f"  {'Lag':<6} {'Corr':<8} {'P-valor':<10} {'Interpretacao'}")
+    print("  " + "-"*60)
+    
+    for lag, row in significance.iterrows():
         
         if lag < 0:
             interpretation = "Exposure precede Stress"
@@ -85,16 +176,22 @@ def cross_correlation_analysis():
         else:
             interpretation = "Contemporaneo"
         
-        marker = "***" if abs(corr) > 0.3 else ("**" if abs(corr) > 0.2 else "*" if abs(corr) > 0.1 else "")
-        print(f"  {lag:6d} {corr:8.3f} {marker:4s} {interpretation}")
+        p_value = row['p_value']
+        marker = "***" if p_value < 0.01 else ("**" if p_value < 0.05 else "*" if p_value < 0.10 else "")
+        print(f"  {lag:6d} {row['corr']:8.3f} {p_value:10.4f} {marker:4s} {interpretation}")
+    
+    print(f"\n  P-valor global (max |r| entre lags): {significance.attrs['p_value_global']:.4f}")
+    print(f"  [OK] Tabela salva: output/ccf_significance.csv")
     
     # Visualizar
     fig, axes = plt.subplots(1, 2, figsize=(12, 5))
     
     axes[0].stem(ccf.index, ccf.values, basefmt=" ")
     axes[0].axhline(y=0, color='k', linestyle='-', linewidth=0.5)
-    axes[0].axhline(y=0.2, color='r', linestyle='--', linewidth=0.5, alpha=0.5)
-    axes[0].axhline(y=-0.2, color='r', linestyle='--', linewidth=0.5, alpha=0.5)
+    axes[0].fill_between(significance.index, significance['lower'], significance['upper'],
+                         color='r', alpha=0.15, step='mid',
+                         label=f'Banda nula {100 * (1 - signif):.0f}% (surrogates)')
+    axes[0].legend(loc='best', fontsize=8)
     axes[0].set_xlabel('Lag (meses)')
     axes[0].set_ylabel('Correlacao')
     axes[0].set_title('Funcao de Correlacao Cruzada\nDelta-Exposure x Delta-Stress')
@@ -122,12 +219,62 @@ def cross_correlation_analysis():
     
     return ccf
 
+def cross_correlation_screen():
+    """Correlacao cruzada de todos os pares de ETFs em todas as defasagens"""
+    print("\n[1b/4] Screen Lead-Lag do Universo (retornos diarios)...")
+    
+    returns = artifacts.read_frame('data/processed/etf_returns.csv')
+    max_lag = config.get_int('CCF_SCREEN_MAX_LAG', 20)
+    
+    if returns.shape[1] < 2:
+        print("  [ERRO] Necessario ao menos 2 ETFs")
+        return None
+    
+    lags, pairs, ccf = leadlag.cross_correlation_matrix(returns, max_lag)
+    
+    np.savez('output/ccf_screen.npz', lags=lags, ccf=ccf,
+             x=np.array([a for a, _ in pairs]), y=np.array([b for _, b in pairs]))
+    summary = leadlag.summarize_ccf(lags, pairs, ccf)
+    summary.to_csv('output/ccf_screen.csv', index=False)
+    
+    print(f"  [OK] {len(pairs)} pares x {len(lags)} defasagens (max_lag={lags[-1]} dias)")
+    print(f"\n  {'Par':<20} {'Lag':>5} {'Corr':>8}")
+    print("  " + "-"*35)
+    for _, row in summary.head(5).iterrows():
+        print(f"  {row['x'] + ' x ' + row['y']:<20} {row['peak_lag']:5d} {row['peak_corr']:8.3f}")
+    
+    print(f"\n  [OK] Matriz salva em output/ccf_screen.npz; resumo em output/ccf_screen.csv")
+    
+    return summary
+
+def stationarity_screen():
+    """ADF + KPSS em lote de todas as series mensais (niveis e variacoes)"""
+    print("\n[1c/4] Testes de Estacionariedade em Lote...")
+    
+    monthly = artifacts.read_frame('data/processed/monthly_data.csv')
+    maxlags = [None if lag.lower() == 'auto' else int(lag)
+               for lag in config.get_list('STATIONARITY_MAX_LAGS', ['auto'])]
+    signif = config.get_float('SIGNIFICANCE_LEVEL', 0.05)
+    
+    table = stationarity.stationarity_table(monthly, maxlags=maxlags, signif=signif,
+                                            n_jobs=config.n_jobs(), cache=model_cache.ModelCache())
+    
+    output_path = 'output/stationarity.csv'
+    table.to_csv(output_path, index=False)
+    
+    counts = table['decision'].value_counts()
+    print(f"  [OK] {len(table)} testes ({monthly.shape[1]} series x {len(maxlags)} defasagens maximas)")
+    for decision, count in counts.items():
+        print(f"    {decision:<14} {count:4d}")
+    print(f"  [OK] Tabela salva em {output_path}")
+    
+    return table
+
 def granger_causality_test():
     """Teste de Causalidade de Granger"""
     print("\n[2/4] Teste de Causalidade de Granger...")
     
-    monthly = pd.read_csv('data/processed/monthly_data.csv', 
-                          index_col=0, parse_dates=True)
+    monthly = artifacts.read_frame('data/processed/monthly_data.csv')
     
     data = monthly[['DELTA_STRESS_INDEX', 'DELTA_EXPOSURE_RATIO']].dropna()
     
@@ -137,144 +284,369 @@ def granger_causality_test():
     
     print(f"  Dados: {len(data)} observacoes mensais")
     
-    print("\n  Verificando estacionariedade...")
-    check_stationarity(data['DELTA_STRESS_INDEX'], 'Delta-Stress')
-    check_stationarity(data['DELTA_EXPOSURE_RATIO'], 'Delta-Exposure')
-    
-    # Teste 1
-    print("\n  " + "="*50)
-    print("  TESTE 1: Delta-Exposure -> Delta-Stress")
-    print("  H0: Delta-Exposure NAO causa Granger Delta-Stress")
-    print("  " + "="*50)
+    print("\n  Verificando estacionariedade (ADF + KPSS)...")
+    cache = model_cache.ModelCache()
+    data, _ = make_stationary(data, cache)
+    
+    max_lag = config.get_int('GRANGER_MAX_LAG', 6)
+    table, hit = cache.get_or_compute(
+        'granger', data, {'max_lag': max_lag},
+        lambda: leadlag.granger_matrix(data, max_lag))
+    if hit:
+        print("\n  [INFO] Estatisticas reaproveitadas do cache de modelos")
+    
+    tests = [
+        ('TESTE 1', 'DELTA_EXPOSURE_RATIO', 'DELTA_STRESS_INDEX', 'Delta-Exposure', 'Delta-Stress'),
+        ('TESTE 2', 'DELTA_STRESS_INDEX', 'DELTA_EXPOSURE_RATIO', 'Delta-Stress', 'Delta-Exposure'),
+    ]
+    
+    for title, cause, effect, cause_label, effect_label in tests:
+        print("\n  " + "="*50)
+        print(f"  {title}: {cause_label} -> {effect_label}")
+        print(f"  H0: {cause_label} NAO causa Granger {effect_label}")
+        print("  " + "="*50)
+        print_granger_table(table[(table['cause'] == cause) & (table['effect'] == effect)])
+    
+    return table
+
+def print_granger_table(rows):
+    """Imprime F-stat e p-valor por defasagem"""
+    print(f"\n  {'Lag':<6} {'F-stat':<10} {'p-value':<10} {'Resultado'}")
+    print("  " + "-"*50)
     
-    try:
-        result_1 = grangercausalitytests(
-            data[['DELTA_STRESS_INDEX', 'DELTA_EXPOSURE_RATIO']], 
-            maxlag=6,
-            verbose=False
-        )
+    for _, row in rows.iterrows():
+        p_value = row['p_value']
         
-        print(f"\n  {'Lag':<6} {'F-stat':<10} {'p-value':<10} {'Resultado'}")
-        print("  " + "-"*50)
+        if p_value < 0.01:
+            result = "Rejeita H0 ***"
+        elif p_value < 0.05:
+            result = "Rejeita H0 **"
+        elif p_value < 0.10:
+            result = "Rejeita H0 *"
+        else:
+            result = "Nao rejeita H0"
         
-        for lag in range(1, 7):
-            f_stat = result_1[lag][0]['ssr_ftest'][0]
-            p_value = result_1[lag][0]['ssr_ftest'][1]
-            
-            if p_value < 0.01:
-                result = "Rejeita H0 ***"
-            elif p_value < 0.05:
-                result = "Rejeita H0 **"
-            elif p_value < 0.10:
-                result = "Rejeita H0 *"
-            else:
-                result = "Nao rejeita H0"
-            
-            print(f"  {lag:<6} {f_stat:<10.3f} {p_value:<10.4f} {result}")
+        print(f"  {row['lag']:<6} {row['f_stat']:<10.3f} {p_value:<10.4f} {result}")
+
+def granger_matrix_test():
+    """Causalidade de Granger de todos os pares ordenados de GRANGER_VARIABLES"""
+    print("\n[2b/4] Matriz de Causalidade de Granger...")
     
-    except Exception as e:
-        print(f"  [ERRO] Erro no teste: {str(e)}")
+    monthly = artifacts.read_frame('data/processed/monthly_data.csv')
     
-    # Teste 2
-    print("\n  " + "="*50)
-    print("  TESTE 2: Delta-Stress -> Delta-Exposure")
-    print("  H0: Delta-Stress NAO causa Granger Delta-Exposure")
-    print("  " + "="*50)
+    default = [col for col in monthly.columns if col.startswith('DELTA_')]
+    variables = [col for col in config.get_list('GRANGER_VARIABLES', default) if col in monthly.columns]
+    data = monthly[variables].dropna()
     
-    try:
-        result_2 = grangercausalitytests(
-            data[['DELTA_EXPOSURE_RATIO', 'DELTA_STRESS_INDEX']], 
-            maxlag=6,
-            verbose=False
-        )
-        
-        print(f"\n  {'Lag':<6} {'F-stat':<10} {'p-value':<10} {'Resultado'}")
-        print("  " + "-"*50)
-        
-        for lag in range(1, 7):
-            f_stat = result_2[lag][0]['ssr_ftest'][0]
-            p_value = result_2[lag][0]['ssr_ftest'][1]
-            
-            if p_value < 0.01:
-                result = "Rejeita H0 ***"
-            elif p_value < 0.05:
-                result = "Rejeita H0 **"
-            elif p_value < 0.10:
-                result = "Rejeita H0 *"
-            else:
-                result = "Nao rejeita H0"
-            
-            print(f"  {lag:<6} {f_stat:<10.3f} {p_value:<10.4f} {result}")
+    if len(variables) < 2 or len(data) < 30:
+        print(f"  [ERRO] Dados insuficientes: {len(variables)} variaveis, {len(data)} observacoes")
+        return None
     
-    except Exception as e:
-        print(f"  [ERRO] Erro no teste: {str(e)}")
+    cache = model_cache.ModelCache()
+    data, _ = make_stationary(data, cache)
+    
+    max_lag = config.get_int('GRANGER_MAX_LAG', 6)
+    table, hit = cache.get_or_compute(
+        'granger', data, {'max_lag': max_lag},
+        lambda: leadlag.granger_matrix(data, max_lag, n_jobs=config.n_jobs()))
+    if hit:
+        print("  [INFO] Estatisticas reaproveitadas do cache de modelos")
+    
+    output_path = 'output/granger_matrix.csv'
+    table.to_csv(output_path, index=False)
     
-    return result_1, result_2
+    significant = table[table['p_value'] < config.get_float('SIGNIFICANCE_LEVEL', 0.05)]
+    print(f"  [OK] {len(variables)} variaveis, {len(table)} testes (lags 1-{max_lag})")
+    print(f"  [OK] {len(significant)} testes significantes")
+    print(f"  [OK] Tabela salva em {output_path}")
+    
+    return table
+
+def var_criterion():
+    """Criterio de selecao de ordem do VAR (VAR_IC_CRITERION)"""
+    criterion = config.get_str('VAR_IC_CRITERION', 'aic').lower()
+    if criterion not in VAR_CRITERIA:
+        raise ValueError(f"VAR_IC_CRITERION invalido: {criterion} (opcoes: {', '.join(VAR_CRITERIA)})")
+    return criterion
+
+def estimate_var(data, max_lag, criterion):
+    """Selecao de ordem (uma unica QR) e estimacao do VAR; resultado serializavel"""
+    lag_order = leadlag.select_var_order(data, max_lag)
+    selected = lag_order['selected'][criterion]
+    
+    # Ordem 0 (so constante) nao tem dinamica para impulso-resposta
+    optimal_lag = max(selected, 1)
+    results = VAR(data).fit(optimal_lag)
+    
+    fit = {
+        'lag': optimal_lag,
+        'selected_lag': selected,
+        'names': np.array(data.columns, dtype=str),
+        'params': results.params.to_numpy(),
+        'sigma_u': results.sigma_u.to_numpy(),
+    }
+    for name in VAR_CRITERIA:
+        fit[f'ic_{name}'] = lag_order[name]
+    
+    return fit
+
+def discard_irf_bands():
+    """Remove bandas de uma execucao anterior (o grafico nao deve reusa-las)"""
+    if os.path.exists(IRF_BANDS_PATH):
+        os.remove(IRF_BANDS_PATH)
 
 def var_estimation():
     """Estima modelo VAR e cria impulso-resposta simplificado"""
     print("\n[3/4] Estimacao de Modelo VAR...")
     
-    monthly = pd.read_csv('data/processed/monthly_data.csv', 
-                          index_col=0, parse_dates=True)
+    monthly = artifacts.read_frame('data/processed/monthly_data.csv')
     
     data = monthly[['DELTA_STRESS_INDEX', 'DELTA_EXPOSURE_RATIO']].dropna()
     
     if len(data) < 30:
         print(f"  [ERRO] Dados insuficientes para VAR")
+        discard_irf_bands()
         return None
     
+    max_lag = config.get_int('VAR_MAX_LAG', 6)
+    criterion = var_criterion()
+    cache = model_cache.ModelCache()
+    
     try:
-        model = VAR(data)
-        lag_order = model.select_order(maxlags=6)
-        optimal_lag = lag_order.aic
-        
-        print(f"  Lag otimo (AIC): {optimal_lag}")
-        
-        results = model.fit(optimal_lag)
+        fit, hit = cache.get_or_compute('var', data, {'max_lag': max_lag, 'criterion': criterion},
+                                        lambda: estimate_var(data, max_lag, criterion))
+        optimal_lag = fit['lag']
         
-        print(f"\n  [OK] Modelo VAR({optimal_lag}) estimado")
+        print(f"  Lag otimo ({criterion.upper()}): {fit['selected_lag']}")
+        if fit['selected_lag'] == 0:
+            print(f"  [AVISO] Ordem 0 selecionada; usando VAR(1) para impulso-resposta")
         
-        print(f"\n  Gerando funcoes de impulso-resposta...")
-        irf = results.irf(10)
+        status = "reaproveitado do cache" if hit else "estimado"
+        print(f"\n  [OK] Modelo VAR({optimal_lag}) {status}")
         
-        fig = plt.figure(figsize=(10, 6))
+        params = {
+            'lag': optimal_lag,
+            'horizon': config.get_int('IRF_HORIZON', 10),
+            'replications': config.get_int('IRF_REPLICATIONS', 2000),
+            'signif': config.get_float('SIGNIFICANCE_LEVEL', 0.05),
+            'seed': config.get_int('RANDOM_SEED', 42),
+        }
         
-        plt.subplot(2, 2, 1)
-        irf.plot(impulse='DELTA_EXPOSURE_RATIO',
-                 response='DELTA_STRESS_INDEX')
-        plt.title('Impulso: Exposure -> Resposta: Stress')
-        plt.grid(True, alpha=0.3)
+        print(f"\n  Gerando funcoes de impulso-resposta ({params['replications']} replicacoes bootstrap)...")
+        bands, hit = cache.get_or_compute(
+            'irf_bootstrap', data, params,
+            lambda: leadlag.bootstrap_irf(data, optimal_lag, horizon=params['horizon'],
+                                          replications=params['replications'],
+                                          signif=params['signif'], seed=params['seed'],
+                                          n_jobs=config.n_jobs()))
+        if hit:
+            print("  [INFO] Bandas reaproveitadas do cache de modelos")
+        leadlag.save_irf_bands(IRF_BANDS_PATH, bands)
+        print(f"  [OK] Bandas salvas em {IRF_BANDS_PATH}")
         
-        plt.subplot(2, 2, 2)
-        irf.plot(impulse='DELTA_STRESS_INDEX',
-                 response='DELTA_EXPOSURE_RATIO')
-        plt.title('Impulso: Stress -> Resposta: Exposure')
-        plt.grid(True, alpha=0.3)
+        return fit
         
-        plt.subplot(2, 2, 3)
-        irf.plot(impulse='DELTA_EXPOSURE_RATIO',
-                 response='DELTA_EXPOSURE_RATIO')
-        plt.title('Impulso: Exposure -> Resposta: Exposure')
-        plt.grid(True, alpha=0.3)
+    except Exception as e:
+        print(f"  [ERRO] Erro na estimacao VAR: {str(e)}")
+        print(f"  [INFO] Pulando geracao de graficos de impulso-resposta")
+        discard_irf_bands()
+        return None
+
+def rolling_var_monitor():
+    """VAR/Granger em janela movel com atualizacao recursiva"""
+    print("\n[3b/4] Monitor Lead-Lag em Janela Movel...")
+    
+    monthly = artifacts.read_frame('data/processed/monthly_data.csv')
+    data = monthly[['DELTA_EXPOSURE_RATIO', 'DELTA_STRESS_INDEX']].dropna()
+    
+    max_lag = config.get_int('VAR_MAX_LAG', 6)
+    window = config.get_int('ROLLING_VAR_WINDOW', 60) or None
+    forgetting = config.get_float('ROLLING_VAR_FORGETTING', 1.0)
+    criterion = var_criterion()
+    
+    params = {'max_lag': max_lag, 'window': window, 'forgetting': forgetting,
+              'criterion': criterion}
+    rolling, hit = model_cache.ModelCache().get_or_compute(
+        'rolling_var', data, params,
+        lambda: leadlag.rolling_leadlag(data, 'DELTA_EXPOSURE_RATIO', 'DELTA_STRESS_INDEX',
+                                        max_lag, window=window, forgetting=forgetting,
+                                        criterion=criterion))
+    if hit:
+        print("  [INFO] Serie reaproveitada do cache de modelos")
+    
+    if rolling.empty:
+        print(f"  [ERRO] Dados insuficientes: {len(data)} observacoes para janela de {window}")
+        return None
+    
+    output_path = 'output/rolling_leadlag.csv'
+    rolling.to_csv(output_path)
+    
+    fig, axes = plt.subplots(3, 1, figsize=(12, 9), sharex=True)
+    
+    axes[0].plot(rolling.index, rolling['p_value'], label='Exposure -> Stress')
+    axes[0].plot(rolling.index, rolling['p_value_reverse'], label='Stress -> Exposure', alpha=0.7)
+    axes[0].axhline(y=0.05, color='r', linestyle='--', linewidth=0.5)
+    axes[0].set_ylabel('p-valor (Granger)')
+    axes[0].set_title(f'Lead-Lag em Janela Movel ({window or "expansiva"} meses)')
+    axes[0].legend()
+    axes[0].grid(True, alpha=0.3)
+    
+    axes[1].step(rolling.index, rolling['opt_lag'], where='post')
+    axes[1].set_ylabel(f'Lag otimo ({criterion.upper()})')
+    axes[1].grid(True, alpha=0.3)
+    
+    axes[2].plot(rolling.index, rolling['irf_peak'])
+    axes[2].axhline(y=0, color='k', linestyle='-', linewidth=0.5)
+    axes[2].set_ylabel('Pico IRF (Exposure -> Stress)')
+    axes[2].set_xlabel('Data')
+    axes[2].grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    plt.savefig('figures/rolling_leadlag.png', dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    
+    significant = (rolling['p_value'] < 0.05).mean()
+    print(f"  [OK] {len(rolling)} janelas estimadas (max_lag={max_lag}, {criterion.upper()})")
+    print(f"  [OK] Exposure -> Stress significante em {significant:.0%} das janelas")
+    print(f"  [OK] Ultima janela: lag {rolling['opt_lag'].iloc[-1]}, "
+          f"p={rolling['p_value'].iloc[-1]:.4f}")
+    print(f"  [OK] Serie salva em {output_path}; grafico em figures/rolling_leadlag.png")
+    
+    return rolling
+
+def leadlag_battery(data, ccf_lag, granger_lag, var_lag, criterion, n_surrogates, method, seed):
+    """CCF com surrogates, ordem do VAR e Granger nos dois sentidos para uma frequencia"""
+    exposure, stress = data['DELTA_EXPOSURE_RATIO'], data['DELTA_STRESS_INDEX']
+    
+    ccf = leadlag.surrogate_ccf_test(exposure, stress, ccf_lag, n_surrogates=n_surrogates,
+                                     method=method, seed=seed)
+    leads = ccf[ccf.index < 0]
+    peak = leads['p_value'].idxmin()
+    
+    selected = leadlag.select_var_order(data, var_lag)['selected'][criterion]
+    lag = min(max(selected, 1), granger_lag)
+    granger = leadlag.granger_matrix(data, lag, lags=[lag]).set_index('cause')['p_value']
+    
+    return {
+        'n_obs': len(data),
+        'ccf_lead_lag': int(-peak),
+        'ccf_lead_corr': float(leads.loc[peak, 'corr']),
+        'ccf_lead_p_value': float(leads.loc[peak, 'p_value']),
+        'ccf_p_value_global': float(ccf.attrs['p_value_global']),
+        'var_lag': int(selected),
+        'granger_lag': int(lag),
+        'granger_p_value': float(granger['DELTA_EXPOSURE_RATIO']),
+        'granger_p_value_reverse': float(granger['DELTA_STRESS_INDEX']),
+    }
+
+def frequency_battery():
+    """Bateria lead-lag (CCF, VAR, Granger) em cada frequencia de AGGREGATION_FREQ
+    
+    Defasagens maximas sao declaradas em meses e convertidas para periodos
+    de cada frequencia (ex.: CCF_MAX_LAG=6 -> 126 dias uteis).
+    """
+    print("\n[3c/4] Lead-Lag por Frequencia (D/W/M)...")
+    
+    criterion = var_criterion()
+    n_surrogates = config.get_int('CCF_SURROGATES', 2000)
+    method = config.get_str('CCF_SURROGATE_METHOD', 'iaaft').lower()
+    if method not in leadlag.SURROGATE_METHODS:
+        method = 'iaaft'
+    seed = config.get_int('RANDOM_SEED', 42)
+    cache = model_cache.ModelCache()
+    
+    rows = []
+    
+    for freq in config.aggregation_freqs():
+        spec = config.FREQUENCIES[freq]
+        if not artifacts.exists(spec['path']):
+            print(f"  [AVISO] {spec['path']} nao encontrado; rode 01_process_data.py")
+            continue
         
-        plt.subplot(2, 2, 4)
-        irf.plot(impulse='DELTA_STRESS_INDEX',
-                 response='DELTA_STRESS_INDEX')
-        plt.title('Impulso: Stress -> Resposta: Stress')
-        plt.grid(True, alpha=0.3)
+        frame = artifacts.read_frame(spec['path'])
+        data = frame[['DELTA_EXPOSURE_RATIO', 'DELTA_STRESS_INDEX']].dropna()
         
-        plt.tight_layout()
-        plt.savefig('figures/impulse_response.png', dpi=100, bbox_inches='tight')
-        plt.close(fig)
-        print(f"  [OK] Grafico salvo: figures/impulse_response.png")
+        per_month = spec['per_month']
+        params = {
+            'ccf_lag': config.get_int('CCF_MAX_LAG', 6) * per_month,
+            'granger_lag': config.get_int('GRANGER_MAX_LAG', 6) * per_month,
+            'var_lag': config.get_int('VAR_MAX_LAG', 6) * per_month,
+            'criterion': criterion, 'n_surrogates': n_surrogates,
+            'method': method, 'seed': seed,
+        }
         
-        return results
+        if len(data) < 30 or len(data) <= 4 * params['var_lag']:
+            print(f"  [AVISO] Frequencia {spec['label']}: dados insuficientes ({len(data)} obs)")
+            continue
         
-    except Exception as e:
-        print(f"  [ERRO] Erro na estimacao VAR: {str(e)}")
-        print(f"  [INFO] Pulando geracao de graficos de impulso-resposta")
+        result, hit = cache.get_or_compute('frequency_battery', data, params,
+                                           lambda: leadlag_battery(data, **params))
+        rows.append({'freq': freq, **result})
+        status = " (cache)" if hit else ""
+        print(f"  [OK] {spec['label']:8s}: {len(data)} obs, lags ate {params['ccf_lag']}{status}")
+    
+    if not rows:
+        print("  [ERRO] Nenhuma frequencia disponivel")
+        return None
+    
+    table = pd.DataFrame(rows).set_index('freq')
+    output_path = 'output/leadlag_by_frequency.csv'
+    table.to_csv(output_path)
+    
+    print(f"\n  {'Freq':<6} {'Lead':>5} {'Corr':>8} {'p (CCF)':>9} {'VAR':>5} "
+          f"{'p E->S':>8} {'p S->E':>8}")
+    print("  " + "-"*55)
+    for freq, row in table.iterrows():
+        print(f"  {freq:<6} {row['ccf_lead_lag']:5.0f} {row['ccf_lead_corr']:8.3f} "
+              f"{row['ccf_lead_p_value']:9.4f} {row['var_lag']:5.0f} "
+              f"{row['granger_p_value']:8.4f} {row['granger_p_value_reverse']:8.4f}")
+    
+    print(f"\n  Lead: defasagem (periodos da frequencia) em que Exposure precede Stress")
+    print(f"  [OK] Tabela salva em {output_path}")
+    
+    return table
+
+def render_impulse_response():
+    """Desenha impulso-resposta com bandas bootstrap a partir do arquivo salvo"""
+    print("\n  Desenhando impulso-resposta...")
+    
+    if not os.path.exists(IRF_BANDS_PATH):
+        print(f"  [ERRO] Bandas nao encontradas: {IRF_BANDS_PATH}")
         return None
+    
+    bands = leadlag.load_irf_bands(IRF_BANDS_PATH)
+    names = list(bands['names'])
+    steps = np.arange(bands['horizon'] + 1)
+    coverage = 1 - bands['signif']
+    
+    panels = [
+        ('DELTA_EXPOSURE_RATIO', 'DELTA_STRESS_INDEX', 'Impulso: Exposure -> Resposta: Stress'),
+        ('DELTA_STRESS_INDEX', 'DELTA_EXPOSURE_RATIO', 'Impulso: Stress -> Resposta: Exposure'),
+        ('DELTA_EXPOSURE_RATIO', 'DELTA_EXPOSURE_RATIO', 'Impulso: Exposure -> Resposta: Exposure'),
+        ('DELTA_STRESS_INDEX', 'DELTA_STRESS_INDEX', 'Impulso: Stress -> Resposta: Stress'),
+    ]
+    
+    fig = plt.figure(figsize=(10, 6))
+    
+    for position, (impulse, response, title) in enumerate(panels, start=1):
+        i, j = names.index(response), names.index(impulse)
+        
+        plt.subplot(2, 2, position)
+        plt.plot(steps, bands['irf'][:, i, j], color='b')
+        plt.fill_between(steps, bands['lower'][:, i, j], bands['upper'][:, i, j],
+                         color='b', alpha=0.2, label=f'Bootstrap {coverage:.0%}')
+        plt.axhline(y=0, color='k', linewidth=0.5)
+        plt.title(title)
+        plt.grid(True, alpha=0.3)
+    
+    plt.legend(loc='best', fontsize=8)
+    plt.tight_layout()
+    plt.savefig('figures/impulse_response.png', dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    print(f"  [OK] Grafico salvo: figures/impulse_response.png "
+          f"(VAR({bands['lag']}), {bands['replications']} replicacoes)")
+    
+    return bands
 
 def interpret_results():
     """Interpreta os resultados"""
@@ -308,7 +680,12 @@ def generate_summary():
     
     outputs = {
         'figures/cross_correlation.png': 'Correlacao cruzada',
-        'figures/impulse_response.png': 'Impulso-resposta VAR'
+        'figures/impulse_response.png': 'Impulso-resposta VAR',
+        'output/ccf_screen.csv': 'Screen lead-lag (todos os pares)',
+        'output/stationarity.csv': 'Testes de estacionariedade',
+        'output/granger_matrix.csv': 'Matriz de Granger',
+        'figures/rolling_leadlag.png': 'Lead-lag em janela movel',
+        'output/leadlag_by_frequency.csv': 'Lead-lag por frequencia'
     }
     
     for file, description in outputs.items():
@@ -328,17 +705,25 @@ def main():
     print("Script 02: Analise Lead-Lag e Causalidade de Granger")
     print("="*60)
     
-    if not os.path.exists('data/processed/monthly_data.csv'):
+    if not artifacts.exists('data/processed/monthly_data.csv'):
         print("\n[ERRO] Dados processados nao encontrados!")
         print("[ERRO] Execute primeiro: python scripts/01_process_data.py")
         return
     
     os.makedirs('figures', exist_ok=True)
+    os.makedirs('output', exist_ok=True)
     plt.close('all')
     
     cross_correlation_analysis()
+    if artifacts.exists('data/processed/etf_returns.csv'):
+        cross_correlation_screen()
+    stationarity_screen()
     granger_causality_test()
-    var_estimation()
+    granger_matrix_test()
+    if var_estimation() is not None:
+        render_impulse_response()
+    rolling_var_monitor()
+    frequency_battery()
     interpret_results()
     
     plt.close('all')
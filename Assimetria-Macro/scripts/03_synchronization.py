@@ -15,55 +15,146 @@ import warnings
 import os
 warnings.filterwarnings('ignore')
 
+import artifacts
+import config
+import events as event_engine
+import resampling
+import synchrony
+
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
+# Artefatos de cada etapa (lidos pelo run_pipeline.py para montar o grafo
+# de dependencias e executar etapas independentes em paralelo)
+TASKS = {
+    'calculate_rolling_correlation': {
+        'inputs': ['data/processed/etf_returns.csv'],
+        'outputs': ['data/processed/synchronization_index.csv'],
+        'params': ['ROLLING_WINDOW', 'SYNC_ETFS', 'SYNC_PAIR_COLUMNS', 'SYNC_MODE', 'SYNC_HALF_LIVES'],
+    },
+    'calculate_absorption_ratio': {
+        'inputs': ['data/processed/etf_returns.csv'],
+        'outputs': ['data/processed/absorption_ratio.csv'],
+        'params': ['ROLLING_WINDOW', 'SYNC_ETFS', 'ABSORPTION_FRACTION', 'ABSORPTION_SOLVER',
+                   'ABSORPTION_MATRIX', 'ABSORPTION_TOL'],
+    },
+    'compare_periods': {
+        'inputs': ['data/processed/synchronization_index.csv',
+                   'data/processed/stress_index.csv'],
+        'optional_inputs': ['data/processed/absorption_ratio.csv'],
+        'outputs': ['figures/synchronization_analysis.png', 'output/regime_tests.csv'],
+        'params': ['ROLLING_WINDOW', 'REGIME_QUANTILES', 'REGIME_RESAMPLES', 'REGIME_BLOCK',
+                   'RANDOM_SEED'],
+    },
+    'event_study_defensive': {
+        'inputs': ['data/processed/defensive_concentration.csv',
+                   'data/processed/stress_index.csv',
+                   'data/processed/etf_returns.csv'],
+        'outputs': ['output/stress_events.csv', 'output/event_study.csv'],
+        'params': ['STRESS_THRESHOLD', 'EVENT_THRESHOLDS', 'EVENT_STRESS_COLUMNS', 'EVENT_WINDOW'],
+    },
+    'generate_comprehensive_report': {
+        'inputs': ['data/processed/etf_returns.csv',
+                   'data/processed/stress_index.csv',
+                   'data/processed/synchronization_index.csv',
+                   'data/processed/defensive_concentration.csv',
+                   'data/processed/exposure_proxy.csv'],
+        'outputs': ['figures/comprehensive_report.png'],
+    },
+    'generate_summary': {
+        'inputs': [],
+        'after': ['compare_periods', 'event_study_defensive',
+                  'generate_comprehensive_report'],
+    },
+}
+
 def calculate_rolling_correlation():
-    """Calcula correlacao rolling entre ETFs"""
+    """Calcula correlacao rolling entre ETFs (todos os pares de uma vez)"""
     print("\n[1/4] Calculando correlacao rolling entre ETFs...")
     
-    returns = pd.read_csv('data/processed/etf_returns.csv', 
-                          index_col=0, parse_dates=True)
+    returns = artifacts.read_frame('data/processed/etf_returns.csv')
     
-    china_etfs = ['FXI', 'MCHI', 'KWEB']
-    available_etfs = [etf for etf in china_etfs if etf in returns.columns]
+    available_etfs = config.sync_etfs(returns.columns)
     
     if len(available_etfs) < 2:
         print(f"  [ERRO] ETFs insuficientes. Disponiveis: {available_etfs}")
         return None
     
-    print(f"  ETFs analisados: {', '.join(available_etfs)}")
-    
-    window = 90
-    correlations = {}
+    window = config.get_int('ROLLING_WINDOW', 90)
+    pair_columns = config.get_bool('SYNC_PAIR_COLUMNS', True)
+    n_pairs = len(available_etfs) * (len(available_etfs) - 1) // 2
     
-    for i, etf1 in enumerate(available_etfs):
-        for etf2 in available_etfs[i+1:]:
-            pair_name = f"{etf1}_{etf2}"
-            rolling_corr = returns[etf1].rolling(window).corr(returns[etf2])
-            correlations[pair_name] = rolling_corr
-            print(f"  -> {pair_name}: corr media = {rolling_corr.mean():.3f}")
+    if len(available_etfs) <= 10:
+        print(f"  ETFs analisados: {', '.join(available_etfs)}")
+    else:
+        print(f"  ETFs analisados: {len(available_etfs)} ({n_pairs} pares)")
     
-    df_corr = pd.DataFrame(correlations)
-    df_corr['SYNC_INDEX'] = df_corr.mean(axis=1)
+    half_lives = config.sync_half_lives()
+    if half_lives is None:
+        df_corr = synchrony.sync_index(returns[available_etfs], window, pair_columns=pair_columns)
+    else:
+        # Modo EWMA: SYNC_INDEX usa a primeira meia-vida; as demais viram colunas proprias
+        df_corr, _ = synchrony.ewma_sync_index(returns[available_etfs], half_lives, pair_columns=pair_columns)
+        print(f"  Modo EWMA, meias-vidas: {', '.join(f'{h:g}' for h in half_lives)} dias")
+        for column in df_corr.columns[df_corr.columns.str.startswith('SYNC_INDEX_HL')]:
+            print(f"  -> {column}: media = {df_corr[column].mean():.3f}")
+    
+    if pair_columns and n_pairs <= 10:
+        for pair_name in df_corr.columns[~df_corr.columns.str.startswith('SYNC_INDEX')]:
+            print(f"  -> {pair_name}: corr media = {df_corr[pair_name].mean():.3f}")
+    elif not pair_columns:
+        print(f"  -> Apenas SYNC_INDEX (SYNC_PAIR_COLUMNS=False): media = {df_corr['SYNC_INDEX'].mean():.3f}")
     
     output_path = 'data/processed/synchronization_index.csv'
-    df_corr.to_csv(output_path)
+    artifacts.write_frame(df_corr, output_path)
     
     print(f"\n  [OK] Indice de sincronizacao calculado")
     print(f"  [OK] Salvo em {output_path}")
     
     return df_corr
 
+def calculate_absorption_ratio():
+    """Razao de absorcao: participacao dos maiores autovalores da correlacao rolling"""
+    print("\n[1b/4] Calculando razao de absorcao (autovalores da correlacao rolling)...")
+    
+    returns = artifacts.read_frame('data/processed/etf_returns.csv')
+    available_etfs = config.sync_etfs(returns.columns)
+    
+    if len(available_etfs) < 2:
+        print(f"  [ERRO] ETFs insuficientes. Disponiveis: {available_etfs}")
+        return None
+    
+    window = config.get_int('ROLLING_WINDOW', 90)
+    fraction = config.get_float('ABSORPTION_FRACTION', 0.2)
+    solver = config.get_str('ABSORPTION_SOLVER', 'warm')
+    matrix = config.get_str('ABSORPTION_MATRIX', 'corr')
+    tol = config.get_float('ABSORPTION_TOL', 1e-3)
+    
+    absorption, tracker = synchrony.absorption_ratio(returns[available_etfs], window, fraction,
+                                                     solver, matrix, tol)
+    
+    windows = int(absorption['N_ASSETS'].notna().sum())
+    print(f"  ETFs: {len(available_etfs)} | Autovetores na razao: {tracker.components(len(available_etfs))} "
+          f"| Janela: {window} dias | Matriz: {matrix}")
+    print(f"  Solver {solver}: {windows - tracker.exact} janelas com partida a quente "
+          f"({tracker.iterations} iteracoes; {tracker.approximated} com a cauda do ruido "
+          f"aproximada, tol {tol:g}), {tracker.exact} exatas")
+    print(f"  -> ABSORPTION_RATIO medio: {absorption['ABSORPTION_RATIO'].mean():.3f}")
+    print(f"  -> EIGEN_SHARE medio: {absorption['EIGEN_SHARE'].mean():.3f}")
+    
+    output_path = 'data/processed/absorption_ratio.csv'
+    artifacts.write_frame(absorption, output_path)
+    print(f"  [OK] Salvo em {output_path}")
+    
+    return absorption
+
 def compare_periods():
     """Compara sincronizacao entre periodos"""
     print("\n[2/4] Comparando sincronizacao entre periodos...")
     
-    sync = pd.read_csv('data/processed/synchronization_index.csv', 
-                       index_col=0, parse_dates=True)
+    sync = artifacts.read_frame('data/processed/synchronization_index.csv')
     
-    stress = pd.read_csv('data/processed/stress_index.csv', 
-                         index_col=0, parse_dates=True)
+    stress = artifacts.read_frame('data/processed/stress_index.csv')
     
     common_index = sync.index.intersection(stress.index)
     sync_aligned = sync.loc[common_index, 'SYNC_INDEX']
@@ -98,6 +189,35 @@ def compare_periods():
     else:
         print(f"    -> Diferenca NAO significante")
     
+    # Varredura de quantis com permutacao / bootstrap em blocos: a correlacao
+    # rolling e autocorrelacionada ate ROLLING_WINDOW dias, entao o bloco
+    # padrao cobre a janela inteira
+    quantiles = [float(q) for q in config.get_list('REGIME_QUANTILES', ['0.1', '0.2', '0.25', '0.33'])]
+    block = config.get_int('REGIME_BLOCK', config.get_int('ROLLING_WINDOW', 90))
+    resamples = config.get_int('REGIME_RESAMPLES', 5000)
+    regime_table = resampling.regime_tests(sync_aligned, stress_aligned, quantiles, block,
+                                           n_resamples=resamples, seed=config.get_int('RANDOM_SEED', 42),
+                                           n_jobs=config.n_jobs())
+    
+    print(f"\n  Permutacao / bootstrap em blocos ({resamples} reamostragens, bloco de {block} dias):")
+    for _, row in regime_table.iterrows():
+        print(f"    q = {row['quantile']:.2f}: diferenca {row['diff']:+.3f} "
+              f"[{row['ci_low']:+.3f}, {row['ci_high']:+.3f}] | p perm. = {row['p_permutation']:.4f} "
+              f"| p boot. = {row['p_bootstrap']:.4f} | p teste t = {row['p_ttest']:.4f}")
+    
+    os.makedirs('output', exist_ok=True)
+    regime_table.to_csv('output/regime_tests.csv', index=False)
+    print(f"  [OK] Tabela salva em output/regime_tests.csv")
+    
+    if artifacts.exists('data/processed/absorption_ratio.csv'):
+        absorption = artifacts.read_frame('data/processed/absorption_ratio.csv')
+        ar_aligned = absorption['ABSORPTION_RATIO'].reindex(common_index)
+        ar_high, ar_low = ar_aligned[high_stress].dropna(), ar_aligned[low_stress].dropna()
+        if len(ar_high) > 1 and len(ar_low) > 1:
+            ar_t, ar_p = stats.ttest_ind(ar_high, ar_low)
+            print(f"\n  Razao de absorcao (alto x baixo estresse):")
+            print(f"    Media: {ar_high.mean():.3f} x {ar_low.mean():.3f} (t = {ar_t:.3f}, p = {ar_p:.4f})")
+    
     # Visualizar - figura menor
     fig, axes = plt.subplots(2, 2, figsize=(12, 8))
     
@@ -155,106 +275,96 @@ def compare_periods():
         'high_stress': sync_high_stress,
         'low_stress': sync_low_stress,
         't_stat': t_stat,
-        'p_value': p_value
+        'p_value': p_value,
+        'regime_tests': regime_table
     }
 
 def event_study_defensive():
-    """Event study de concentracao defensiva"""
+    """Event study: ratio defensivo e ETFs em torno de eventos de estresse
+    
+    Todas as definicoes (colunas de EVENT_STRESS_COLUMNS x limiares de
+    EVENT_THRESHOLDS desvios) e todas as series de uma vez; a definicao
+    principal (primeira coluna e limiar) e impressa como resumo.
+    """
     print("\n[3/4] Event Study: Concentracao Defensiva...")
     
-    defensive = pd.read_csv('data/processed/defensive_concentration.csv', 
-                           index_col=0, parse_dates=True)
+    defensive = artifacts.read_frame('data/processed/defensive_concentration.csv')
+    stress = artifacts.read_frame('data/processed/stress_index.csv')
+    returns = artifacts.read_frame('data/processed/etf_returns.csv')
     
-    stress = pd.read_csv('data/processed/stress_index.csv', 
-                        index_col=0, parse_dates=True)
+    columns = config.get_list('EVENT_STRESS_COLUMNS', ['STRESS_INDEX'])
+    if [column.lower() for column in columns] == ['all']:
+        columns = list(stress.columns)
+    missing = [column for column in columns if column not in stress.columns]
+    if missing:
+        print(f"  [ERRO] Colunas de estresse inexistentes: {', '.join(missing)}")
+        return None
     
-    stress_threshold = stress['STRESS_INDEX'].mean() + 2 * stress['STRESS_INDEX'].std()
+    thresholds = [float(k) for k in config.get_list('EVENT_THRESHOLDS',
+                                                     [config.get_str('STRESS_THRESHOLD', '2.0')])]
+    window = config.get_int('EVENT_WINDOW', 126)
     
-    events = []
-    stress_values = stress['STRESS_INDEX']
+    # Ratio defensivo em nivel e retorno log acumulado de cada ETF
+    series = pd.concat([defensive[['DEFENSIVE_RATIO']],
+                        returns.cumsum().reindex(defensive.index)], axis=1)
+    defs = event_engine.definitions(stress, columns, thresholds)
     
-    for i in range(20, len(stress_values) - 20):
-        if stress_values.iloc[i] > stress_threshold:
-            window = stress_values.iloc[i-20:i+20]
-            if stress_values.iloc[i] == window.max():
-                events.append(stress_values.index[i])
+    events, _, summary = event_engine.event_study(series, stress, defs, pre=window, post=window)
     
-    print(f"  Eventos de estresse identificados: {len(events)}")
-    for event in events:
-        event_stress = stress.loc[event, 'STRESS_INDEX']
-        print(f"    -> {event.date()}: Stress = {event_stress:.2f}")
+    main_definition = next(iter(defs))
+    main_events = events[events['definition'] == main_definition]
+    print(f"  Definicoes de estresse: {len(defs)} | Series: {series.shape[1]} | Eventos: {len(events)}")
+    print(f"  Eventos de estresse identificados ({main_definition}): {len(main_events)}")
+    for date, value in zip(main_events['date'], main_events['value']):
+        print(f"    -> {date.date()}: Stress = {value:.2f}")
     
-    if len(events) == 0:
+    os.makedirs('output', exist_ok=True)
+    events.to_csv('output/stress_events.csv', index=False)
+    summary.to_csv('output/event_study.csv', index=False)
+    print(f"  [OK] Eventos salvos em output/stress_events.csv")
+    print(f"  [OK] Tabela do event study salva em output/event_study.csv")
+    
+    if len(main_events) == 0:
         print("  [AVISO] Nenhum evento identificado")
         return None
     
-    window_pre = 126
-    window_post = 126
-    
-    changes_pre = []
-    changes_post = []
-    
-    for event_date in events:
-        try:
-            event_idx = defensive.index.get_loc(event_date, method='nearest')
-            
-            if event_idx >= window_pre and event_idx + window_post < len(defensive):
-                value_pre_start = defensive.iloc[event_idx - window_pre]['DEFENSIVE_RATIO']
-                value_pre_end = defensive.iloc[event_idx - 1]['DEFENSIVE_RATIO']
-                value_post_start = defensive.iloc[event_idx + 1]['DEFENSIVE_RATIO']
-                value_post_end = defensive.iloc[event_idx + window_post]['DEFENSIVE_RATIO']
-                
-                change_pre = value_pre_end - value_pre_start
-                change_post = value_post_end - value_post_start
-                
-                changes_pre.append(change_pre)
-                changes_post.append(change_post)
-        except:
-            continue
-    
-    if len(changes_pre) > 0:
-        mean_pre = np.mean(changes_pre)
-        mean_post = np.mean(changes_post)
-        
-        print(f"\n  Mudanca media no Ratio Defensivo:")
-        print(f"    6 meses ANTES do evento: {mean_pre:+.2f} pontos")
-        print(f"    6 meses DEPOIS do evento: {mean_post:+.2f} pontos")
-        
-        t_stat, p_value = stats.ttest_1samp(changes_pre, 0)
-        
-        print(f"\n  Teste t para mudanca pre-evento:")
-        print(f"    t-statistic: {t_stat:.3f}")
-        print(f"    p-value: {p_value:.4f}")
-        
-        if p_value < 0.05 and mean_pre > 0:
-            print(f"    -> Aumento SIGNIFICATIVO antes de eventos")
-        else:
-            print(f"    -> Mudanca NAO significante")
-        
-        return {
-            'events': events,
-            'mean_pre': mean_pre,
-            'mean_post': mean_post
-        }
-    else:
+    row = summary[(summary['definition'] == main_definition)
+                  & (summary['series'] == 'DEFENSIVE_RATIO')].iloc[0]
+    
+    if row['valid_pre'] == 0:
         print("  [ERRO] Dados insuficientes")
         return None
+    
+    print(f"\n  Mudanca media no Ratio Defensivo ({int(row['valid_pre'])} eventos com janela completa):")
+    print(f"    {window} dias ANTES do evento: {row['mean_pre']:+.2f} pontos")
+    print(f"    {window} dias DEPOIS do evento: {row['mean_post']:+.2f} pontos")
+    
+    print(f"\n  Teste t para mudanca pre-evento:")
+    print(f"    t-statistic: {row['t_pre']:.3f}")
+    print(f"    p-value: {row['p_pre']:.4f}")
+    
+    if row['p_pre'] < 0.05 and row['mean_pre'] > 0:
+        print(f"    -> Aumento SIGNIFICATIVO antes de eventos")
+    else:
+        print(f"    -> Mudanca NAO significante")
+    
+    return {
+        'events': list(main_events['date']),
+        'mean_pre': row['mean_pre'],
+        'mean_post': row['mean_post'],
+        'summary': summary
+    }
 
 def generate_comprehensive_report():
     """Gera relatorio visual consolidado"""
     print("\n[4/4] Gerando relatorio visual consolidado...")
     
     try:
-        returns = pd.read_csv('data/processed/etf_returns.csv', 
-                              index_col=0, parse_dates=True)
-        stress = pd.read_csv('data/processed/stress_index.csv', 
-                            index_col=0, parse_dates=True)
-        sync = pd.read_csv('data/processed/synchronization_index.csv', 
-                          index_col=0, parse_dates=True)
-        defensive = pd.read_csv('data/processed/defensive_concentration.csv', 
-                               index_col=0, parse_dates=True)
-        exposure = pd.read_csv('data/processed/exposure_proxy.csv', 
-                              index_col=0, parse_dates=True)
+        returns = artifacts.read_frame('data/processed/etf_returns.csv')
+        stress = artifacts.read_frame('data/processed/stress_index.csv')
+        sync = artifacts.read_frame('data/processed/synchronization_index.csv')
+        defensive = artifacts.read_frame('data/processed/defensive_concentration.csv')
+        exposure = artifacts.read_frame('data/processed/exposure_proxy.csv')
         
         fig = plt.figure(figsize=(14, 10))
         gs = fig.add_gridspec(4, 2, hspace=0.3, wspace=0.3)
@@ -362,7 +472,7 @@ def main():
     ]
     
     for file in required_files:
-        if not os.path.exists(file):
+        if not artifacts.exists(file):
             print(f"\n[ERRO] {file} nao encontrado!")
             return
     
@@ -372,6 +482,7 @@ def main():
     sync_df = calculate_rolling_correlation()
     
     if sync_df is not None:
+        calculate_absorption_ratio()
         compare_periods()
         event_study_defensive()
         generate_comprehensive_report()
@@ -0,0 +1,202 @@
+"""
+Modulo auxiliar: Leitura e Escrita de Artefatos
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+Todos os scripts leem e gravam DataFrames intermediarios por este modulo,
+sempre pelo caminho logico do artefato (ex.: data/processed/etf_returns.csv).
+O formato fisico e escolhido por ARTIFACT_FORMAT:
+
+- csv:     texto (padrao)
+- npz:     binario NumPy (indice datetime64 + matriz float64), sem parsing
+- parquet: colunar, requer pyarrow
+
+Com um formato binario, CSVs existentes continuam legiveis e
+ARTIFACT_EXPORT_CSV=True grava tambem a copia em CSV.
+
+No modo em processo do run_pipeline.py (--in-process) os DataFrames ficam
+em memoria e sao compartilhados entre as etapas; a gravacao em disco passa
+a ser feita em segundo plano (write-behind) ou desativada.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import config
+
+FORMATS = {'csv': '.csv', 'npz': '.npz', 'parquet': '.parquet'}
+
+_memory = None
+_writer = None
+_pending = {}
+
+
+def current_format():
+    """Formato fisico configurado para esta execucao"""
+    fmt = config.get_str('ARTIFACT_FORMAT', 'csv').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"ARTIFACT_FORMAT invalido: {fmt} (opcoes: {', '.join(FORMATS)})")
+    return fmt
+
+
+def storage_path(path, fmt=None):
+    """Caminho fisico de um artefato logico no formato informado"""
+    fmt = fmt or current_format()
+    root, ext = os.path.splitext(path)
+    return root + FORMATS[fmt] if ext == '.csv' else path
+
+
+def resolve(path):
+    """Arquivo existente que guarda o artefato (formato atual, senao CSV)"""
+    physical = storage_path(path)
+    if os.path.exists(physical) or physical == path:
+        return physical
+    return path
+
+
+def use_memory_store(persist=True):
+    """Ativa o armazenamento em memoria (persist=False nao grava em disco)"""
+    global _memory, _writer
+    _memory = {}
+    _writer = ThreadPoolExecutor(max_workers=1) if persist else None
+
+
+def _read_disk(physical):
+    ext = os.path.splitext(physical)[1]
+    
+    if ext == '.npz':
+        with np.load(physical, allow_pickle=False) as data:
+            index = pd.DatetimeIndex(data['index'], name=str(data['index_name']) or None)
+            return pd.DataFrame(data['values'], index=index, columns=[str(c) for c in data['columns']])
+    
+    if ext == '.parquet':
+        return pd.read_parquet(physical)
+    
+    return pd.read_csv(physical, index_col=0, parse_dates=True)
+
+
+def _write_disk(df, path):
+    fmt = current_format()
+    physical = storage_path(path, fmt)
+    
+    if fmt == 'npz':
+        np.savez(physical,
+                 index=df.index.values.astype('datetime64[ns]'),
+                 index_name=np.array(df.index.name or ''),
+                 columns=np.array([str(c) for c in df.columns]),
+                 values=df.to_numpy(dtype=np.float64))
+    elif fmt == 'parquet':
+        df.to_parquet(physical)
+    else:
+        df.to_csv(physical)
+    
+    if fmt != 'csv' and config.get_bool('ARTIFACT_EXPORT_CSV', False):
+        df.to_csv(path)
+
+
+def read_frame(path):
+    """Le um artefato indexado por data
+    
+    No modo em memoria o mesmo objeto e devolvido a todos os consumidores,
+    que nao devem altera-lo in-place.
+    """
+    if _memory is not None and path in _memory:
+        return _memory[path]
+    
+    df = _read_disk(resolve(path))
+    
+    if _memory is not None:
+        _memory[path] = df
+    
+    return df
+
+
+def write_frame(df, path):
+    """Grava um artefato (em memoria + disco em segundo plano, se ativo)"""
+    if _memory is None:
+        _write_disk(df, path)
+        return
+    
+    _memory[path] = df
+    
+    if _writer is not None:
+        _pending[path] = _writer.submit(_write_disk, df, path)
+
+
+def _truncate_lines(physical, count):
+    """Remove as ultimas `count` linhas de um arquivo texto lendo so o final"""
+    with open(physical, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        found = 0
+        chunk = 1 << 16
+        
+        while position > 0:
+            start = max(0, position - chunk)
+            f.seek(start)
+            block = f.read(position - start)
+            # a quebra final do arquivo nao separa uma linha extra
+            for i in range(len(block) - 1, -1, -1):
+                if block[i:i + 1] == b'\n' and start + i != end - 1:
+                    found += 1
+                    if found == count:
+                        f.truncate(start + i + 1)
+                        return
+            position = start
+
+
+def append_frame(df, path, replace_last=0):
+    """Acrescenta linhas a um artefato, substituindo as `replace_last` finais
+    
+    Em CSV as linhas sao anexadas ao arquivo (custo proporcional as linhas
+    novas); nos formatos binarios e no modo em memoria o artefato e relido e
+    regravado.
+    """
+    physical = resolve(path)
+    
+    if _memory is None and physical.endswith('.csv') and os.path.exists(physical):
+        columns = pd.read_csv(physical, index_col=0, nrows=0).columns
+        if replace_last:
+            _truncate_lines(physical, replace_last)
+        df[list(columns)].to_csv(physical, mode='a', header=False)
+        return
+    
+    current = read_frame(path)
+    if replace_last:
+        current = current.iloc[:-replace_last]
+    write_frame(pd.concat([current, df[list(current.columns)]]), path)
+
+
+def exists(path):
+    """Verifica se o artefato esta disponivel em memoria ou em disco"""
+    return (_memory is not None and path in _memory) or os.path.exists(resolve(path))
+
+
+def row_count(path):
+    """Numero de linhas lido dos metadados, sem carregar os valores"""
+    if _memory is not None and path in _memory:
+        return len(_memory[path])
+    
+    physical = resolve(path)
+    ext = os.path.splitext(physical)[1]
+    
+    if ext == '.npz':
+        with np.load(physical, allow_pickle=False) as data:
+            return data['index'].shape[0]
+    
+    if ext == '.parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(physical).metadata.num_rows
+    
+    with open(physical, 'rb') as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def flush(paths=None):
+    """Aguarda gravacoes pendentes (todas ou apenas dos caminhos informados)"""
+    for path in list(_pending if paths is None else paths):
+        future = _pending.pop(path, None)
+        if future is not None:
+            future.result()
@@ -0,0 +1,118 @@
+"""
+Modulo auxiliar: Configuracao
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+Le os parametros documentados em .env.example. Variaveis de ambiente tem
+precedencia sobre o arquivo .env; valores vazios usam o padrao do script.
+"""
+
+import os
+
+ENV_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+
+_file_values = None
+
+
+def _load_env_file():
+    """Le pares CHAVE=valor do arquivo .env (sem dependencia de python-dotenv)"""
+    global _file_values
+    
+    if _file_values is None:
+        _file_values = {}
+        if os.path.exists(ENV_FILE):
+            with open(ENV_FILE, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#') or '=' not in line:
+                        continue
+                    key, value = line.split('=', 1)
+                    _file_values[key.strip()] = value.strip().strip('"').strip("'")
+    
+    return _file_values
+
+
+def get_str(name, default=None):
+    """Valor textual do parametro (ambiente > .env > padrao)"""
+    value = os.environ.get(name)
+    if value is None:
+        value = _load_env_file().get(name)
+    return value if value not in (None, '') else default
+
+
+def get_int(name, default):
+    return int(get_str(name, default))
+
+
+def get_float(name, default):
+    return float(get_str(name, default))
+
+
+def get_bool(name, default):
+    value = get_str(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('true', '1', 'yes', 'sim')
+
+
+def get_list(name, default):
+    """Lista separada por virgulas (ex.: ETFS=FXI,MCHI,KWEB)"""
+    value = get_str(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def get_pairs(name, default):
+    """Pares numerador/denominador (ex.: RATIO_PAIRS=FXI/SPY,GLD/FXI)"""
+    pairs = []
+    for item in get_list(name, default):
+        num, sep, den = item.partition('/')
+        if sep and num.strip() and den.strip():
+            pairs.append((num.strip(), den.strip()))
+    return pairs
+
+
+def n_jobs():
+    """Numero de processos paralelos (N_JOBS: 0 = auto, 1 = serial)"""
+    jobs = get_int('N_JOBS', 0)
+    return jobs if jobs > 0 else (os.cpu_count() or 1)
+
+
+# Frequencias de agregacao (AGGREGATION_FREQ): regra de resample do pandas
+# (None = serie diaria original), artefato agregado, rotulo e periodos por
+# mes (converte defasagens declaradas em meses para cada frequencia)
+FREQUENCIES = {
+    'D': {'rule': None, 'path': 'data/processed/daily_data.csv', 'label': 'diaria', 'per_month': 21},
+    'W': {'rule': 'W-FRI', 'path': 'data/processed/weekly_data.csv', 'label': 'semanal', 'per_month': 4},
+    'M': {'rule': 'ME', 'path': 'data/processed/monthly_data.csv', 'label': 'mensal', 'per_month': 1},
+}
+
+
+def aggregation_freqs():
+    """Frequencias de AGGREGATION_FREQ (ex.: D,W,M) na ordem de FREQUENCIES"""
+    requested = {freq.upper() for freq in get_list('AGGREGATION_FREQ', FREQUENCIES)}
+    unknown = requested - set(FREQUENCIES)
+    if unknown:
+        raise ValueError(f"AGGREGATION_FREQ invalido: {', '.join(sorted(unknown))} "
+                         f"(opcoes: {', '.join(FREQUENCIES)})")
+    return [freq for freq in FREQUENCIES if freq in requested]
+
+
+def sync_etfs(columns):
+    """ETFs do indice de sincronizacao presentes em `columns` (SYNC_ETFS;
+    'all' = todo o universo de retornos)"""
+    requested = get_list('SYNC_ETFS', ['FXI', 'MCHI', 'KWEB'])
+    if [ticker.lower() for ticker in requested] == ['all']:
+        return list(columns)
+    return [ticker for ticker in requested if ticker in columns]
+
+
+def sync_half_lives():
+    """Meias-vidas (dias) do indice de sincronizacao no modo EWMA
+    (SYNC_MODE=ewma, SYNC_HALF_LIVES); None no modo rolling (janela fixa)"""
+    mode = get_str('SYNC_MODE', 'rolling').strip().lower()
+    if mode not in ('rolling', 'ewma'):
+        raise ValueError(f"SYNC_MODE invalido: {mode} (opcoes: rolling, ewma)")
+    if mode == 'rolling':
+        return None
+    return [float(h) for h in get_list('SYNC_HALF_LIVES', ['30', '90'])]
@@ -0,0 +1,135 @@
+"""
+Modulo auxiliar: Motor de Event Study
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+Deteccao de eventos de estresse e variacoes acumuladas antes/depois de cada
+evento para muitas definicoes de estresse e muitas series de uma vez.
+
+- Eventos: dia acima do limiar (media + k desvios) que e o maximo da janela
+  [t - half_window, t + half_window), calculado para todas as definicoes
+  com uma visao deslizante (sem laco por dia).
+- Alinhamento: data de cada evento -> posicao mais proxima no indice das
+  series por searchsorted (substitui get_loc(method='nearest'), removido
+  no pandas 2).
+- Janelas: uma visao strided (eventos x (pre + post + 1) x series) de onde
+  saem as variacoes pre (t-1 menos t-pre) e pos (t+post menos t+1).
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+def definitions(stress, columns, thresholds):
+    """Limiar de cada definicao de estresse: nome -> (coluna, media + k * desvio)"""
+    result = {}
+    for column in columns:
+        series = stress[column]
+        for k in thresholds:
+            result[f"{column}>{k:g}sd"] = (column, series.mean() + k * series.std())
+    return result
+
+
+def detect_events(stress, defs, half_window=20):
+    """Eventos de todas as definicoes: DataFrame (definition, date, value)
+
+    Um dia t (half_window <= t < T - half_window) e evento se o valor passa
+    do limiar e e o maximo de t-half_window..t+half_window-1 (NaN ignorados).
+    """
+    names = list(defs)
+    values = stress[[defs[name][0] for name in names]].to_numpy(dtype=float)
+    thresholds = np.array([defs[name][1] for name in names])
+    span = 2 * half_window
+
+    if len(values) <= span:
+        return pd.DataFrame({'definition': pd.Series(dtype=object), 'date': pd.Series(dtype='datetime64[ns]'),
+                             'value': pd.Series(dtype=float)})
+
+    # janela de t = half_window + j: linhas j..j+span-1
+    windows = np.lib.stride_tricks.sliding_window_view(values, span, axis=0)[:len(values) - span]
+    peak = np.where(np.isnan(windows), -np.inf, windows).max(axis=2)
+    center = values[half_window:len(values) - half_window]
+    is_event = (center > thresholds) & (center == peak)
+
+    rows, cols = np.nonzero(is_event)
+    order = np.lexsort((rows, cols))
+    rows, cols = rows[order], cols[order]
+    return pd.DataFrame({
+        'definition': np.array(names, dtype=object)[cols],
+        'date': stress.index[rows + half_window],
+        'value': center[rows, cols],
+    })
+
+
+def nearest_positions(index, dates):
+    """Posicao da data mais proxima de cada `dates` em `index` (ordenado)"""
+    keys = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.asarray(index)
+    targets = pd.DatetimeIndex(dates).asi8 if isinstance(index, pd.DatetimeIndex) else np.asarray(dates)
+    right = np.clip(np.searchsorted(keys, targets), 0, len(keys) - 1)
+    left = np.clip(right - 1, 0, len(keys) - 1)
+    return np.where(np.abs(targets - keys[left]) <= np.abs(keys[right] - targets), left, right)
+
+
+def event_windows(series, dates, pre, post):
+    """Trajetorias das series em torno de cada evento
+
+    Devolve (posicoes, valido, janelas) com janelas de forma (eventos,
+    pre + post + 1, series) e a posicao do evento no indice `pre`; eventos
+    sem `pre` observacoes antes ou `post` depois ficam invalidos (NaN).
+    """
+    values = series.to_numpy(dtype=float)
+    positions = nearest_positions(series.index, dates)
+    valid = (positions >= pre) & (positions + post < len(values))
+
+    length = pre + post + 1
+    windows = np.full((len(positions), length, values.shape[1]), np.nan)
+    if len(values) >= length and valid.any():
+        view = np.lib.stride_tricks.sliding_window_view(values, length, axis=0)  # (T-L+1, series, L)
+        windows[valid] = view[positions[valid] - pre].transpose(0, 2, 1)
+    return positions, valid, windows
+
+
+def event_study(series, stress, defs, pre=126, post=126, half_window=20):
+    """Event study de varias definicoes de estresse sobre varias series
+
+    Devolve (events, changes, summary):
+    - events: uma linha por evento (definition, date, value);
+    - changes: variacao pre (t-1 menos t-pre) e pos (t+post menos t+1) de
+      cada evento valido e serie;
+    - summary: por (definition, series) numero de eventos, medias das
+      variacoes e teste t de media zero para pre e pos.
+    """
+    events = detect_events(stress, defs, half_window)
+    positions, valid, windows = event_windows(series, events['date'], pre, post)
+
+    change_pre = windows[:, pre - 1] - windows[:, 0]
+    change_post = windows[:, pre + post] - windows[:, pre + 1]
+
+    n_series = series.shape[1]
+    kept = events[valid].reset_index(drop=True)
+    changes = pd.DataFrame({
+        'definition': np.repeat(kept['definition'].to_numpy(), n_series),
+        'date': np.repeat(kept['date'].to_numpy(), n_series),
+        'series': np.tile(np.array(series.columns, dtype=object), len(kept)),
+        'change_pre': change_pre[valid].ravel(),
+        'change_post': change_post[valid].ravel(),
+    })
+
+    grid = pd.MultiIndex.from_product([list(defs), list(series.columns)], names=['definition', 'series'])
+    grouped = changes.groupby(['definition', 'series'])
+    summary = pd.DataFrame(index=grid)
+    summary['events'] = events['definition'].value_counts().reindex(grid.get_level_values(0)).fillna(0) \
+        .astype(int).to_numpy()
+
+    for phase in ('pre', 'post'):
+        column = grouped[f'change_{phase}']
+        count = column.count().reindex(grid).fillna(0)
+        mean = column.mean().reindex(grid)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t_stat = mean / (column.std().reindex(grid) / np.sqrt(count))
+        summary[f'valid_{phase}'] = count.astype(int)
+        summary[f'mean_{phase}'] = mean
+        summary[f't_{phase}'] = t_stat
+        summary[f'p_{phase}'] = 2 * stats.t.sf(np.abs(t_stat), count - 1)
+
+    return events, changes, summary.reset_index()
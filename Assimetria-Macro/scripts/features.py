@@ -0,0 +1,138 @@
+"""
+Modulo auxiliar: Motor de Features
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+Features sao declaradas como dicionarios (ver FEATURES em 01_process_data.py)
+e calculadas sobre matrizes inteiras (todas as colunas de uma vez). Calculos
+intermediarios compartilhados - retornos, desvios rolling - sao feitos uma
+unica vez por origem e reaproveitados por todas as features que dependem deles.
+
+Operacoes suportadas:
+
+- log_return:  log(p_t / p_{t-1})                      [dropna]
+- rolling_vol: desvio rolling dos retornos simples      window, annualize
+- ratio:       num / den normalizado (base no 1o dia)   num, den, base
+- ratios:      todos os pares num/den de uma vez        pairs, base
+- diff:        diferenca em `periods` linhas            periods
+- zscore:      (x - media) / desvio da amostra inteira
+
+`source` pode ser uma matriz de origem (ex.: 'prices') ou outra feature, e
+`columns` restringe as colunas do resultado.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def pair_ratios(prices, pairs, base=1):
+    """Razoes num/den de uma lista de pares como uma unica operacao matricial
+    
+    Cada razao e normalizada pela primeira observacao valida do par (tickers
+    de um universo grande comecam em datas diferentes). Pares com ticker
+    ausente sao descartados. Colunas no formato 'NUM/DEN'.
+    """
+    position = {ticker: i for i, ticker in enumerate(prices.columns)}
+    pairs = [(num, den) for num, den in pairs if num in position and den in position]
+    
+    values = prices.to_numpy(dtype=float)
+    num_idx = np.array([position[num] for num, _ in pairs], dtype=int)
+    den_idx = np.array([position[den] for _, den in pairs], dtype=int)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = values[:, num_idx] / values[:, den_idx]
+        first = np.argmax(~np.isnan(ratios), axis=0)
+        ratios = ratios / ratios[first, np.arange(len(pairs))] * base
+    
+    return pd.DataFrame(ratios, index=prices.index,
+                        columns=[f'{num}/{den}' for num, den in pairs])
+
+
+class FeatureEngine:
+    """Calcula features declaradas com memoizacao de subexpressoes"""
+
+    def __init__(self, sources, specs):
+        self.sources = {name: df for name, df in sources.items() if df is not None}
+        self.specs = specs
+        self._memo = {}
+        self._features = {}
+
+    def available(self, name):
+        """Verifica se a origem da feature (recursivamente) esta disponivel"""
+        if name in self.sources:
+            return True
+        spec = self.specs.get(name)
+        return spec is not None and self.available(spec['source'])
+
+    def frame(self, name):
+        """Matriz de origem ou feature ja calculada"""
+        if name in self.sources:
+            return self.sources[name]
+        return self.feature(name)
+
+    def _cached(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def returns(self, source, kind='simple'):
+        """Retornos de todas as colunas da origem (calculados uma vez)"""
+        def compute():
+            prices = self.frame(source)
+            if kind == 'log':
+                return np.log(prices / prices.shift(1))
+            return prices.pct_change()
+        return self._cached(('returns', source, kind), compute)
+
+    def rolling_std(self, source, window, kind='simple'):
+        """Desvio padrao rolling dos retornos de todas as colunas"""
+        return self._cached(('rolling_std', source, kind, window),
+                            lambda: self.returns(source, kind).rolling(window).std())
+
+    def feature(self, name):
+        """Calcula (ou devolve da memoria) uma feature declarada"""
+        if name not in self._features:
+            self._features[name] = self._compute(name, self.specs[name])
+        return self._features[name]
+
+    def _compute(self, name, spec):
+        op = spec['op']
+        source = spec['source']
+        columns = spec.get('columns')
+
+        if op == 'log_return':
+            result = self.returns(source, 'log')
+        elif op == 'rolling_vol':
+            result = self.rolling_std(source, spec['window']) * (spec.get('annualize', 1) ** 0.5)
+        elif op == 'ratio':
+            prices = self.frame(source)
+            ratio = prices[spec['num']] / prices[spec['den']]
+            result = ((ratio / ratio.iloc[0]) * spec.get('base', 1)).to_frame(name)
+        elif op == 'ratios':
+            result = pair_ratios(self.frame(source), spec['pairs'], spec.get('base', 1))
+        elif op == 'diff':
+            result = self.frame(source).diff(spec['periods'])
+        elif op == 'zscore':
+            frame = self.frame(source)
+            result = (frame - frame.mean()) / frame.std()
+        else:
+            raise ValueError(f"Operacao desconhecida na feature {name}: {op}")
+
+        if columns is not None:
+            result = result[[c for c in columns if c in result.columns]]
+        if spec.get('dropna'):
+            result = result.dropna()
+
+        return result
+
+    def compute_all(self):
+        """Calcula todas as features cujas origens e colunas estao disponiveis"""
+        results = {}
+        for name in self.specs:
+            if not self.available(name):
+                continue
+            try:
+                results[name] = self.feature(name)
+            except KeyError:
+                # ex.: ratio com ticker ausente do universo
+                continue
+        return results
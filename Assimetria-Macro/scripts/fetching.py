@@ -0,0 +1,121 @@
+"""
+Modulo auxiliar: Downloads Concorrentes
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+Executa chamadas de rede em um pool de threads limitado, com controle de
+taxa (token bucket) e novas tentativas com backoff exponencial. So falhas
+transitorias (timeout, conexao, HTTP 408/429/5xx) sao repetidas; as demais
+(serie inexistente, HTTP 4xx) sobem na primeira tentativa.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Status HTTP que indicam sobrecarga temporaria (alem dos 5xx)
+TRANSIENT_STATUS = (408, 429)
+
+
+class RateLimiter:
+    """Token bucket: no maximo `rate` chamadas por segundo, rajadas de `burst`"""
+    
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Bloqueia ate haver um token disponivel"""
+        if self.rate <= 0:
+            return
+        
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait = (1 - self.tokens) / self.rate
+            
+            time.sleep(wait)
+
+
+def is_transient(error):
+    """Falha que vale repetir: timeout, erro de conexao ou HTTP 408/429/5xx"""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', getattr(error, 'code', None))
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUS or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    
+    try:
+        import requests
+    except ImportError:
+        return False
+    return isinstance(error, (requests.Timeout, requests.ConnectionError))
+
+
+def call_with_retries(fn, max_retries=3, retry_delay=5.0, limiter=None):
+    """Executa fn() com ate max_retries novas tentativas
+    
+    O intervalo dobra a cada falha (retry_delay, 2*retry_delay, ...) com um
+    pequeno jitter para nao sincronizar threads. Falhas permanentes
+    (is_transient falso) sobem sem novas tentativas. Retorna (resultado,
+    tentativas).
+    """
+    attempt = 0
+    
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        
+        try:
+            return fn(), attempt + 1
+        except Exception as e:
+            if attempt >= max_retries or not is_transient(e):
+                raise
+            delay = retry_delay * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, 0.1 * delay))
+            attempt += 1
+
+
+def fetch_all(fetchers, max_workers=4, limiter=None, max_retries=3, retry_delay=5.0,
+              on_result=None):
+    """Executa varios downloads concorrentes
+    
+    fetchers: dict nome -> funcao sem argumentos.
+    on_result(nome, resultado, erro, tentativas) e chamado a cada conclusao.
+    Retorna (resultados, falhas), ambos dicts indexados pelo nome; falhas
+    guardam a excecao final de cada item que esgotou as tentativas.
+    """
+    results = {}
+    failures = {}
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {
+            pool.submit(call_with_retries, fn, max_retries, retry_delay, limiter): name
+            for name, fn in fetchers.items()
+        }
+        
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result, attempts = future.result()
+                results[name] = result
+                if on_result is not None:
+                    on_result(name, result, None, attempts)
+            except Exception as e:
+                failures[name] = e
+                if on_result is not None:
+                    on_result(name, None, e, max_retries + 1)
+    
+    return results, failures
@@ -0,0 +1,637 @@
+"""
+Modulo auxiliar: Motor Lead-Lag
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+Correlacao cruzada de todos os pares de colunas em todas as defasagens de
+uma vez. Os produtos cruzados sum_t x_{t+L} y_t vem de uma unica FFT por
+coluna; somas e somas de quadrados de cada janela sobreposta vem de somas
+acumuladas. O resultado e a correlacao de Pearson de cada trecho
+sobreposto - o mesmo valor de `x.iloc[L:].corr(y.iloc[:-L])` - em
+O(N log N) por par em vez de O(N * max_lag).
+
+Convencao de sinal: corr[L] = corr(x_{t+L}, y_t). Lag negativo significa
+que x precede y.
+
+Causalidade de Granger de todos os pares ordenados: para cada lag a matriz
+de projeto com as defasagens de todas as series e montada uma vez e os
+produtos cruzados D'D sao calculados uma vez; as regressoes restritas
+(defasagens proprias) e irrestritas (+ defasagens da causa) de todos os
+pares viram lotes de sistemas pequenos resolvidos juntos. Estatisticas
+iguais ao 'ssr_ftest' de statsmodels.grangercausalitytests.
+
+VAR/Granger em janela movel (RollingVAR): a cada observacao nova a matriz
+de produtos cruzados da janela recebe uma atualizacao de posto 1 (e perde
+a linha que sai da janela, ou e descontada por um fator de esquecimento);
+coeficientes, criterios de informacao, testes de Granger e impulso-resposta
+de qualquer ordem ate max_lag saem dessa matriz sem reestimar a janela.
+
+Selecao de ordem do VAR (select_var_order): a matriz [X_max | Y] com as
+defasagens ate max_lag e fatorada uma unica vez (QR); como as colunas das
+ordens menores sao prefixos de X_max, a covariancia dos residuos de cada
+ordem L sai do bloco de R abaixo das primeiras 1 + m*L colunas.
+
+Significancia da correlacao cruzada por dados substitutos (surrogates):
+milhares de series com o mesmo espectro (randomizacao de fase) ou o mesmo
+espectro e a mesma distribuicao (IAAFT) sao geradas de uma vez como um
+array 2-D, e a CCF nula de todas as defasagens sai do mesmo motor FFT.
+Os p-valores empiricos levam em conta autocorrelacao e tamanho amostral,
+ao contrario de limites fixos para |r|.
+
+Bandas de impulso-resposta por bootstrap de residuos: as replicacoes sao
+simuladas e reestimadas em lote (todas as replicacoes de um bloco avancam
+juntas no tempo e os OLS sao resolvidos como um lote de sistemas), e os
+blocos rodam em um pool de processos com sementes derivadas de uma
+SeedSequence - o resultado nao depende do numero de processos.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Abaixo deste numero de variaveis o pool de processos nao compensa
+PARALLEL_MIN_VARIABLES = 16
+
+# Replicacoes por bloco do bootstrap (unidade de trabalho do pool e de semente)
+BOOTSTRAP_BLOCK = 250
+
+
+def _next_fast_len(n):
+    """Menor potencia de 2 >= n (tamanho eficiente para a FFT)"""
+    return 1 << (int(n) - 1).bit_length()
+
+
+def _smooth_len(n):
+    """Maior comprimento <= n com fatores 2, 3 e 5 (FFT rapida sem padding)"""
+    best = 1
+    power5 = 1
+    while power5 <= n:
+        power35 = power5
+        while power35 <= n:
+            best = max(best, power35 << (n // power35).bit_length() - 1)
+            power35 *= 3
+        power5 *= 5
+    return best
+
+
+def _window_sums(values, lags):
+    """Somas (e somas de quadrados) dos trechos de x e y usados em cada lag
+
+    Para lag L >= 0: x[L:], y[:N-L]; para L < 0: x[:N+L], y[-L:].
+    Retorna arrays (lags x colunas).
+    """
+    n = len(values)
+    zero = np.zeros((1, values.shape[1]))
+    csum = np.vstack([zero, np.cumsum(values, axis=0)])
+    csq = np.vstack([zero, np.cumsum(values ** 2, axis=0)])
+
+    pos = np.maximum(lags, 0)
+    neg = np.maximum(-lags, 0)
+
+    # x[L:N] para L >= 0; x[0:N+L] para L < 0
+    x_start, x_end = pos, n - neg
+    # y[0:N-L] para L >= 0; y[-L:N] para L < 0
+    y_start, y_end = neg, n - pos
+
+    sx = csum[x_end] - csum[x_start]
+    sxx = csq[x_end] - csq[x_start]
+    sy = csum[y_end] - csum[y_start]
+    syy = csq[y_end] - csq[y_start]
+
+    return sx, sxx, sy, syy
+
+
+def cross_correlation_matrix(data, max_lag, pairs=None, chunk_size=256):
+    """Correlacao cruzada de todos os pares em todas as defasagens
+
+    data: DataFrame (linhas com NaN sao descartadas) ou array (N x m).
+    pairs: lista de pares (i, j) de nomes/posicoes; padrao = todos i < j.
+    Retorna (lags, pairs, ccf) com ccf no formato (2*max_lag+1) x n_pares.
+    """
+    if isinstance(data, pd.DataFrame):
+        data = data.dropna()
+        names = list(data.columns)
+        values = data.to_numpy(dtype=float)
+    else:
+        values = np.asarray(data, dtype=float)
+        names = list(range(values.shape[1]))
+
+    n, m = values.shape
+    max_lag = min(int(max_lag), n - 2)
+    lags = np.arange(-max_lag, max_lag + 1)
+
+    position = {name: i for i, name in enumerate(names)}
+    if pairs is None:
+        pairs = list(combinations(names, 2))
+    idx_x = np.array([position[a] for a, _ in pairs], dtype=int)
+    idx_y = np.array([position[b] for _, b in pairs], dtype=int)
+
+    # Centrar pela media global reduz cancelamento numerico; Pearson e
+    # invariante a translacao de cada serie
+    values = values - values.mean(axis=0)
+
+    nfft = _next_fast_len(2 * n - 1)
+    spectrum = np.fft.rfft(values, nfft, axis=0)
+    sx, sxx, sy, syy = _window_sums(values, lags)
+    count = (n - np.abs(lags))[:, None]
+
+    ccf = np.empty((len(lags), len(pairs)))
+
+    for start in range(0, len(pairs), chunk_size):
+        block = slice(start, start + chunk_size)
+        ix, iy = idx_x[block], idx_y[block]
+
+        # r[L] = sum_t x_{t+L} y_t (indices negativos ficam no fim do buffer)
+        raw = np.fft.irfft(spectrum[:, ix] * np.conj(spectrum[:, iy]), nfft, axis=0)
+        sxy = raw[lags % nfft]
+
+        cov = count * sxy - sx[:, ix] * sy[:, iy]
+        var_x = count * sxx[:, ix] - sx[:, ix] ** 2
+        var_y = count * syy[:, iy] - sy[:, iy] ** 2
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ccf[:, block] = cov / np.sqrt(var_x * var_y)
+
+    return lags, list(pairs), ccf
+
+
+def cross_correlation(x, y, max_lag):
+    """CCF de um unico par como Series indexada pelo lag"""
+    data = pd.concat([x.rename('x'), y.rename('y')], axis=1)
+    lags, _, ccf = cross_correlation_matrix(data, max_lag, pairs=[('x', 'y')])
+    return pd.Series(ccf[:, 0], index=lags)
+
+
+def summarize_ccf(lags, pairs, ccf):
+    """Lag e correlacao de pico (em modulo) de cada par"""
+    peak = np.nanargmax(np.abs(np.nan_to_num(ccf, nan=0.0)), axis=0)
+    columns = np.arange(ccf.shape[1])
+
+    summary = pd.DataFrame({
+        'x': [a for a, _ in pairs],
+        'y': [b for _, b in pairs],
+        'peak_lag': lags[peak],
+        'peak_corr': ccf[peak, columns],
+        'corr_lag0': ccf[list(lags).index(0)] if 0 in lags else np.nan,
+    })
+
+    return summary.reindex(summary['peak_corr'].abs().sort_values(ascending=False).index)
+
+
+def phase_surrogates(x, n_surrogates, rng):
+    """Surrogates por randomizacao de fase: array (n_surrogates x N)"""
+    x = np.asarray(x, dtype=float)
+    spectrum = np.fft.rfft(x)
+    phases = rng.uniform(0, 2 * np.pi, size=(n_surrogates, len(spectrum)))
+    phases[:, 0] = 0
+    if len(x) % 2 == 0:
+        phases[:, -1] = 0
+    return np.fft.irfft(spectrum * np.exp(1j * phases), len(x), axis=1)
+
+
+def iaaft_surrogates(x, n_surrogates, rng, iterations=20):
+    """Surrogates IAAFT: espectro aproximado e distribuicao exata da serie"""
+    x = np.asarray(x, dtype=float)
+    amplitude = np.abs(np.fft.rfft(x))
+    sorted_x = np.sort(x)
+
+    surrogates = rng.permuted(np.tile(x, (n_surrogates, 1)), axis=1)
+    order = np.zeros(surrogates.shape, dtype=np.intp)
+    active = np.arange(n_surrogates)
+    
+    for _ in range(iterations):
+        spectrum = np.fft.rfft(surrogates[active], axis=1)
+        spectrum *= amplitude / np.maximum(np.abs(spectrum), np.finfo(float).tiny)
+        filtered = np.fft.irfft(spectrum, len(x), axis=1)
+        
+        # devolve os valores originais na ordem dos postos do filtrado; cada
+        # surrogate sai do lote quando sua ordenacao deixa de mudar
+        current = filtered.argsort(axis=1)
+        changed = (current != order[active]).any(axis=1)
+        order[active] = current
+        
+        block = np.empty_like(filtered)
+        np.put_along_axis(block, current, np.broadcast_to(sorted_x, block.shape), axis=1)
+        surrogates[active] = block
+        
+        active = active[changed]
+        if len(active) == 0:
+            break
+    
+    return surrogates
+
+
+SURROGATE_METHODS = {'phase': phase_surrogates, 'iaaft': iaaft_surrogates}
+
+
+def surrogate_ccf_test(x, y, max_lag, n_surrogates=2000, method='iaaft', signif=0.05, seed=42):
+    """CCF com p-valores empiricos e bandas sob a nula de independencia
+
+    Surrogates de x (mesma autocorrelacao, sem relacao com y) formam a
+    distribuicao nula da CCF em todas as defasagens. p_value e bicaudal por
+    lag; attrs['p_value_global'] usa o maximo de |r| entre lags (controla
+    as comparacoes multiplas).
+
+    Surrogates sao periodicos e nao admitem padding: as primeiras
+    observacoes sao descartadas ate um comprimento com fatores 2, 3 e 5
+    (ex.: 2732 -> 2700), evitando FFTs de comprimento primo. A coluna corr
+    e a CCF dessa mesma amostra (attrs['n_obs'] observacoes).
+    """
+    data = pd.concat([x.rename('x'), y.rename('y')], axis=1).dropna()
+    data = data.iloc[len(data) - _smooth_len(len(data)):]
+    observed = cross_correlation(data['x'], data['y'], max_lag)
+
+    rng = np.random.default_rng(seed)
+    surrogates = SURROGATE_METHODS[method](data['x'].to_numpy(), n_surrogates, rng)
+    stacked = np.column_stack([surrogates.T, data['y'].to_numpy()])
+    _, _, null = cross_correlation_matrix(stacked, max_lag,
+                                          pairs=[(i, n_surrogates) for i in range(n_surrogates)])
+
+    exceed = (np.abs(null) >= np.abs(observed.to_numpy())[:, None]).sum(axis=1)
+    lower, upper = np.percentile(null, [100 * signif / 2, 100 * (1 - signif / 2)], axis=1)
+
+    table = pd.DataFrame({
+        'corr': observed.to_numpy(),
+        'lower': lower,
+        'upper': upper,
+        'p_value': (exceed + 1) / (n_surrogates + 1),
+    }, index=observed.index)
+    table.index.name = 'lag'
+
+    max_null = np.abs(null).max(axis=0)
+    table.attrs['p_value_global'] = (np.sum(max_null >= np.abs(observed).max()) + 1) / (n_surrogates + 1)
+    table.attrs['n_obs'] = len(data)
+
+    return table
+
+
+def _solve_ssr(cross, columns, target):
+    """SSR de regressoes em lote a partir da matriz de produtos cruzados
+
+    columns: (P x k) colunas regressoras de cada regressao; target: (P,)
+    coluna dependente. Resolve P sistemas k x k de uma vez.
+    """
+    xx = cross[columns[:, :, None], columns[:, None, :]]
+    xy = cross[columns, target[:, None]]
+    try:
+        beta = np.linalg.solve(xx, xy[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        beta = (np.linalg.pinv(xx) @ xy[..., None])[..., 0]
+    return cross[target, target] - (xy * beta).sum(axis=1)
+
+
+def _granger_lag(values, lag):
+    """Testes F de todos os pares ordenados para uma defasagem
+
+    A matriz de projeto [x_t de todas as series | x_{t-1..t-lag} de todas as
+    series] e montada uma vez e centrada (absorve a constante); todas as
+    regressoes restritas e irrestritas saem de submatrizes de D'D.
+    """
+    n, m = values.shape
+    nobs = n - lag
+    df_denom = nobs - 2 * lag - 1
+    if df_denom <= 0:
+        return []
+
+    # Coluna m + i*lag + (k-1) guarda x_i[t-k]
+    lagged = np.stack([values[lag - k:n - k] for k in range(1, lag + 1)], axis=2)
+    design = np.hstack([values[lag:], lagged.reshape(nobs, m * lag)])
+    design -= design.mean(axis=0)
+    cross = design.T @ design
+
+    lag_columns = m + np.arange(m)[:, None] * lag + np.arange(lag)
+
+    # Restrita: apenas defasagens proprias (uma regressao por efeito)
+    effects = np.arange(m)
+    ssr_r = _solve_ssr(cross, lag_columns, effects)
+
+    cause, effect = np.array([(c, e) for e in range(m) for c in range(m) if c != e]).T
+    columns = np.hstack([lag_columns[effect], lag_columns[cause]])
+    ssr_u = _solve_ssr(cross, columns, effect)
+
+    f_stat = (ssr_r[effect] - ssr_u) / ssr_u / lag * df_denom
+    p_value = stats.f.sf(f_stat, lag, df_denom)
+
+    return [(c, e, lag, f, p, lag, df_denom)
+            for c, e, f, p in zip(cause, effect, f_stat, p_value)]
+
+
+def granger_matrix(data, max_lag, n_jobs=1, lags=None):
+    """Causalidade de Granger de todos os pares ordenados (causa -> efeito)
+
+    data: DataFrame; linhas com NaN sao descartadas (amostra comum).
+    Testa as defasagens 1..max_lag, ou apenas as de `lags` (cada defasagem
+    e independente das demais). Com n_jobs > 1 e universo grande, as
+    defasagens sao distribuidas em um pool de processos. Retorna tabela com
+    cause, effect, lag, f_stat, p_value, df_num, df_denom.
+    """
+    data = data.dropna()
+    names = list(data.columns)
+    values = data.to_numpy(dtype=float)
+    lags = list(range(1, max_lag + 1) if lags is None else lags)
+
+    if n_jobs > 1 and len(names) >= PARALLEL_MIN_VARIABLES and len(lags) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(lags))) as pool:
+            chunks = list(pool.map(_granger_lag, [values] * len(lags), lags))
+    else:
+        chunks = [_granger_lag(values, lag) for lag in lags]
+
+    table = pd.DataFrame([row for chunk in chunks for row in chunk],
+                         columns=['cause', 'effect', 'lag', 'f_stat', 'p_value',
+                                  'df_num', 'df_denom'])
+    table['cause'] = [names[i] for i in table['cause']]
+    table['effect'] = [names[i] for i in table['effect']]
+
+    return table.sort_values(['cause', 'effect', 'lag']).reset_index(drop=True)
+
+
+class RollingVAR:
+    """VAR(1..max_lag) estimado recursivamente em janela movel
+
+    Cada linha de projeto e [1, x_{t-1}, ..., x_{t-max_lag}, x_t]; as
+    regressoes do VAR(L) usam as primeiras 1 + m*L colunas. window limita
+    a janela (linhas antigas sao subtraidas) e forgetting < 1 desconta
+    exponencialmente as observacoes antigas (RLS com esquecimento).
+    """
+
+    def __init__(self, n_vars, max_lag, window=None, forgetting=1.0):
+        self.m = n_vars
+        self.max_lag = max_lag
+        self.window = window
+        self.forgetting = forgetting
+        size = 1 + n_vars * (max_lag + 1)
+        self.cross = np.zeros((size, size))
+        self.history = deque(maxlen=max_lag + 1)
+        self.rows = deque()
+        self.steps = 0
+
+    @property
+    def nobs(self):
+        """Numero (efetivo, se houver esquecimento) de linhas na janela"""
+        return self.cross[0, 0]
+
+    @property
+    def ready(self):
+        return self.nobs > 2 * (1 + self.m * self.max_lag)
+
+    def update(self, x):
+        """Incorpora a observacao x_t (vetor com as m series)"""
+        self.history.appendleft(np.asarray(x, dtype=float))
+        if len(self.history) <= self.max_lag:
+            return False
+
+        row = np.concatenate([[1.0], *list(self.history)[1:], self.history[0]])
+        if self.forgetting < 1:
+            self.cross *= self.forgetting
+        self.cross += np.outer(row, row)
+        self.steps += 1
+
+        if self.window:
+            self.rows.append(row)
+            if len(self.rows) > self.window:
+                old = self.rows.popleft()
+                self.cross -= self.forgetting ** self.window * np.outer(old, old)
+            # Recalcula a soma de tempos em tempos para nao acumular erro
+            if self.steps % self.window == 0:
+                self._refresh()
+
+        return True
+
+    def _refresh(self):
+        rows = np.array(self.rows)
+        weights = self.forgetting ** np.arange(len(rows) - 1, -1, -1)
+        self.cross = (rows * weights[:, None]).T @ rows
+
+    def _target(self, effect):
+        return 1 + self.m * self.max_lag + effect
+
+    def _ssr(self, columns, target):
+        xx = self.cross[np.ix_(columns, columns)]
+        xy = self.cross[columns, target]
+        beta = np.linalg.lstsq(xx, xy, rcond=None)[0]
+        return self.cross[target, target] - xy @ beta
+
+    def coefficients(self, lag):
+        """Coeficientes (1 + m*lag) x m do VAR(lag): constante, A_1', ..., A_lag'"""
+        k = 1 + self.m * lag
+        targets = slice(1 + self.m * self.max_lag, None)
+        return np.linalg.lstsq(self.cross[:k, :k], self.cross[:k, targets], rcond=None)[0]
+
+    def sigma(self, lag):
+        """Covariancia dos residuos (MLE) do VAR(lag)"""
+        k = 1 + self.m * lag
+        targets = slice(1 + self.m * self.max_lag, None)
+        beta = self.coefficients(lag)
+        resid = self.cross[targets, targets] - self.cross[:k, targets].T @ beta
+        return resid / self.nobs
+
+    def select_order(self, criterion='aic'):
+        """Ordem 1..max_lag que minimiza o criterio (aic, bic, hqic, fpe)"""
+        n, m = self.nobs, self.m
+        scores = []
+        for lag in range(1, self.max_lag + 1):
+            logdet = np.linalg.slogdet(self.sigma(lag))[1]
+            free_params = lag * m ** 2
+            if criterion == 'fpe':
+                k = 1 + m * lag
+                scores.append(((n + k) / (n - k)) ** m * np.exp(logdet))
+            else:
+                penalty = {'aic': 2 / n, 'bic': np.log(n) / n,
+                           'hqic': 2 * np.log(np.log(n)) / n}[criterion]
+                scores.append(logdet + penalty * free_params)
+        return int(np.argmin(scores)) + 1
+
+    def granger(self, cause, effect, lag):
+        """Teste F de Granger (cause -> effect) dentro do VAR(lag)"""
+        k = 1 + self.m * lag
+        full = list(range(k))
+        restricted = [c for c in full if c == 0 or (c - 1) % self.m != cause]
+        target = self._target(effect)
+
+        ssr_u = self._ssr(full, target)
+        ssr_r = self._ssr(restricted, target)
+        df_denom = self.nobs - k
+        f_stat = (ssr_r - ssr_u) / ssr_u / lag * df_denom
+        return f_stat, stats.f.sf(f_stat, lag, df_denom)
+
+    def irf(self, lag, horizon):
+        """Impulso-resposta (nao ortogonalizada): array (horizon+1) x m x m"""
+        return ma_coefficients(var_matrices(self.coefficients(lag), self.m, lag), horizon)
+
+
+def rolling_leadlag(data, cause, effect, max_lag, window=None, forgetting=1.0,
+                    criterion='aic', horizon=10):
+    """Serie temporal de ordem otima, p-valores de Granger e pico da IRF
+
+    Para cada data (apos a janela encher) reporta a ordem escolhida pelo
+    criterio, os p-valores de Granger nas duas direcoes nessa ordem e o pico
+    (em modulo) da resposta de `effect` a um impulso em `cause`.
+    """
+    data = data.dropna()
+    names = list(data.columns)
+    c, e = names.index(cause), names.index(effect)
+    model = RollingVAR(len(names), max_lag, window=window, forgetting=forgetting)
+    rows = []
+
+    for date, x in zip(data.index, data.to_numpy(dtype=float)):
+        if not model.update(x) or not model.ready:
+            continue
+        if window and len(model.rows) < window:
+            continue
+
+        lag = model.select_order(criterion)
+        _, p_forward = model.granger(c, e, lag)
+        _, p_reverse = model.granger(e, c, lag)
+        response = model.irf(lag, horizon)[1:, e, c]
+        peak = int(np.argmax(np.abs(response)))
+
+        rows.append((date, lag, p_forward, p_reverse, response[peak], peak + 1))
+
+    return pd.DataFrame(rows, columns=['date', 'opt_lag', 'p_value', 'p_value_reverse',
+                                       'irf_peak', 'irf_peak_horizon']).set_index('date')
+
+
+def var_matrices(beta, m, lag):
+    """Coeficientes empilhados (..., 1 + m*lag, m) -> matrizes A_j (..., lag, m, m)"""
+    blocks = beta[..., 1:, :].reshape(beta.shape[:-2] + (lag, m, m))
+    return np.swapaxes(blocks, -1, -2)
+
+
+def ma_coefficients(coefs, horizon):
+    """Matrizes MA Phi_0..Phi_horizon a partir de A_1..A_lag (com lote opcional)"""
+    lag, m = coefs.shape[-3], coefs.shape[-1]
+    batch = coefs.shape[:-3]
+    phi = np.zeros(batch + (horizon + 1, m, m))
+    phi[..., 0, :, :] = np.eye(m)
+    for h in range(1, horizon + 1):
+        for j in range(min(h, lag)):
+            phi[..., h, :, :] += phi[..., h - j - 1, :, :] @ coefs[..., j, :, :]
+    return phi
+
+
+def _var_design(values, lag):
+    """Regressoras [1, y_{t-1}, ..., y_{t-lag}] e alvos y_t (com lote opcional)"""
+    n = values.shape[-2]
+    ones = np.ones(values.shape[:-2] + (n - lag, 1))
+    lags = [values[..., lag - j:n - j, :] for j in range(1, lag + 1)]
+    return np.concatenate([ones] + lags, axis=-1), values[..., lag:, :]
+
+
+def fit_var(values, lag):
+    """OLS do VAR(lag) com constante; aceita lote (..., N, m)
+
+    Retorna (beta, resid) com beta (..., 1 + m*lag, m) no mesmo layout de
+    statsmodels (constante, A_1', ..., A_lag').
+    """
+    x, y = _var_design(values, lag)
+    xt = np.swapaxes(x, -1, -2)
+    beta = np.linalg.solve(xt @ x, xt @ y)
+    return beta, y - x @ beta
+
+
+def select_var_order(data, max_lag):
+    """AIC/BIC/HQIC/FPE de todas as ordens 0..max_lag com uma unica QR
+
+    Mesma amostra comum (linhas max_lag..N-1) e mesmas formulas de
+    statsmodels VAR.select_order. Retorna dict com arrays por criterio e
+    'selected' -> ordem que minimiza cada criterio.
+    """
+    values = np.asarray(data.dropna() if isinstance(data, pd.DataFrame) else data, dtype=float)
+    m = values.shape[1]
+    x, y = _var_design(values, max_lag)
+    n = len(y)
+
+    r = np.linalg.qr(np.hstack([x, y]), mode='r')
+    k_max = x.shape[1]
+
+    ics = {'aic': [], 'bic': [], 'hqic': [], 'fpe': []}
+    for lag in range(max_lag + 1):
+        k = 1 + m * lag
+        block = r[k:, k_max:]
+        logdet = np.linalg.slogdet(block.T @ block / n)[1]
+        free_params = lag * m ** 2 + m
+
+        ics['aic'].append(logdet + 2 / n * free_params)
+        ics['bic'].append(logdet + np.log(n) / n * free_params)
+        ics['hqic'].append(logdet + 2 * np.log(np.log(n)) / n * free_params)
+        ics['fpe'].append(((n + k) / (n - k)) ** m * np.exp(logdet))
+
+    result = {name: np.array(values) for name, values in ics.items()}
+    result['selected'] = {name: int(np.argmin(values)) for name, values in ics.items()}
+    return result
+
+
+def _bootstrap_block(values, lag, horizon, replications, seed):
+    """IRFs de um bloco de replicacoes do bootstrap de residuos"""
+    n, m = values.shape
+    rng = np.random.default_rng(seed)
+    beta, resid = fit_var(values, lag)
+    resid = resid - resid.mean(axis=0)
+    coefs = var_matrices(beta, m, lag)
+
+    # Todas as replicacoes avancam juntas: (R, N, m)
+    draws = resid[rng.integers(0, len(resid), size=(replications, n - lag))]
+    sim = np.empty((replications, n, m))
+    sim[:, :lag] = values[:lag]
+    for t in range(lag, n):
+        step = beta[0] + draws[:, t - lag]
+        for j in range(lag):
+            step = step + sim[:, t - j - 1] @ coefs[j].T
+        sim[:, t] = step
+
+    boot_beta, _ = fit_var(sim, lag)
+    return ma_coefficients(var_matrices(boot_beta, m, lag), horizon)
+
+
+def bootstrap_irf(data, lag, horizon=10, replications=2000, signif=0.05, seed=42, n_jobs=1):
+    """Bandas de impulso-resposta por bootstrap de residuos
+
+    Retorna dict com irf (ponto), lower e upper - arrays (horizon+1) x m x m
+    indexados [h, resposta, impulso] como em statsmodels - e os metadados
+    necessarios para redesenhar o grafico.
+    """
+    data = data.dropna()
+    values = data.to_numpy(dtype=float)
+    m = values.shape[1]
+
+    beta, _ = fit_var(values, lag)
+    point = ma_coefficients(var_matrices(beta, m, lag), horizon)
+
+    sizes = [min(BOOTSTRAP_BLOCK, replications - start)
+             for start in range(0, replications, BOOTSTRAP_BLOCK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = ([values] * len(sizes), [lag] * len(sizes), [horizon] * len(sizes), sizes, seeds)
+
+    if n_jobs > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(sizes))) as pool:
+            blocks = list(pool.map(_bootstrap_block, *args))
+    else:
+        blocks = list(map(_bootstrap_block, *args))
+
+    irfs = np.concatenate(blocks)
+    lower, upper = np.percentile(irfs, [100 * signif / 2, 100 * (1 - signif / 2)], axis=0)
+
+    return {
+        'irf': point,
+        'lower': lower,
+        'upper': upper,
+        'names': np.array(data.columns, dtype=str),
+        'lag': lag,
+        'horizon': horizon,
+        'signif': signif,
+        'replications': replications,
+        'seed': seed,
+    }
+
+
+def save_irf_bands(path, bands):
+    """Grava as bandas (arrays + metadados) para redesenho sem recalculo"""
+    np.savez(path, **bands)
+
+
+def load_irf_bands(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {key: data[key] if data[key].ndim else data[key].item() for key in data.files}
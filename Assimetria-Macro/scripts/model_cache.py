@@ -0,0 +1,198 @@
+"""
+Modulo auxiliar: Cache de Modelos Estimados
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+Guarda resultados de estimacoes caras (VAR, testes de Granger, bootstrap)
+em disco, indexados por hash dos dados de entrada + parametros + versao do
+motor de estimacao. Reexecutar relatorios ou alterar apenas codigo de
+graficos reaproveita os resultados em vez de reestimar.
+
+Cada entrada e um .npz (sem pickle) com arrays, escalares ou um DataFrame.
+Nao ha indice compartilhado: o tamanho vem do proprio arquivo e o ultimo
+uso da data de modificacao (renovada a cada leitura), de forma que tarefas
+executadas em paralelo (--jobs) nao sobrescrevem registros umas das outras.
+As entradas menos usadas recentemente sao removidas quando o total passa de
+MODEL_CACHE_MAX_MB.
+
+Configuracao (.env): MODEL_CACHE (True/False), MODEL_CACHE_DIR,
+MODEL_CACHE_MAX_MB.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import config
+
+CACHE_VERSION = 1
+
+# Modulos cujo codigo altera os resultados em cache (invalida ao mudar)
+ENGINE_FILES = ['leadlag.py', 'stationarity.py']
+
+_FRAME_MARKER = '__frame__'
+
+
+def frame_hash(df):
+    """Hash do conteudo de um DataFrame (indice, colunas e valores)"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def engine_fingerprint():
+    """Hash do codigo do motor de estimacao e das versoes das bibliotecas"""
+    import statsmodels
+
+    digest = hashlib.sha256()
+    digest.update(f"{CACHE_VERSION}|{np.__version__}|{statsmodels.__version__}".encode())
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ENGINE_FILES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def _pack(result):
+    """dict de arrays/escalares ou DataFrame -> dict de arrays para np.savez"""
+    if isinstance(result, pd.DataFrame):
+        arrays = {_FRAME_MARKER: np.array([str(c) for c in result.columns]),
+                  '__index__': result.index.values,
+                  '__index_name__': np.array(result.index.name or '')}
+        for i, col in enumerate(result.columns):
+            values = result[col].to_numpy()
+            arrays[f'col{i}'] = values.astype(str) if values.dtype == object else values
+        return arrays
+
+    return {key: np.asarray(value) for key, value in result.items()}
+
+
+def _unpack(data):
+    if _FRAME_MARKER in data.files:
+        columns = list(data[_FRAME_MARKER])
+        frame = pd.DataFrame({col: data[f'col{i}'] for i, col in enumerate(columns)},
+                             index=data['__index__'])
+        frame.index.name = str(data['__index_name__']) or None
+        return frame
+
+    return {key: data[key] if data[key].ndim else data[key].item() for key in data.files}
+
+
+class ModelCache:
+    """Cache persistente de resultados com remocao LRU por tamanho"""
+
+    def __init__(self, directory=None, max_bytes=None, enabled=None):
+        self.directory = directory or config.get_str('MODEL_CACHE_DIR', 'output/model_cache')
+        self.max_bytes = max_bytes if max_bytes is not None else \
+            int(config.get_float('MODEL_CACHE_MAX_MB', 256) * 1024 * 1024)
+        self.enabled = enabled if enabled is not None else config.get_bool('MODEL_CACHE', True)
+        self._engine = None
+
+    def key(self, kind, data, params):
+        """Chave de uma estimacao: tipo + hash dos dados + parametros + motor"""
+        if self._engine is None:
+            self._engine = engine_fingerprint()
+
+        payload = json.dumps({'kind': kind, 'data': frame_hash(data), 'params': params,
+                              'engine': self._engine}, sort_keys=True, default=str)
+        return f"{kind}-{hashlib.sha256(payload.encode()).hexdigest()[:32]}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def _read(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                result = _unpack(data)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # removida por outro processo depois da leitura
+        return result
+
+    def get(self, key):
+        """Resultado em cache (ou None); atualiza o ultimo uso"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Resultados em cache de varias chaves: dict chave -> resultado (so
+        as encontradas); atualiza o ultimo uso de cada uma"""
+        if not self.enabled:
+            return {}
+
+        found = {}
+        for key in keys:
+            result = self._read(key)
+            if result is not None:
+                found[key] = result
+        return found
+
+    def put(self, key, result):
+        """Grava um resultado e remove as entradas menos usadas se necessario"""
+        self.put_many({key: result})
+
+    def put_many(self, results):
+        """Grava varios resultados (dict chave -> resultado) com uma unica
+        passada de remocao LRU no fim"""
+        if not self.enabled or not results:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        for key, result in results.items():
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **_pack(result))
+            os.replace(tmp_path, path)
+        self._evict()
+
+    def _entries(self):
+        """(ultimo uso, tamanho, caminho) das entradas gravadas"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # removida por outro processo
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_or_compute(self, kind, data, params, compute):
+        """Devolve (resultado, hit); calcula e grava em caso de falta"""
+        key = self.key(kind, data, params)
+        result = self.get(key)
+
+        if result is not None:
+            return result, True
+
+        result = compute()
+        self.put(key, result)
+        return result, False
@@ -0,0 +1,241 @@
+"""
+Modulo auxiliar: Provedores de Dados
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+Fontes de precos de ETFs e de series macroeconomicas usadas pelo script 00:
+
+- yfinance:  precos ajustados do Yahoo Finance
+- fred:      series do FRED (endpoint CSV publico)
+- local:     arquivos CSV em um diretorio (fixtures, ambientes sem rede)
+- synthetic: gerador deterministico de precos e series macro
+
+Selecao via PRICE_PROVIDER / MACRO_PROVIDER, ou DATA_PROVIDER para ambos.
+"""
+
+import io
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import config
+
+FRED_CSV_URL = 'https://fred.stlouisfed.org/graph/fredgraph.csv'
+
+
+class DataProvider:
+    """Interface comum dos provedores"""
+    
+    name = 'base'
+    cacheable = False   # precos podem ser guardados no cache incremental
+    rate_limit = None   # requisicoes por segundo (None = sem limite)
+    
+    def fetch_prices(self, tickers, start_date, end_date):
+        """Precos de fechamento ajustados: dict ticker -> serie (sem NaN)"""
+        raise NotImplementedError(f"Provedor '{self.name}' nao fornece precos")
+    
+    def fetch_series(self, code, start_date, end_date):
+        """Serie macroeconomica indexada por data"""
+        raise NotImplementedError(f"Provedor '{self.name}' nao fornece series macro")
+
+
+class YFinanceProvider(DataProvider):
+    """Precos do Yahoo Finance (auto_adjust=True)"""
+    
+    name = 'yfinance'
+    cacheable = True
+    
+    def fetch_prices(self, tickers, start_date, end_date):
+        import yfinance as yf
+        
+        data = yf.download(' '.join(tickers), start=start_date, end=end_date,
+                           progress=False, auto_adjust=True, group_by='ticker')
+        closes = {}
+        
+        for ticker in tickers:
+            try:
+                if isinstance(data.columns, pd.MultiIndex):
+                    prices = data[ticker]['Close']
+                else:
+                    prices = data['Close']
+                
+                prices = prices.dropna()
+                if len(prices) > 0:
+                    closes[ticker] = prices
+            except Exception as e:
+                print(f"    [ERRO] {ticker}: {str(e)}")
+        
+        return closes
+
+
+class FredProvider(DataProvider):
+    """Series do FRED via fredgraph.csv (nao exige chave de API)"""
+    
+    name = 'fred'
+    
+    def __init__(self, timeout=None):
+        self.timeout = timeout if timeout is not None else config.get_float('DOWNLOAD_TIMEOUT', 30)
+        self.rate_limit = config.get_float('FRED_REQUESTS_PER_SECOND', 2)
+    
+    def fetch_series(self, code, start_date, end_date):
+        import requests
+        
+        response = requests.get(
+            FRED_CSV_URL,
+            params={'id': code, 'cosd': start_date, 'coed': end_date},
+            headers={'User-Agent': config.get_str('USER_AGENT', 'Mozilla/5.0')},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        
+        series = pd.read_csv(io.StringIO(response.text), index_col=0,
+                             parse_dates=True, na_values='.').iloc[:, 0]
+        series.name = code
+        return series
+
+
+class LocalProvider(DataProvider):
+    """Le CSVs de um diretorio (LOCAL_DATA_DIR)
+    
+    Aceita arquivos largos (etf_prices.csv, macro_indicators.csv, no formato
+    gerado pelo script 00) ou um arquivo por ticker/serie (FXI.csv, VIXCLS.csv).
+    """
+    
+    name = 'local'
+    
+    def __init__(self, directory=None):
+        self.directory = directory or config.get_str('LOCAL_DATA_DIR', 'data/fixtures')
+        self._wide = {}
+    
+    def _read(self, filename):
+        if filename not in self._wide:
+            path = os.path.join(self.directory, filename)
+            self._wide[filename] = (pd.read_csv(path, index_col=0, parse_dates=True)
+                                    if os.path.exists(path) else None)
+        return self._wide[filename]
+    
+    def _column(self, wide_file, name, start_date, end_date):
+        wide = self._read(wide_file)
+        if wide is not None and name in wide.columns:
+            series = wide[name]
+        else:
+            single = self._read(f'{name}.csv')
+            if single is None:
+                raise KeyError(f"{name} nao encontrado em {self.directory}")
+            series = single.iloc[:, 0]
+        
+        series = series.loc[start_date:end_date].dropna()
+        series.name = name
+        return series
+    
+    def fetch_prices(self, tickers, start_date, end_date):
+        closes = {}
+        for ticker in tickers:
+            try:
+                series = self._column('etf_prices.csv', ticker, start_date, end_date)
+                if len(series) > 0:
+                    closes[ticker] = series
+            except KeyError as e:
+                print(f"    [ERRO] {ticker}: {str(e)}")
+        return closes
+    
+    def fetch_series(self, code, start_date, end_date):
+        return self._column('macro_indicators.csv', code, start_date, end_date)
+
+
+class SyntheticProvider(DataProvider):
+    """Gerador deterministico para execucoes offline e benchmarks
+    
+    Precos seguem um modelo de um fator (retorno comum com beta por ticker
+    mais ruido idiossincratico); series macro sao processos AR(1). Os valores
+    de cada data dependem apenas de RANDOM_SEED, do nome e da data: o mesmo
+    dia gera o mesmo valor em qualquer execucao ou recorte de periodo.
+    SYNTHETIC_DAYS fixa o comprimento (dias uteis ate a data final).
+    """
+    
+    name = 'synthetic'
+    origin = '1990-01-01'
+    
+    def __init__(self, seed=None, n_days=None):
+        self.seed = seed if seed is not None else config.get_int('RANDOM_SEED', 42)
+        self.n_days = n_days if n_days is not None else config.get_int('SYNTHETIC_DAYS', 0)
+        self._factor = {}
+    
+    def _grid(self, start_date, end_date):
+        end = pd.Timestamp(end_date)
+        start = pd.Timestamp(start_date)
+        if self.n_days:
+            start = pd.bdate_range(end=end, periods=self.n_days)[0]
+        origin = min(pd.Timestamp(self.origin), start)
+        grid = pd.bdate_range(origin, end)
+        return grid, grid >= start
+    
+    def _rng(self, name):
+        return np.random.default_rng([self.seed, zlib.crc32(name.encode('utf-8'))])
+    
+    def _common_factor(self, grid):
+        key = (grid[0], len(grid))
+        if key not in self._factor:
+            self._factor[key] = self._rng('__factor__').normal(0, 0.01, len(grid))
+        return self._factor[key]
+    
+    def fetch_prices(self, tickers, start_date, end_date):
+        grid, mask = self._grid(start_date, end_date)
+        factor = self._common_factor(grid)
+        closes = {}
+        
+        for ticker in tickers:
+            rng = self._rng(ticker)
+            beta = rng.uniform(0.3, 1.5)
+            vol = rng.uniform(0.005, 0.015)
+            level = rng.uniform(20, 200)
+            returns = beta * factor + rng.normal(0.0001, vol, len(grid))
+            prices = level * np.exp(np.cumsum(returns))
+            closes[ticker] = pd.Series(prices[mask], index=grid[mask], name=ticker)
+        
+        return closes
+    
+    def fetch_series(self, code, start_date, end_date):
+        grid, mask = self._grid(start_date, end_date)
+        rng = self._rng(code)
+        mean = rng.uniform(-1, 30)
+        phi = rng.uniform(0.95, 0.995)
+        shocks = rng.normal(0, abs(mean) * 0.02 + 0.05, len(grid))
+        
+        values = np.empty(len(grid))
+        values[0] = mean
+        for t in range(1, len(grid)):
+            values[t] = mean + phi * (values[t - 1] - mean) + shocks[t]
+        
+        return pd.Series(values[mask], index=grid[mask], name=code)
+
+
+PROVIDERS = {
+    'yfinance': YFinanceProvider,
+    'fred': FredProvider,
+    'local': LocalProvider,
+    'synthetic': SyntheticProvider,
+}
+
+
+def get_provider(name, **kwargs):
+    """Instancia um provedor pelo nome"""
+    if name not in PROVIDERS:
+        raise ValueError(f"Provedor desconhecido: {name} (opcoes: {', '.join(PROVIDERS)})")
+    return PROVIDERS[name](**kwargs)
+
+
+def price_provider():
+    """Provedor de precos configurado (PRICE_PROVIDER > DATA_PROVIDER > yfinance)"""
+    return get_provider(config.get_str('PRICE_PROVIDER') or config.get_str('DATA_PROVIDER', 'yfinance'))
+
+
+def macro_provider():
+    """Provedor macro configurado (MACRO_PROVIDER > DATA_PROVIDER > fred)"""
+    return get_provider(config.get_str('MACRO_PROVIDER') or config.get_str('DATA_PROVIDER', 'fred'))
+
+
+def synthetic_tickers(n):
+    """Nomes de tickers sinteticos adicionais (SYN0001, SYN0002, ...)"""
+    return [f'SYN{i:04d}' for i in range(1, n + 1)]
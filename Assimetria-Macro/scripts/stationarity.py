@@ -0,0 +1,218 @@
+"""
+Modulo auxiliar: Testes de Estacionariedade em Lote
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+ADF e KPSS para muitas series (e varias defasagens maximas) de uma vez,
+com resultado em tabela para as etapas seguintes decidirem a diferenciacao.
+
+A regressao do ADF com selecao automatica de defasagem (AIC/BIC) e resolvida
+com uma unica fatoracao QR por serie: as SSR de todas as ordens aninhadas
+saem da mesma projecao, no lugar das maxlag+1 regressoes do statsmodels
+(resultado identico a adfuller). O KPSS usa statsmodels.
+
+Resultados sao guardados no cache de modelos por hash da serie (o nome da
+coluna nao entra na chave): em screens diarios de centenas de series, so as
+que mudaram sao retestadas. Series faltantes sao distribuidas em processos
+com n_jobs > 1.
+"""
+
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.adfvalues import mackinnonp
+from statsmodels.tsa.stattools import kpss
+
+# Numero minimo de testes pendentes para usar o pool de processos
+PARALLEL_MIN_SERIES = 32
+
+REGRESSIONS = ('c', 'ct', 'ctt', 'n')
+
+
+def _trend(n, regression):
+    """Colunas deterministicas na ordem de add_trend (constante, t, t^2)"""
+    if regression == 'n':
+        return np.empty((n, 0))
+    order = len(regression) - 1
+    return np.vander(np.arange(1, n + 1, dtype=float), order + 1, increasing=True)
+
+
+def _adf_design(x, xdiff, lags):
+    """Nivel defasado e `lags` diferencas defasadas (amostra comum do ADF)"""
+    n = len(xdiff) - lags
+    columns = [x[lags:lags + n]] + [xdiff[lags - i:lags - i + n] for i in range(1, lags + 1)]
+    return np.column_stack(columns), xdiff[lags:]
+
+
+def default_maxlag(nobs, regression='c'):
+    """Defasagem maxima padrao do ADF (Schwert), como em adfuller"""
+    ntrend = len(regression) if regression != 'n' else 0
+    maxlag = int(np.ceil(12.0 * np.power(nobs / 100.0, 1 / 4.0)))
+    return min(nobs // 2 - ntrend - 1, maxlag)
+
+
+def adf_test(x, maxlag=None, regression='c', autolag='aic'):
+    """Teste ADF; devolve (estatistica, p-valor, defasagem usada, nobs)
+
+    Equivalente a statsmodels.tsa.stattools.adfuller para autolag 'aic',
+    'bic' ou None.
+    """
+    x = np.asarray(x, dtype=float)
+    if x.max() == x.min():
+        raise ValueError("Serie constante")
+
+    ntrend = len(regression) if regression != 'n' else 0
+    if maxlag is None:
+        maxlag = default_maxlag(len(x), regression)
+    if maxlag < 0 or maxlag > len(x) // 2 - ntrend - 1:
+        raise ValueError(f"maxlag={maxlag} incompativel com {len(x)} observacoes")
+
+    xdiff = np.diff(x)
+    lag = maxlag
+
+    if autolag:
+        # amostra comum: [tendencia, nivel, diferencas 1..maxlag]; prefixos
+        # da QR dao a SSR de cada ordem candidata
+        levels, y = _adf_design(x, xdiff, maxlag)
+        full = np.hstack([_trend(len(y), regression), levels])
+        q, _ = np.linalg.qr(full)
+        explained = np.cumsum((q.T @ y) ** 2)
+
+        n = len(y)
+        k = np.arange(ntrend + 1, full.shape[1] + 1)
+        ssr = y @ y - explained[k - 1]
+        penalty = 2 * k if autolag == 'aic' else np.log(n) * k
+        ic = n * (np.log(2 * np.pi) + np.log(ssr / n) + 1) + penalty
+        lag = int(np.argmin(ic))
+
+    levels, y = _adf_design(x, xdiff, lag)
+    design = np.hstack([levels, _trend(len(y), regression)])
+    q, r = np.linalg.qr(design)
+    beta = np.linalg.solve(r, q.T @ y)
+    resid = y - design @ beta
+
+    r_inv = np.linalg.inv(r)
+    sigma2 = resid @ resid / (len(y) - design.shape[1])
+    stat = beta[0] / np.sqrt(sigma2 * (r_inv[0] @ r_inv[0]))
+
+    return stat, mackinnonp(stat, regression=regression, N=1), lag, len(y)
+
+
+def kpss_test(x, regression='c'):
+    """Teste KPSS (nula: estacionaria); devolve (estatistica, p-valor, lags)"""
+    with warnings.catch_warnings():
+        # p-valor fora da tabela e truncado em [0.01, 0.10]
+        warnings.simplefilter('ignore')
+        stat, p_value, lags, _ = kpss(x, regression=regression, nlags='auto')
+    return stat, p_value, lags
+
+
+def check_series(values, maxlag=None, regression='c', autolag='aic', signif=0.05):
+    """ADF + KPSS de uma serie; dict de escalares (serializavel no cache)
+
+    decision: 'stationary' (ADF rejeita raiz unitaria e KPSS nao rejeita
+    estacionariedade), 'unit_root' (o contrario), 'inconclusive' ou
+    'invalid' (serie constante ou curta demais).
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+
+    try:
+        adf_stat, adf_p, lag, nobs = adf_test(values, maxlag, regression, autolag)
+        kpss_stat, kpss_p, kpss_lags = kpss_test(values, 'ct' if 't' in regression else 'c')
+    except (ValueError, np.linalg.LinAlgError):
+        return {'nobs': len(values), 'maxlag': -1 if maxlag is None else maxlag,
+                'adf_stat': np.nan, 'adf_p_value': np.nan, 'adf_lags': -1,
+                'kpss_stat': np.nan, 'kpss_p_value': np.nan, 'kpss_lags': -1,
+                'decision': 'invalid'}
+
+    adf_rejects, kpss_rejects = adf_p < signif, kpss_p < signif
+    if adf_rejects and not kpss_rejects:
+        decision = 'stationary'
+    elif kpss_rejects and not adf_rejects:
+        decision = 'unit_root'
+    else:
+        decision = 'inconclusive'
+
+    return {'nobs': nobs, 'maxlag': default_maxlag(len(values), regression) if maxlag is None else maxlag,
+            'adf_stat': adf_stat, 'adf_p_value': adf_p, 'adf_lags': lag,
+            'kpss_stat': kpss_stat, 'kpss_p_value': kpss_p, 'kpss_lags': kpss_lags,
+            'decision': decision}
+
+
+def _check_task(args):
+    return check_series(*args)
+
+
+def stationarity_table(data, maxlags=(None,), regression='c', autolag='aic', signif=0.05,
+                       n_jobs=1, cache=None):
+    """ADF + KPSS de todas as colunas de `data` para cada defasagem maxima
+
+    Uma linha por (serie, maxlag); maxlag None usa o padrao de Schwert.
+    `cache` e um model_cache.ModelCache (ou None). Colunas: series, nobs,
+    maxlag, adf_stat, adf_p_value, adf_lags, kpss_stat, kpss_p_value,
+    kpss_lags, decision, needs_diff (ADF nao rejeita raiz unitaria).
+    """
+    if regression not in REGRESSIONS:
+        raise ValueError(f"regression invalida: {regression} (opcoes: {', '.join(REGRESSIONS)})")
+
+    jobs = [(name, maxlag) for name in data.columns for maxlag in maxlags]
+    keys = {job: None for job in jobs}
+    cached = {}
+    if cache is not None and cache.enabled:
+        for name, maxlag in jobs:
+            params = {'maxlag': maxlag, 'regression': regression, 'autolag': autolag, 'signif': signif}
+            keys[name, maxlag] = cache.key('stationarity', data[name].dropna().to_frame('series'), params)
+        # uma leitura em lote para todas as (serie, maxlag)
+        cached = cache.get_many(keys.values())
+
+    results = {job: cached[keys[job]] for job in jobs if keys[job] in cached}
+    pending = [(name, maxlag, keys[name, maxlag]) for name, maxlag in jobs if (name, maxlag) not in results]
+
+    tasks = [(data[name].to_numpy(), maxlag, regression, autolag, signif) for name, maxlag, _ in pending]
+    if n_jobs > 1 and len(tasks) >= PARALLEL_MIN_SERIES:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            computed = list(pool.map(_check_task, tasks, chunksize=max(1, len(tasks) // (4 * n_jobs))))
+    else:
+        computed = [_check_task(task) for task in tasks]
+
+    for (name, maxlag, _), result in zip(pending, computed):
+        results[name, maxlag] = result
+    if cache is not None:
+        cache.put_many({key: result for (_, _, key), result in zip(pending, computed) if key is not None})
+
+    table = pd.DataFrame([{'series': name, **results[name, maxlag]} for name, maxlag in jobs])
+    table['needs_diff'] = ~(table['adf_p_value'] < signif) & (table['decision'] != 'invalid')
+    return table
+
+
+def auto_difference(data, max_diff=2, signif=0.05, n_jobs=1, cache=None):
+    """Diferencia cada coluna ate o ADF rejeitar raiz unitaria (ate max_diff)
+
+    Cada rodada testa em lote apenas as colunas ainda nao estacionarias.
+    Devolve (dados transformados, tabela da ultima rodada de cada coluna com
+    a coluna diff_order).
+    """
+    transformed = data.copy()
+    order = pd.Series(0, index=data.columns)
+    final = {}
+    remaining = list(data.columns)
+
+    for d in range(max_diff + 1):
+        table = stationarity_table(transformed[remaining], signif=signif, n_jobs=n_jobs,
+                                   cache=cache).set_index('series')
+        for name, row in table.iterrows():
+            final[name] = row
+
+        remaining = [name for name in remaining if table.loc[name, 'needs_diff']]
+        if not remaining or d == max_diff:
+            break
+
+        transformed[remaining] = transformed[remaining].diff()
+        order[remaining] += 1
+
+    summary = pd.DataFrame([final[name] for name in data.columns], index=data.columns)
+    summary.index.name = 'series'
+    summary['diff_order'] = order
+    return transformed.dropna(), summary.reset_index()
@@ -0,0 +1,613 @@
+"""
+Modulo auxiliar: Atualizacao Incremental dos Indices (streaming)
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+Estende os artefatos processados apenas com os dias novos dos dados brutos,
+sem reprocessar o historico. O estado entre execucoes fica em
+data/processed/stream_state.npz (sem pickle):
+
+- ultimas linhas de precos (retornos log e simples com forward-fill);
+- janelas moveis com somas, quadrados e produtos cruzados (volatilidade
+  de 30 dias, correlacao rolling do indice de sincronizacao, variacao de
+  126 dias da concentracao defensiva);
+- momentos acumulados (contagem, media, M2) das series padronizadas pela
+  amostra inteira no indice de estresse;
+- bases das razoes e ultimas linhas de cada frequencia agregada (D/W/M);
+- autovetores da vespera da razao de absorcao (partida a quente);
+- no modo EWMA do indice de sincronizacao (SYNC_MODE=ewma), apenas os
+  momentos ponderados de cada meia-vida (synchrony.EwmaCorrelation).
+
+Cada fonte bruta (prices, macro, volatility) tem cursor proprio, a ultima
+data dela ja vista. O estado gravado e um checkpoint na data do cursor mais
+atrasado: cada execucao reprocessa a partir dele os dias de todas as fontes
+e regrava as linhas finais de cada artefato posteriores ao checkpoint
+(contagens tail_*). Assim dias de precos anteriores a dados macro adiantados
+nao sao pulados, e valores macro que chegam atrasados entram nas linhas ja
+gravadas.
+
+Cada dia novo custa O(janela + N^2) para N series na correlacao. Os
+z-scores de um dia novo usam os momentos de toda a amostra ate ele (igual
+ao processamento completo nesse dia); linhas ja gravadas mantem a
+normalizacao da data em que entraram ate o proximo processamento completo.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import artifacts
+from synchrony import AbsorptionTracker, EwmaCorrelation, ewma_columns
+
+STATE_PATH = 'data/processed/stream_state.npz'
+
+# Colunas agregadas por frequencia (como em aggregate_frequencies) e
+# artefato diario de origem de cada uma
+AGGREGATED_COLUMNS = ['STRESS_INDEX', 'EXPOSURE_RATIO', 'DEFENSIVE_RATIO']
+AGGREGATED_SOURCES = {
+    'STRESS_INDEX': 'data/processed/stress_index.csv',
+    'EXPOSURE_RATIO': 'data/processed/exposure_proxy.csv',
+    'DEFENSIVE_RATIO': 'data/processed/defensive_concentration.csv',
+}
+
+# Fontes brutas com cursor proprio
+CURSOR_SOURCES = ('prices', 'macro', 'volatility')
+
+
+class RollingWindow:
+    """Ultimas `window` linhas de n series com somas e produtos cruzados
+
+    Uma janela com NaN em uma serie da NaN nas estatisticas dessa serie
+    (como rolling(window) do pandas com min_periods=window). Com
+    cross=False so as somas e somas de quadrados de cada serie sao mantidas
+    (O(n) por linha; sem corr()), para quem opera direto sobre o buffer.
+    """
+
+    def __init__(self, window, n, buffer=None, position=0, filled=0, cross=True):
+        self.window = int(window)
+        self.buffer = np.full((self.window, n), np.nan) if buffer is None else np.array(buffer, dtype=float)
+        self.position = int(position)
+        self.filled = int(filled)
+        self.track_cross = cross
+        self._resync()
+
+    def _resync(self):
+        """Recalcula somas a partir do buffer (O(janela); limita erro acumulado)"""
+        rows = self.buffer[:self.filled] if self.filled < self.window else self.buffer
+        values = np.nan_to_num(rows)
+        self.sum = values.sum(axis=0)
+        self.squares = (values * values).sum(axis=0)
+        self.cross = values.T @ values if self.track_cross else None
+        self.missing = np.isnan(rows).sum(axis=0)
+        self._updates = 0
+
+    @property
+    def ready(self):
+        return self.filled == self.window
+
+    def oldest(self):
+        """Linha que sai da janela no proximo push (NaN se ainda incompleta)"""
+        return self.buffer[self.position] if self.ready else np.full(self.buffer.shape[1], np.nan)
+
+    def push(self, row):
+        row = np.asarray(row, dtype=float)
+
+        if self.ready:
+            old = self.buffer[self.position]
+            nan = np.isnan(old)
+            clean = np.where(nan, 0.0, old)
+            self.sum -= clean
+            self.squares -= clean * clean
+            if self.track_cross:
+                self.cross -= np.outer(clean, clean)
+            self.missing -= nan
+
+        nan = np.isnan(row)
+        clean = np.where(nan, 0.0, row)
+        self.sum += clean
+        self.squares += clean * clean
+        if self.track_cross:
+            self.cross += np.outer(clean, clean)
+        self.missing += nan
+
+        self.buffer[self.position] = row
+        self.position = (self.position + 1) % self.window
+        self.filled = min(self.filled + 1, self.window)
+
+        self._updates += 1
+        if self._updates >= self.window:
+            self._resync()
+
+    def std(self):
+        """Desvio padrao amostral de cada serie na janela"""
+        n = self.window
+        var = (self.squares - self.sum ** 2 / n) / (n - 1)
+        std = np.sqrt(np.maximum(var, 0))
+        std[(self.missing > 0) | (not self.ready)] = np.nan
+        return std
+
+    def corr(self):
+        """Matriz de correlacao (n x n) da janela"""
+        n = self.window
+        cov = self.cross - np.outer(self.sum, self.sum) / n
+        scale = np.sqrt(np.maximum(np.diag(cov), 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(scale, scale)
+        invalid = (self.missing > 0)
+        corr[invalid, :] = np.nan
+        corr[:, invalid] = np.nan
+        if not self.ready:
+            corr[:] = np.nan
+        return corr
+
+    def to_state(self, prefix):
+        return {f'{prefix}_buffer': self.buffer, f'{prefix}_position': self.position,
+                f'{prefix}_filled': self.filled}
+
+    @classmethod
+    def from_state(cls, state, prefix):
+        buffer = state[f'{prefix}_buffer']
+        return cls(buffer.shape[0], buffer.shape[1], buffer,
+                   state[f'{prefix}_position'], state[f'{prefix}_filled'])
+
+
+class RunningMoments:
+    """Contagem, media e M2 acumulados (Welford) de n series, ignorando NaN"""
+
+    def __init__(self, count, mean, m2):
+        self.count = np.array(count, dtype=float)
+        self.mean = np.array(mean, dtype=float)
+        self.m2 = np.array(m2, dtype=float)
+
+    @classmethod
+    def from_frame(cls, frame):
+        values = frame.to_numpy(dtype=float)
+        count = (~np.isnan(values)).sum(axis=0).astype(float)
+        mean = np.nanmean(values, axis=0) if len(values) else np.zeros(values.shape[1])
+        m2 = np.nansum((values - mean) ** 2, axis=0)
+        return cls(count, np.nan_to_num(mean), m2)
+
+    def update(self, row):
+        row = np.asarray(row, dtype=float)
+        valid = ~np.isnan(row)
+        self.count[valid] += 1
+        delta = row[valid] - self.mean[valid]
+        self.mean[valid] += delta / self.count[valid]
+        self.m2[valid] += delta * (row[valid] - self.mean[valid])
+
+    def zscore(self, row):
+        """(x - media) / desvio amostral, com os momentos ja atualizados"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(self.m2 / (self.count - 1))
+            return (np.asarray(row, dtype=float) - self.mean) / std
+
+
+def _period_label(date, rule):
+    return pd.tseries.frequencies.to_offset(rule).rollforward(date).normalize()
+
+
+class IndexStream:
+    """Estado e atualizacao incremental dos artefatos de 01_process_data e do
+    indice de sincronizacao de 03_synchronization"""
+
+    def __init__(self, state):
+        self._restore(state)
+
+    def _restore(self, state):
+        self.state = state
+        self.last_date = pd.Timestamp(state['last_date'])
+        self.end_date = pd.Timestamp(state['end_date'])
+        self.vol = RollingWindow.from_state(state, 'vol')
+        self.defensive = RollingWindow.from_state(state, 'defensive')
+        self.sync = RollingWindow.from_state(state, 'sync') if 'sync_buffer' in state else None
+        self.absorption = (AbsorptionTracker.from_state(state, 'absorption')
+                           if 'absorption_fraction' in state else None)
+        self.ewma = EwmaCorrelation.from_state(state, 'ewma') if 'ewma_half_lives' in state else None
+        self.moments = RunningMoments(state['z_count'], state['z_mean'], state['z_m2'])
+
+    # ------------------------------------------------------------------
+    # Estado
+
+    @classmethod
+    def initialize(cls, sources, specs, frequencies, sync_window, sync_etfs, absorption=None,
+                   half_lives=None):
+        """Monta o estado a partir do historico ja processado (uma vez, O(T))
+
+        `sources` sao as matrizes brutas (prices, macro, volatility), `specs`
+        o dicionario FEATURES de 01_process_data, `frequencies` o
+        config.FREQUENCIES, `sync_etfs` o config.sync_etfs (universo do
+        indice de sincronizacao), `absorption` a tupla (fracao, solver,
+        matriz, tolerancia) da razao de absorcao e `half_lives` as
+        meias-vidas do modo EWMA (None no modo rolling).
+
+        O cursor de cada fonte e a ultima data dela nos artefatos (retornos
+        para os precos, ultimo componente valido do indice de estresse para
+        macro e volatilidade); o checkpoint fica no mais atrasado deles.
+        """
+        stress = artifacts.read_frame('data/processed/stress_index.csv')
+        returns = artifacts.read_frame('data/processed/etf_returns.csv')
+        vol_ticker = specs['Z_VOL_30D']['columns'][0]
+
+        # Componentes do indice de estresse: (coluna, origem, coluna na origem)
+        components = []
+        for column in stress.columns.drop('STRESS_INDEX'):
+            if column == f'Z_VOL_{vol_ticker}_30D':
+                components.append((column, 'vol', vol_ticker))
+            elif column == 'Z_VOL_RATIO':
+                components.append((column, 'volatility', 'VOL_RATIO'))
+            else:
+                components.append((column, 'macro', column[2:]))
+
+        cursors = {'prices': returns.index[-1]}
+        for source in ('macro', 'volatility'):
+            columns = [c[0] for c in components if c[1] == source]
+            seen = stress[columns].dropna(how='all').index if columns else []
+            if len(seen):
+                cursors[source] = seen[-1]
+        last_date = min(cursors.values())
+
+        prices = sources['prices'].loc[:last_date]
+        tickers = list(prices.columns)
+
+        vol_spec, defensive_spec = specs['VOL_30D'], specs['DEFENSIVE_CHANGE_6M']
+        padded = prices.ffill()
+        simple = padded.pct_change(fill_method=None)
+        vol_history = simple.rolling(vol_spec['window']).std() * (vol_spec.get('annualize', 1) ** 0.5)
+
+        state = {
+            'last_date': np.datetime64(last_date, 'ns'),
+            'end_date': np.datetime64(stress.index[-1], 'ns'),
+            'cursor_names': np.array(list(cursors)),
+            'cursor_dates': np.array([np.datetime64(d, 'ns') for d in cursors.values()]),
+            'tickers': np.array(tickers),
+            'last_prices': prices.iloc[-1].to_numpy(dtype=float),
+            'padded_prices': padded.iloc[-1].to_numpy(dtype=float),
+            'vol_ticker': vol_ticker,
+            'vol_scale': float(vol_spec.get('annualize', 1) ** 0.5),
+        }
+
+        window = RollingWindow(vol_spec['window'], 1)
+        for value in simple[vol_ticker].iloc[-vol_spec['window']:]:
+            window.push([value])
+        state.update(window.to_state('vol'))
+
+        # Razoes normalizadas pela primeira linha (EXPOSURE/DEFENSIVE) e pela
+        # primeira observacao valida de cada par (PAIR_RATIOS)
+        ratios = []
+        for name in ['EXPOSURE_RATIO', 'DEFENSIVE_RATIO']:
+            spec = specs[name]
+            first = prices[spec['num']].iloc[0] / prices[spec['den']].iloc[0]
+            ratios.append((name, spec['num'], spec['den'], first / spec.get('base', 1)))
+
+        if artifacts.exists('data/processed/pair_ratios.csv'):
+            pair_ratios = artifacts.read_frame('data/processed/pair_ratios.csv')
+            base = specs['PAIR_RATIOS'].get('base', 1)
+            for name in pair_ratios.columns:
+                num, den = name.split('/')
+                raw = (prices[num] / prices[den]).dropna()
+                if len(raw):
+                    ratios.append((name, num, den, raw.iloc[0] / base))
+
+        state['ratio_names'] = np.array([r[0] for r in ratios])
+        state['ratio_num'] = np.array([tickers.index(r[1]) for r in ratios])
+        state['ratio_den'] = np.array([tickers.index(r[2]) for r in ratios])
+        state['ratio_scale'] = np.array([r[3] for r in ratios], dtype=float)
+
+        defensive_history = artifacts.read_frame('data/processed/defensive_concentration.csv') \
+            .loc[:last_date, 'DEFENSIVE_RATIO']
+        window = RollingWindow(defensive_spec['periods'], 1)
+        for value in defensive_history.iloc[-defensive_spec['periods']:]:
+            window.push([value])
+        state.update(window.to_state('defensive'))
+
+        raw = {}
+        for column, source, name in components:
+            raw[column] = vol_history[name] if source == 'vol' else sources[source].loc[:last_date, name]
+
+        moments = RunningMoments.from_frame(pd.DataFrame(raw)[[c[0] for c in components]])
+        state['z_names'] = np.array([c[0] for c in components])
+        state['z_sources'] = np.array([c[1] for c in components])
+        state['z_columns'] = np.array([c[2] for c in components])
+        state.update({'z_count': moments.count, 'z_mean': moments.mean, 'z_m2': moments.m2})
+
+        # Linhas finais de cada artefato posteriores ao checkpoint (regravadas
+        # pela proxima atualizacao)
+        tails = {}
+        for path in ['data/processed/etf_returns.csv', 'data/processed/stress_index.csv',
+                     'data/processed/exposure_proxy.csv', 'data/processed/defensive_concentration.csv',
+                     'data/processed/pair_ratios.csv', 'data/processed/synchronization_index.csv',
+                     'data/processed/absorption_ratio.csv']:
+            if artifacts.exists(path):
+                tails[path] = int((artifacts.read_frame(path).index > last_date).sum())
+
+        returns = returns.loc[:last_date]
+        if artifacts.exists('data/processed/synchronization_index.csv'):
+            sync = artifacts.read_frame('data/processed/synchronization_index.csv')
+            sync_tickers = sync_etfs(returns.columns)
+            window = RollingWindow(sync_window, len(sync_tickers))
+            for row in returns[sync_tickers].iloc[-sync_window:].to_numpy():
+                window.push(row)
+            state.update(window.to_state('sync'))
+            state['sync_tickers'] = np.array(sync_tickers)
+            # SYNC_INDEX e a media de todos os pares; colunas por par so se o
+            # artefato as tiver (SYNC_PAIR_COLUMNS)
+            state['sync_pair_columns'] = not sync.columns.str.startswith('SYNC_INDEX').all()
+            
+            if half_lives is not None:
+                # momentos ponderados ate o cursor (uma passada pelo historico)
+                tracker = EwmaCorrelation(half_lives, len(sync_tickers))
+                for row in returns[sync_tickers].to_numpy():
+                    tracker.update(row)
+                state.update(tracker.to_state('ewma'))
+
+            if absorption is not None and artifacts.exists('data/processed/absorption_ratio.csv'):
+                # autovetores da ultima janela: partida a quente do primeiro dia novo
+                tracker = AbsorptionTracker(*absorption)
+                tracker.update(window)
+                state.update(tracker.to_state('absorption'))
+
+        # Agregados no checkpoint: refeitos das series diarias ate ele (o
+        # periodo do checkpoint pode ter dias posteriores no artefato)
+        daily = pd.DataFrame({column: artifacts.read_frame(path)[column]
+                              for column, path in AGGREGATED_SOURCES.items() if artifacts.exists(path)})
+        daily = daily.loc[:last_date]
+        freqs = []
+        for freq, spec in frequencies.items():
+            if not artifacts.exists(spec['path']):
+                continue
+            frame = artifacts.read_frame(spec['path'])
+            columns = [c for c in AGGREGATED_COLUMNS if c in frame.columns]
+            settled = daily[columns] if spec['rule'] is None else daily[columns].resample(spec['rule']).last()
+            values = settled.to_numpy(dtype=float)
+            freqs.append(freq)
+            state[f'agg_{freq}_rule'] = spec['rule'] or ''
+            state[f'agg_{freq}_path'] = spec['path']
+            state[f'agg_{freq}_columns'] = np.array(columns)
+            state[f'agg_{freq}_label'] = np.datetime64(settled.index[-1], 'ns')
+            state[f'agg_{freq}_current'] = values[-1]
+            state[f'agg_{freq}_previous'] = values[-2] if len(values) > 1 else np.full(len(columns), np.nan)
+            tails[spec['path']] = int((frame.index > settled.index[-1]).sum())
+        state['agg_freqs'] = np.array(freqs)
+        state['tail_paths'] = np.array(list(tails))
+        state['tail_counts'] = np.array(list(tails.values()), dtype=int)
+
+        return cls(state)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            state = {key: data[key] if data[key].ndim else data[key].item() for key in data.files}
+        for key in ['last_date', 'end_date'] + [f'agg_{f}_label' for f in state['agg_freqs']]:
+            state[key] = np.datetime64(state[key], 'ns')
+        return cls(state)
+
+    def save(self, path=STATE_PATH):
+        """Grava o estado de forma atomica"""
+        self._store()
+
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **{key: np.asarray(value) for key, value in self.state.items()})
+        os.replace(tmp_path, path)
+
+    def _store(self):
+        """Copia o estado dos objetos (janelas, momentos, rastreadores) para self.state"""
+        self.state['last_date'] = np.datetime64(self.last_date, 'ns')
+        self.state['end_date'] = np.datetime64(self.end_date, 'ns')
+        self.state.update(self.vol.to_state('vol'))
+        self.state.update(self.defensive.to_state('defensive'))
+        if self.sync is not None:
+            self.state.update(self.sync.to_state('sync'))
+        if self.absorption is not None:
+            for key in ('absorption_basis', 'absorption_members'):
+                self.state.pop(key, None)
+            self.state.update(self.absorption.to_state('absorption'))
+        if self.ewma is not None:
+            self.state.update(self.ewma.to_state('ewma'))
+        self.state.update({'z_count': self.moments.count, 'z_mean': self.moments.mean,
+                           'z_m2': self.moments.m2})
+
+    def _snapshot(self, date):
+        """Copia independente do estado com o cursor em `date`"""
+        self.last_date = date
+        self._store()
+        return {key: value.copy() if isinstance(value, np.ndarray) else value
+                for key, value in self.state.items()}
+
+    # ------------------------------------------------------------------
+    # Atualizacao
+
+    def update(self, sources):
+        """Reprocessa as datas dos dados brutos posteriores ao checkpoint
+
+        Cada cursor avanca ate a ultima data da sua fonte e o checkpoint ate
+        o cursor mais atrasado. Devolve {artefato: (linhas desde o checkpoint
+        anterior, linhas finais a substituir)}.
+        """
+        state = self.state
+        tickers = list(state['tickers'])
+        prices = sources['prices'].reindex(columns=tickers)
+
+        dates = prices.index[prices.index > self.last_date]
+        for name in ('macro', 'volatility'):
+            if name in sources:
+                frame = sources[name]
+                dates = dates.union(frame.index[frame.index > self.last_date])
+
+        cursors = dict(zip(state['cursor_names'], state['cursor_dates']))
+        for name in cursors:
+            if name in sources and len(sources[name]):
+                cursors[name] = max(cursors[name], np.datetime64(sources[name].index[-1], 'ns'))
+        settled = min(cursors.values())
+        checkpoint = self._snapshot(self.last_date)
+        final = int((dates <= settled).sum())
+
+        rows = {key: [] for key in ['returns', 'stress', 'exposure', 'defensive', 'pairs', 'sync',
+                                    'absorption', 'daily']}
+        aggregated = {freq: {} for freq in state['agg_freqs'] if state[f'agg_{freq}_rule']}
+        replaced = {freq: 0 for freq in aggregated}
+
+        ratio_names = list(state['ratio_names'])
+        pair_slice = [i for i, name in enumerate(ratio_names) if '/' in name]
+        vol_column = tickers.index(str(state['vol_ticker']))
+        if self.sync is not None:
+            sync_columns = [tickers.index(t) for t in state['sync_tickers']]
+            upper = np.triu_indices(len(sync_columns), 1)
+
+        for date in dates:
+            price = prices.loc[date].to_numpy(dtype=float) if date in prices.index else None
+            ratio = None
+            vol = np.nan
+
+            if price is not None:
+                log_return = np.log(price / state['last_prices'])
+                state['last_prices'] = price
+                if not np.isnan(log_return).any():
+                    rows['returns'].append((date, log_return))
+                    if self.sync is not None:
+                        self.sync.push(log_return[sync_columns])
+                        if self.ewma is not None:
+                            self.ewma.update(log_return[sync_columns])
+                            rows['sync'].append((date, self.ewma.row(state['sync_pair_columns'])))
+                        else:
+                            corr = self.sync.corr()[upper]
+                            mean = np.nanmean(corr) if (~np.isnan(corr)).any() else np.nan
+                            rows['sync'].append((date, np.append(corr, mean) if state['sync_pair_columns']
+                                                 else np.array([mean])))
+                        if self.absorption is not None:
+                            rows['absorption'].append((date, np.array(self.absorption.update(self.sync))))
+
+                padded = np.where(np.isnan(price), state['padded_prices'], price)
+                simple = padded[vol_column] / state['padded_prices'][vol_column] - 1
+                state['padded_prices'] = padded
+                self.vol.push([simple])
+                vol = self.vol.std()[0] * state['vol_scale']
+
+                ratio = price[state['ratio_num']] / price[state['ratio_den']] / state['ratio_scale']
+                change = ratio[1] - self.defensive.oldest()[0]
+                self.defensive.push([ratio[1]])
+                rows['exposure'].append((date, ratio[:1]))
+                rows['defensive'].append((date, np.array([ratio[1], change])))
+                if pair_slice:
+                    rows['pairs'].append((date, ratio[pair_slice]))
+
+            raw = []
+            for source, column in zip(state['z_sources'], state['z_columns']):
+                if source == 'vol':
+                    raw.append(vol)
+                elif source in sources and date in sources[source].index:
+                    raw.append(float(sources[source].loc[date, column]))
+                else:
+                    raw.append(np.nan)
+
+            self.moments.update(raw)
+            z = self.moments.zscore(raw)
+            stress = np.nanmean(z) if (~np.isnan(z)).any() else np.nan
+            rows['stress'].append((date, np.append(stress, z)))
+
+            values = {'STRESS_INDEX': stress,
+                      'EXPOSURE_RATIO': ratio[0] if ratio is not None else np.nan,
+                      'DEFENSIVE_RATIO': ratio[1] if ratio is not None else np.nan}
+            self._aggregate(date, values, rows['daily'], aggregated, replaced)
+            if final and date == dates[final - 1]:
+                checkpoint = self._snapshot(date)
+
+        end_date = max(self.end_date, dates[-1]) if len(dates) else self.end_date
+        updates = self._collect(rows, aggregated, replaced, ratio_names, pair_slice, checkpoint)
+
+        checkpoint['end_date'] = np.datetime64(end_date, 'ns')
+        checkpoint['cursor_dates'] = np.array(list(cursors.values()))
+        self._restore(checkpoint)
+        return updates
+
+    def _aggregate(self, date, values, daily_rows, aggregated, replaced):
+        state = self.state
+
+        for freq in state['agg_freqs']:
+            columns = list(state[f'agg_{freq}_columns'])
+            row = np.array([values[c] for c in columns])
+            current = state[f'agg_{freq}_current']
+            rule = str(state[f'agg_{freq}_rule'])
+
+            if not rule:
+                daily_rows.append((date, np.concatenate([row, row - current])))
+                state[f'agg_{freq}_previous'], state[f'agg_{freq}_current'] = current, row
+                continue
+
+            label = _period_label(date, rule)
+            last_label = pd.Timestamp(state[f'agg_{freq}_label'])
+            out = aggregated[freq]
+
+            if label == last_label:
+                # resample().last(): ultimo valor valido de cada coluna no periodo
+                current = np.where(np.isnan(row), current, row)
+                if not out:
+                    replaced[freq] = 1
+            else:
+                # periodos sem dados entre o ultimo e o atual ficam como NaN
+                for gap in pd.date_range(last_label, label, freq=rule)[1:-1]:
+                    nan_row = np.full(len(columns), np.nan)
+                    out[gap] = np.concatenate([nan_row, nan_row - current])
+                    state[f'agg_{freq}_previous'], current = current, nan_row
+                state[f'agg_{freq}_previous'] = current
+                current = row
+
+            state[f'agg_{freq}_current'] = current
+            state[f'agg_{freq}_label'] = np.datetime64(label, 'ns')
+            out[label] = np.concatenate([current, current - state[f'agg_{freq}_previous']])
+
+    def _collect(self, rows, aggregated, replaced, ratio_names, pair_slice, checkpoint):
+        """Quadros por artefato; linhas a substituir = cauda do checkpoint
+        anterior (+ periodo do checkpoint regravado nos agregados). Grava em
+        `checkpoint` a cauda apos o novo checkpoint."""
+        state = self.state
+
+        def frame(items, columns, name='Date'):
+            index = pd.DatetimeIndex([date for date, _ in items], name=name)
+            return pd.DataFrame([values for _, values in items], index=index, columns=columns)
+
+        updates = {
+            'data/processed/etf_returns.csv': (frame(rows['returns'], list(state['tickers'])), 0),
+            'data/processed/stress_index.csv': (frame(rows['stress'], ['STRESS_INDEX'] + list(state['z_names'])), 0),
+            'data/processed/exposure_proxy.csv': (frame(rows['exposure'], ['EXPOSURE_RATIO']), 0),
+            'data/processed/defensive_concentration.csv':
+                (frame(rows['defensive'], ['DEFENSIVE_RATIO', 'DEFENSIVE_CHANGE_6M']), 0),
+        }
+        if pair_slice:
+            updates['data/processed/pair_ratios.csv'] = \
+                (frame(rows['pairs'], [ratio_names[i] for i in pair_slice]), 0)
+        if self.sync is not None:
+            tickers = list(state['sync_tickers'])
+            if self.ewma is not None:
+                columns = ewma_columns(tickers, self.ewma.half_lives, state['sync_pair_columns'])
+            else:
+                upper = np.triu_indices(len(tickers), 1)
+                pairs = [f'{tickers[i]}_{tickers[j]}' for i, j in zip(*upper)] if state['sync_pair_columns'] else []
+                columns = pairs + ['SYNC_INDEX']
+            updates['data/processed/synchronization_index.csv'] = (frame(rows['sync'], columns), 0)
+        if self.absorption is not None:
+            updates['data/processed/absorption_ratio.csv'] = \
+                (frame(rows['absorption'], ['ABSORPTION_RATIO', 'EIGEN_SHARE', 'N_ASSETS']), 0)
+
+        for freq in state['agg_freqs']:
+            columns = list(state[f'agg_{freq}_columns'])
+            columns = columns + [f'DELTA_{c}' for c in columns]
+            path = str(state[f'agg_{freq}_path'])
+            if freq in aggregated:
+                items = list(aggregated[freq].items())
+                updates[path] = (frame(items, columns), replaced[freq])
+            else:
+                updates[path] = (frame(rows['daily'], columns), 0)
+
+        # Cauda: linhas apos o checkpoint (apos o periodo dele nos agregados)
+        previous = dict(zip(state['tail_paths'], state['tail_counts']))
+        limits = {str(state[f'agg_{freq}_path']): pd.Timestamp(checkpoint[f'agg_{freq}_label'])
+                  for freq in aggregated}
+        tails = {}
+        for path, (new_rows, replace_last) in updates.items():
+            updates[path] = (new_rows, replace_last + int(previous.get(path, 0)))
+            limit = limits.get(path, pd.Timestamp(checkpoint['last_date']))
+            tails[path] = int((new_rows.index > limit).sum())
+
+        checkpoint['tail_paths'] = np.array(list(tails))
+        checkpoint['tail_counts'] = np.array(list(tails.values()), dtype=int)
+        return updates
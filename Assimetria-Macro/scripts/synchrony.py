@@ -0,0 +1,523 @@
+"""
+Modulo auxiliar: Motor de Sincronizacao (correlacao rolling em lote)
+Framework: Preparacao Assimetrica e Crises Sistemicas
+
+Correlacao rolling de todos os pares de um universo de ETFs de uma vez, no
+lugar de um `rolling(window).corr()` do pandas por par.
+
+- Tensor completo (T x N x N): somas, quadrados e produtos cruzados de cada
+  janela saem da diferenca de somas acumuladas, numa unica passada pelos
+  dados, O(T * N^2) no total, independente do tamanho da janela.
+- Apenas o SYNC_INDEX (media das correlacoes dos pares): a soma de todas as
+  correlacoes da janela e a forma quadratica a' C a, com C a covariancia da
+  janela e a = 1/desvio de cada serie. Ela sai de Y = X_janela a (um produto
+  matriz-vetor por janela), O(T * N * janela) e memoria O(T * janela): o
+  tensor nunca e montado, o que viabiliza universos de centenas de ETFs.
+
+Mesma convencao do pandas (min_periods = janela): uma serie com NaN ou
+variancia nula na janela fica de fora (correlacao NaN) e a media ignora os
+pares invalidos.
+
+Modo EWMA (EwmaCorrelation): pesos exponenciais com meias-vidas
+configuraveis no lugar da janela fixa; o estado e so o conjunto de momentos
+ponderados atuais, entao cada dia novo custa O(N^2) qualquer que seja o
+historico e o estado pode ser gravado e retomado.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Limite de memoria (bytes) de cada bloco de janelas no modo so-indice
+CHUNK_BYTES = 32 * 1024 ** 2
+
+
+def _prepare(values):
+    """Centraliza pelas medias da amostra (estabilidade das somas acumuladas)
+    e troca NaN por zero; devolve (valores, mascara de faltantes)"""
+    values = np.asarray(values, dtype=float)
+    missing = np.isnan(values)
+    with np.errstate(invalid='ignore'):
+        center = np.nan_to_num(np.nanmean(np.where(missing, np.nan, values), axis=0))
+    return np.where(missing, 0.0, values - center), missing
+
+
+def _window_sums(values, window):
+    """Soma de cada janela terminada em t pela diferenca de somas acumuladas
+    (NaN antes da primeira janela completa); aceita arrays (T, ...)"""
+    total = np.cumsum(values, axis=0)
+    sums = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        sums[window - 1] = total[window - 1]
+        sums[window:] = total[window:] - total[:-window]
+    return sums
+
+
+def _window_stats(x, missing, window):
+    """Somas e somas de quadrados centradas e validade de cada serie por janela"""
+    sums = _window_sums(x, window)
+    squares = _window_sums(x * x, window)
+    gaps = _window_sums(missing.astype(float), window)
+
+    var = squares - sums ** 2 / window
+    with np.errstate(invalid='ignore'):
+        # variancia nula (serie constante na janela) vira apenas erro de arredondamento
+        valid = (gaps == 0) & (var > 1e-12 * squares)
+    return sums, var, valid
+
+
+def rolling_correlation_tensor(values, window):
+    """Correlacao rolling de todos os pares: array (T, N, N)
+
+    Linha t usa as observacoes t-window+1..t; NaN antes da primeira janela
+    completa e para series com NaN ou variancia nula na janela.
+    """
+    x, missing = _prepare(values)
+    sums, var, valid = _window_stats(x, missing, window)
+
+    cross = np.einsum('ti,tj->tij', x, x)
+    np.cumsum(cross, axis=0, out=cross)
+    if len(x) >= window:
+        cross[window:] -= cross[:-window]
+    cross[:window - 1] = np.nan
+
+    cross -= sums[:, :, None] * sums[:, None, :] / window
+    scale = np.sqrt(np.where(valid, var, np.nan))
+    cross /= scale[:, :, None]
+    cross /= scale[:, None, :]
+
+    n = x.shape[1]
+    diagonal = np.arange(n)
+    cross[:, diagonal, diagonal] = np.where(valid, 1.0, np.nan)
+    return cross
+
+
+def rolling_mean_correlation(values, window, chunk_bytes=CHUNK_BYTES):
+    """Media das correlacoes rolling de todos os pares sem montar o tensor
+
+    Soma das correlacoes da janela = a' C a = sum(Y^2) - sum(Y)^2 / window,
+    com Y = X_janela a e a = 1/desvio (zero para series invalidas). Com k
+    series validas a media dos k(k-1)/2 pares e (a' C a - k) / (k(k-1)).
+    """
+    x, missing = _prepare(values)
+    n_obs, n = x.shape
+    mean = np.full(n_obs, np.nan)
+    if n_obs < window:
+        return mean
+
+    _, var, valid = _window_stats(x, missing, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.where(valid, 1.0 / np.sqrt(var), 0.0)[window - 1:]
+
+    windows = np.lib.stride_tricks.sliding_window_view(x, window, axis=0)  # (T-w+1, N, w)
+    step = max(1, chunk_bytes // (8 * n * window))
+    quadratic = np.empty(len(windows))
+
+    for start in range(0, len(windows), step):
+        block = slice(start, start + step)
+        y = np.matmul(weights[block, None, :], windows[block])[:, 0, :]
+        quadratic[block] = (y * y).sum(axis=1) - y.sum(axis=1) ** 2 / window
+
+    k = valid[window - 1:].sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean[window - 1:] = np.where(k >= 2, (quadratic - k) / (k * (k - 1)), np.nan)
+    return mean
+
+
+def sync_index(returns, window, pair_columns=True):
+    """Indice de sincronizacao: correlacoes rolling dos pares (colunas
+    'A_B', se pair_columns) e SYNC_INDEX, a media dos pares validos"""
+    tickers = list(returns.columns)
+
+    if not pair_columns:
+        return pd.DataFrame({'SYNC_INDEX': rolling_mean_correlation(returns.to_numpy(), window)},
+                            index=returns.index)
+
+    tensor = rolling_correlation_tensor(returns.to_numpy(), window)
+    upper = np.triu_indices(len(tickers), 1)
+    pairs = tensor[:, upper[0], upper[1]]
+
+    df = pd.DataFrame(pairs, index=returns.index,
+                      columns=[f"{tickers[i]}_{tickers[j]}" for i, j in zip(*upper)])
+    with np.errstate(invalid='ignore'):
+        df['SYNC_INDEX'] = df.mean(axis=1)
+    return df
+
+
+class AbsorptionTracker:
+    """Razao de absorcao de uma sequencia de janelas moveis de retornos
+
+    ABSORPTION_RATIO = soma dos k maiores autovalores da matriz da janela /
+    traco (k = fracao do universo) e EIGEN_SHARE = maior autovalor / traco.
+    A matriz e a correlacao (padrao: uma serie muito volatil nao domina o
+    espectro, mesma escolha do indice de sincronizacao) ou a covariancia
+    (matrix='cov', a definicao de Kritzman et al.). Com Z a janela centrada
+    e escalada (Z'Z = matriz), o produto por um bloco de vetores e Z'(Z Q),
+    O(janela * N * b), direto do buffer e das somas de um
+    streaming.RollingWindow: a matriz N x N nunca e montada nos dias a
+    quente.
+
+    Solver 'warm': so os m autovalores separados do ruido sao seguidos por
+    iteracao de subespaco (b = m + OVERSAMPLE vetores, Rayleigh-Ritz)
+    partindo dos autovetores da vespera. m conta os autovalores acima da
+    borda de Marchenko-Pastur no ultimo dia exato (no maximo MAX_LEADING),
+    recuando ate lambda_{b+1} / lambda_m <= SEPARATION, para que poucos
+    passos bastem. Os m valores de Ritz sao aceitos quando a soma de
+    ||r||^2 / (theta_m - theta_{m+1}), o erro de segunda ordem de cada um,
+    e <= LEADING_SHARE * tol * traco; sem isso em WARM_ITERATIONS passos o
+    dia e exato e a proxima tentativa espera 1, 2, 4... dias (ate
+    MAX_BACKOFF).
+
+    Os autovalores m+1..k ficam no meio do ruido, onde nenhuma iteracao
+    converge: essa parte do numerador e o traco menos os m lideres vezes a
+    fracao que ela tinha do resto do espectro no ultimo dia exato. Cada dia
+    exato confere a previsao: erro na razao acima de `tol` encurta pela
+    metade o intervalo ate o proximo dia exato, abaixo de LEADING_SHARE *
+    tol dobra (1 a MAX_REFRESH dias). Com k <= m a razao sai so dos lideres.
+
+    Dias exatos (e sempre com 'eigh') fazem uma unica decomposicao: de Z'Z
+    ou, se a janela e menor que N, da matriz de Gram Z Z', que tem os mesmos
+    autovalores nao nulos. Com N ou a janela abaixo de WARM_MIN_SIZE essa
+    decomposicao ja e barata e 'warm' e sempre exato.
+    """
+
+    SOLVERS = ('warm', 'eigh')
+    MATRICES = ('corr', 'cov')
+    OVERSAMPLE = 5
+    MAX_LEADING = 10
+    WARM_MIN_SIZE = 100
+    SEPARATION = 0.3
+    LEADING_SHARE = 0.25
+    WARM_ITERATIONS = 10
+    MAX_BACKOFF = 64
+    MAX_REFRESH = 64
+
+    def __init__(self, fraction=0.2, solver='warm', matrix='corr', tol=1e-3,
+                 basis=None, members=None, share=np.nan, countdown=0, interval=1,
+                 skip=0, backoff=1):
+        if solver not in self.SOLVERS:
+            raise ValueError(f"solver invalido: {solver} (opcoes: {', '.join(self.SOLVERS)})")
+        if matrix not in self.MATRICES:
+            raise ValueError(f"matriz invalida: {matrix} (opcoes: {', '.join(self.MATRICES)})")
+        self.fraction = float(fraction)
+        self.solver = solver
+        self.matrix = matrix
+        self.tol = float(tol)
+        self.basis = None if basis is None else np.array(basis, dtype=float)
+        self.members = None if members is None else np.array(members, dtype=bool)
+        self.share = float(share)
+        self.countdown = int(countdown)
+        self.interval = int(interval)
+        self.skip = int(skip)
+        self.backoff = int(backoff)
+        self.iterations = 0
+        self.exact = 0
+        self.approximated = 0
+
+    @property
+    def leading(self):
+        """Autovalores seguidos a quente (0 sem base)"""
+        return 0 if self.basis is None else self.basis.shape[1] - self.OVERSAMPLE
+
+    def components(self, n):
+        return min(n, max(1, int(round(self.fraction * n))))
+
+    def _moments(self, window):
+        """(series validas, medias, escalas, traco) das somas da janela"""
+        w = window.window
+        mean = window.sum / w
+        ss = window.squares - window.sum * mean
+        with np.errstate(invalid='ignore'):
+            members = (window.missing == 0) & (ss > 1e-12 * window.squares)
+        mean, ss = mean[members], ss[members]
+        if self.matrix == 'corr':
+            return members, mean, 1.0 / np.sqrt(ss), float(members.sum())
+        return members, mean, np.full(len(ss), 1.0 / np.sqrt(w - 1)), ss.sum() / (w - 1)
+
+    def _exact(self, rows, vectors):
+        """Autovalores exatos (decrescentes) de Z'Z; com vectors=True devolve
+        tambem os MAX_LEADING + OVERSAMPLE primeiros autovetores"""
+        self.exact += 1
+        z = rows - rows.mean(axis=0)
+        if self.matrix == 'corr':
+            z /= np.sqrt((z * z).sum(axis=0))
+        else:
+            z /= np.sqrt(len(z) - 1)
+        # Z Z' tem os mesmos autovalores nao nulos e autovetores u -> Z'u / sqrt(lambda)
+        gram = len(z) < z.shape[1]
+        matrix = z @ z.T if gram else z.T @ z
+        if not vectors:
+            return np.linalg.eigvalsh(matrix)[::-1], None
+
+        values, basis = np.linalg.eigh(matrix)
+        values, basis = values[::-1], basis[:, ::-1]
+        block = min(self.MAX_LEADING + self.OVERSAMPLE, z.shape[1])
+        if gram:
+            rank = min(block, int((values > 1e-12 * values[0]).sum()))
+            basis = z.T @ basis[:, :rank] / np.sqrt(values[:rank])
+            if rank < block:
+                # bloco maior que o posto da janela: completa com direcoes do nucleo
+                extra = np.random.default_rng(0).normal(size=(len(basis), block - rank))
+                basis = np.linalg.qr(np.hstack([basis, extra]))[0]
+        return values, basis[:, :block]
+
+    def _separated(self, values, trace, n, w):
+        """Autovalores acima da borda de Marchenko-Pastur do ruido restante,
+        recuados ate o ultimo com convergencia rapida da iteracao em bloco
+        (lambda_{m+OVERSAMPLE+1} / lambda_m <= SEPARATION)"""
+        m = 0
+        while m < min(self.MAX_LEADING, len(values) - 1, n - 1):
+            noise = (trace - values[:m].sum()) / (n - m)
+            if values[m] <= noise * (1 + np.sqrt((n - m) / (w - 1))) ** 2:
+                break
+            m += 1
+        while m and m + self.OVERSAMPLE < len(values) and \
+                values[m + self.OVERSAMPLE] > self.SEPARATION * values[m - 1]:
+            m -= 1
+        return m
+
+    def _refresh(self, values, basis, trace, n, k, w):
+        """Confere a previsao da cauda contra o dia exato e recalcula a fracao"""
+        lead = self.leading
+        if lead and lead < k and not np.isnan(self.share):
+            top = values[:lead].sum()
+            error = abs(top + (trace - top) * self.share - values[:k].sum()) / trace
+            if error > self.tol:
+                self.interval = max(1, self.interval // 2)
+            elif error <= self.LEADING_SHARE * self.tol:
+                self.interval = min(self.MAX_REFRESH, 2 * self.interval)
+
+        m = self._separated(values, trace, n, w)
+        top = values[:m].sum()
+        self.share = values[m:k].sum() / (trace - top) if k > m else np.nan
+        self.countdown = self.interval
+        # bloco de ate metade do universo: acima disso a iteracao nao compensa;
+        # um lider novo alem da base atual pede autovetores no proximo dia
+        eligible = basis is not None and m and 2 * (m + self.OVERSAMPLE) <= n
+        if eligible and m + self.OVERSAMPLE > basis.shape[1]:
+            self.basis, self.countdown = None, 0
+        else:
+            self.basis = basis[:, :m + self.OVERSAMPLE] if eligible else None
+
+    def _warm(self, rows, mean, scale, trace, m):
+        """Iteracao de subespaco a partir de self.basis; None se os m pares
+        de Ritz lideres nao atingirem o residuo exigido em WARM_ITERATIONS
+        passos"""
+
+        def apply(q):
+            # Z'(Z q) com Z = (X - 1 media') diag(escala), sem montar Z
+            v = q * scale[:, None]
+            y = rows @ v - mean @ v
+            return (rows.T @ y - mean[:, None] * y.sum(axis=0)) * scale[:, None]
+
+        basis = self.basis
+        previous = np.nan
+        for step in range(self.WARM_ITERATIONS):
+            self.iterations += 1
+            image = apply(basis)
+            ritz, rotation = np.linalg.eigh(basis.T @ image)
+            ritz, rotation = ritz[::-1], rotation[:, ::-1]
+            image = image @ rotation
+            residual = image[:, :m] - (basis @ rotation[:, :m]) * ritz[:m]
+            # erro de cada valor de Ritz ~ ||r||^2 / distancia ao resto do espectro
+            error = (residual * residual).sum() / max(ritz[m - 1] - ritz[m], 1e-12 * ritz[0])
+            target = self.LEADING_SHARE * self.tol * trace
+            basis = np.linalg.qr(image)[0]
+            if error <= target:
+                # a imagem ja e um passo mais perto dos autovetores: parte dela amanha
+                self.basis = basis
+                return ritz
+            # o residuo cai por um fator fixo por passo: desiste se a taxa
+            # observada nao chega ao alvo nos passos restantes
+            if step >= 2 and error * min(1.0, error / previous) ** (self.WARM_ITERATIONS - 1 - step) > target:
+                return None
+            previous = error
+        return None
+
+    def update(self, window):
+        """(ABSORPTION_RATIO, EIGEN_SHARE, series validas) da janela atual de
+        um streaming.RollingWindow; series com NaN na janela ficam de fora"""
+        members, mean, scale, trace = self._moments(window)
+        n = int(members.sum())
+        if n < 2:
+            self.basis = self.members = None
+            return np.nan, np.nan, n
+
+        rows = window.buffer if members.all() else window.buffer[:, members]
+        k = self.components(n)
+        m = self.leading
+        same = self.basis is not None and np.array_equal(members, self.members)
+        self.members = members
+
+        basis = None
+        if same and not self.skip:
+            ritz = self._warm(rows, mean, scale, trace, m)
+            if ritz is None:
+                self.skip, self.backoff = self.backoff, min(2 * self.backoff, self.MAX_BACKOFF)
+            else:
+                self.backoff = 1
+                if k <= m:
+                    return ritz[:k].sum() / trace, ritz[0] / trace, n
+                if self.countdown > 0:
+                    self.countdown -= 1
+                    self.approximated += 1
+                    top = ritz[:m].sum()
+                    return (top + (trace - top) * self.share) / trace, ritz[0] / trace, n
+                # dia de conferencia: lideres ja atualizados, so os autovalores
+                basis = self.basis
+        elif self.skip:
+            self.skip -= 1
+
+        # decomposicao exata (N x N ou Gram janela x janela) barata: sem iteracao
+        large = self.solver == 'warm' and min(n, len(rows)) >= self.WARM_MIN_SIZE
+        values, vectors = self._exact(rows, large and not self.skip and basis is None)
+        if large:
+            self._refresh(values, vectors if basis is None else basis, trace, n, k, len(rows))
+        return values[:k].sum() / trace, values[0] / trace, n
+
+    def to_state(self, prefix):
+        state = {f'{prefix}_fraction': self.fraction, f'{prefix}_solver': self.solver,
+                 f'{prefix}_matrix': self.matrix, f'{prefix}_tol': self.tol,
+                 f'{prefix}_share': self.share, f'{prefix}_countdown': self.countdown,
+                 f'{prefix}_interval': self.interval,
+                 f'{prefix}_skip': self.skip, f'{prefix}_backoff': self.backoff}
+        if self.basis is not None:
+            state.update({f'{prefix}_basis': self.basis, f'{prefix}_members': self.members})
+        return state
+
+    @classmethod
+    def from_state(cls, state, prefix):
+        return cls(float(state[f'{prefix}_fraction']), str(state[f'{prefix}_solver']),
+                   str(state.get(f'{prefix}_matrix', 'corr')), float(state.get(f'{prefix}_tol', 1e-3)),
+                   basis=state.get(f'{prefix}_basis'), members=state.get(f'{prefix}_members'),
+                   share=float(state.get(f'{prefix}_share', np.nan)),
+                   countdown=int(state.get(f'{prefix}_countdown', 0)),
+                   interval=int(state.get(f'{prefix}_interval', 1)),
+                   skip=int(state.get(f'{prefix}_skip', 0)), backoff=int(state.get(f'{prefix}_backoff', 1)))
+
+
+def absorption_ratio(returns, window, fraction=0.2, solver='warm', matrix='corr', tol=1e-3):
+    """Razao de absorcao e participacao do 1o autovalor em janela movel
+
+    Devolve (DataFrame com ABSORPTION_RATIO, EIGEN_SHARE e N_ASSETS,
+    tracker com as contagens de iteracoes, solucoes exatas e dias com a
+    cauda do numerador aproximada).
+    """
+    from streaming import RollingWindow
+
+    values = returns.to_numpy(dtype=float)
+    rolling = RollingWindow(window, values.shape[1], cross=False)
+    tracker = AbsorptionTracker(fraction, solver, matrix, tol)
+    rows = np.full((len(values), 3), np.nan)
+
+    for t, row in enumerate(values):
+        rolling.push(row)
+        if rolling.ready:
+            rows[t] = tracker.update(rolling)
+
+    df = pd.DataFrame(rows, index=returns.index, columns=['ABSORPTION_RATIO', 'EIGEN_SHARE', 'N_ASSETS'])
+    return df, tracker
+
+
+class EwmaCorrelation:
+    """Correlacao com pesos exponenciais de n series para varias meias-vidas
+
+    Pesos (1 - alpha)^i, alpha = 1 - 0.5^(1 / meia-vida), como o
+    ewm(halflife=h, adjust=True) do pandas: a correlacao coincide com
+    ewm(halflife=h, min_periods=ceil(h)).corr(). O estado de cada meia-vida
+    e a soma dos pesos, a media ponderada e o segundo momento centrado
+    ponderado (atualizacao de West), de forma que um dia novo custa
+    O(H * n^2) e to_state/from_state gravam e retomam o feed sem historico.
+    Linhas com NaN em alguma serie nao atualizam o estado.
+    """
+
+    def __init__(self, half_lives, n, weight=None, mean=None, moment=None, count=0):
+        self.half_lives = np.atleast_1d(np.asarray(half_lives, dtype=float))
+        if not len(self.half_lives) or (self.half_lives <= 0).any():
+            raise ValueError(f"meias-vidas invalidas: {list(self.half_lives)}")
+        h = len(self.half_lives)
+        self.decay = 0.5 ** (1.0 / self.half_lives)
+        self.min_periods = np.ceil(self.half_lives).astype(int)
+        self.weight = np.zeros(h) if weight is None else np.array(weight, dtype=float)
+        self.mean = np.zeros((h, n)) if mean is None else np.array(mean, dtype=float)
+        self.moment = np.zeros((h, n, n)) if moment is None else np.array(moment, dtype=float)
+        self.count = int(count)
+
+    @property
+    def labels(self):
+        return [f"SYNC_INDEX_HL{h:g}" for h in self.half_lives]
+
+    def update(self, row):
+        """Incorpora uma linha de retornos; False se ela tiver NaN (ignorada)"""
+        row = np.asarray(row, dtype=float)
+        if np.isnan(row).any():
+            return False
+
+        previous = self.decay * self.weight
+        self.weight = previous + 1.0
+        delta = row - self.mean
+        self.mean += delta / self.weight[:, None]
+        self.moment *= self.decay[:, None, None]
+        self.moment += (previous / self.weight)[:, None, None] * delta[:, :, None] * delta[:, None, :]
+        self.count += 1
+        return True
+
+    def corr(self):
+        """Correlacoes (H, n, n); NaN antes de min_periods observacoes e para
+        series sem variancia"""
+        scale = np.sqrt(np.maximum(np.diagonal(self.moment, axis1=1, axis2=2), 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.moment / scale[:, :, None] / scale[:, None, :]
+        invalid = ~(scale > 0) | (self.count < self.min_periods)[:, None]
+        corr[invalid[:, :, None] | invalid[:, None, :]] = np.nan
+
+        diagonal = np.arange(corr.shape[1])
+        corr[:, diagonal, diagonal] = np.where(invalid, np.nan, 1.0)
+        return corr
+
+    def row(self, pair_columns=True):
+        """Linha do indice: pares da 1a meia-vida (se pair_columns), SYNC_INDEX
+        (1a meia-vida) e SYNC_INDEX_HL<h> de cada meia-vida"""
+        corr = self.corr()
+        upper = np.triu_indices(corr.shape[1], 1)
+        pairs = corr[:, upper[0], upper[1]]
+        valid = ~np.isnan(pairs)
+        with np.errstate(invalid='ignore'):
+            means = np.where(valid.any(axis=1), np.nansum(pairs, axis=1) / valid.sum(axis=1), np.nan)
+        head = pairs[0] if pair_columns else np.empty(0)
+        return np.concatenate([head, means[:1], means])
+
+    def to_state(self, prefix):
+        return {f'{prefix}_half_lives': self.half_lives, f'{prefix}_weight': self.weight,
+                f'{prefix}_mean': self.mean, f'{prefix}_moment': self.moment,
+                f'{prefix}_count': self.count}
+
+    @classmethod
+    def from_state(cls, state, prefix):
+        mean = state[f'{prefix}_mean']
+        return cls(state[f'{prefix}_half_lives'], mean.shape[1], state[f'{prefix}_weight'], mean,
+                   state[f'{prefix}_moment'], state[f'{prefix}_count'])
+
+
+def ewma_columns(tickers, half_lives, pair_columns=True):
+    """Colunas de EwmaCorrelation.row para o universo `tickers`"""
+    upper = np.triu_indices(len(tickers), 1)
+    pairs = [f"{tickers[i]}_{tickers[j]}" for i, j in zip(*upper)] if pair_columns else []
+    return pairs + ['SYNC_INDEX'] + [f"SYNC_INDEX_HL{float(h):g}" for h in half_lives]
+
+
+def ewma_sync_index(returns, half_lives, pair_columns=True):
+    """Indice de sincronizacao EWMA numa passada pelos retornos
+
+    Devolve (DataFrame com as colunas de ewma_columns, EwmaCorrelation com o
+    estado apos a ultima linha, pronto para continuar o feed).
+    """
+    values = returns.to_numpy(dtype=float)
+    tracker = EwmaCorrelation(half_lives, values.shape[1])
+    columns = ewma_columns(list(returns.columns), tracker.half_lives, pair_columns)
+    rows = np.full((len(values), len(columns)), np.nan)
+
+    for t, row in enumerate(values):
+        tracker.update(row)
+        rows[t] = tracker.row(pair_columns)
+
+    return pd.DataFrame(rows, index=returns.index, columns=columns), tracker
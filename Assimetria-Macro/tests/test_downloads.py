@@ -0,0 +1,165 @@
+"""
+Testes dos utilitarios de download (sem acesso a rede)
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'scripts'))
+
+import fetching
+
+
+def test_retry_then_success():
+    """Falhas transitorias sao repetidas ate o sucesso"""
+    calls = []
+    
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TimeoutError('timeout')
+        return 'ok'
+    
+    result, attempts = fetching.call_with_retries(flaky, max_retries=3, retry_delay=0.001)
+    assert result == 'ok' and attempts == 3
+
+
+def test_permanent_errors_not_retried():
+    """HTTP 4xx falha na primeira tentativa; 429 e 5xx sao repetidos"""
+    class HTTPError(Exception):
+        def __init__(self, status):
+            super().__init__(f'HTTP {status}')
+            self.response = type('Response', (), {'status_code': status})()
+    
+    for status, expected in ((404, 1), (400, 1), (429, 3), (503, 3)):
+        calls = []
+        
+        def failing():
+            calls.append(1)
+            raise HTTPError(status)
+        
+        with pytest.raises(HTTPError):
+            fetching.call_with_retries(failing, max_retries=2, retry_delay=0.001)
+        assert len(calls) == expected
+    
+    calls = []
+    
+    def bad_series():
+        calls.append(1)
+        raise KeyError('serie inexistente')
+    
+    with pytest.raises(KeyError):
+        fetching.call_with_retries(bad_series, max_retries=3, retry_delay=0.001)
+    assert len(calls) == 1
+
+
+def test_partial_failure_report():
+    """Series que esgotam as tentativas sao reportadas sem derrubar as demais"""
+    def broken():
+        raise IOError('404')
+    
+    results, failures = fetching.fetch_all(
+        {'A': lambda: 1, 'B': broken, 'C': lambda: 3},
+        max_workers=3, max_retries=1, retry_delay=0.001
+    )
+    
+    assert results == {'A': 1, 'C': 3}
+    assert list(failures) == ['B']
+
+
+def test_rate_limiter():
+    """Token bucket limita a taxa apos a rajada inicial"""
+    limiter = fetching.RateLimiter(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def _load_download_script():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+    from run_pipeline import load_script
+    return load_script(os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                    'scripts', '00_download_data.py'))
+
+
+def test_incremental_price_cache(tmp_path, monkeypatch):
+    """Segunda execucao busca apenas a cauda (com sobreposicao) e mescla"""
+    import pandas as pd
+    import providers
+    module = _load_download_script()
+    requests_made = []
+    
+    class FakeProvider(providers.DataProvider):
+        name = 'fake'
+        cacheable = True
+        
+        def fetch_prices(self, tickers, start_date, end_date):
+            requests_made.append(start_date)
+            index = pd.bdate_range(start_date, end_date, inclusive='left')
+            return {t: pd.Series(100.0 + index.dayofyear, index=index) for t in tickers}
+    
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/raw')
+    monkeypatch.setenv('USE_CACHE', 'True')
+    
+    first = module.download_etf_data(FakeProvider())
+    second = module.download_etf_data(FakeProvider())
+    
+    assert requests_made[0] == '2015-01-01'
+    assert requests_made[1] > '2015-01-01'
+    assert len(requests_made) == 2
+    assert second.equals(first)
+
+
+def test_price_revision_forces_refresh():
+    """Mudanca nos dias sobrepostos invalida o historico em cache"""
+    import pandas as pd
+    module = _load_download_script()
+    
+    index = pd.bdate_range('2024-01-01', periods=10)
+    cached = pd.Series(range(10), index=index, dtype=float) + 1
+    
+    tail = cached.iloc[-3:].copy()
+    tail.loc[index[-1] + pd.offsets.BDay()] = 11.0
+    assert len(module.merge_price_history(cached, tail)) == 11
+    
+    assert module.merge_price_history(cached, tail * 0.98) is None
+
+
+def test_synthetic_provider_deterministic():
+    """Mesmo dia gera o mesmo valor independente do periodo solicitado"""
+    import providers
+    
+    provider = providers.SyntheticProvider(seed=7)
+    full = provider.fetch_prices(['FXI', 'SPY'], '2020-01-01', '2020-12-31')
+    tail = providers.SyntheticProvider(seed=7).fetch_prices(['SPY'], '2020-06-01', '2020-12-31')
+    
+    assert tail['SPY'].equals(full['SPY'].loc['2020-06-01':])
+    assert full['FXI'].index[0] >= __import__('pandas').Timestamp('2020-01-01')
+    
+    macro = provider.fetch_series('VIXCLS', '2020-01-01', '2020-03-31')
+    assert len(macro) > 50 and macro.notna().all()
+
+
+def test_price_download_in_chunks():
+    """Universo grande e baixado em lotes; lote com falha nao derruba os demais"""
+    import pandas as pd
+    script = _load_download_script()
+    calls = []
+    
+    class ChunkProvider:
+        def fetch_prices(self, tickers, start, end):
+            calls.append(list(tickers))
+            if 'T05' in tickers:
+                raise IOError("timeout")
+            return {t: pd.Series([1.0]) for t in tickers}
+    
+    tickers = [f'T{i:02d}' for i in range(10)]
+    prices = script.fetch_close_prices(ChunkProvider(), tickers, '2020-01-01', '2020-02-01', chunk_size=4)
+    
+    assert [len(c) for c in calls] == [4, 4, 2]
+    assert sorted(prices) == ['T00', 'T01', 'T02', 'T03', 'T08', 'T09']
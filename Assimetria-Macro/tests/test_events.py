@@ -0,0 +1,75 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import events
+
+
+def _loop_events(values, threshold, half_window=20):
+    """Deteccao original: laco por dia com max da janela"""
+    found = []
+    for i in range(half_window, len(values) - half_window):
+        if values.iloc[i] > threshold and values.iloc[i] == values.iloc[i - half_window:i + half_window].max():
+            found.append(values.index[i])
+    return found
+
+
+def test_detect_events_matches_loop():
+    """Maximos locais acima do limiar iguais ao laco por dia, para varias definicoes"""
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range('2018-01-01', periods=800)
+    stress = pd.DataFrame({'S': rng.standard_t(3, 800), 'Z': rng.normal(size=800)}, index=index)
+    stress.iloc[300, 1] = np.nan
+
+    defs = events.definitions(stress, ['S', 'Z'], [1.0, 2.0])
+    found = events.detect_events(stress, defs)
+
+    assert list(defs) == ['S>1sd', 'S>2sd', 'Z>1sd', 'Z>2sd']
+    for name, (column, threshold) in defs.items():
+        expected = _loop_events(stress[column], threshold)
+        assert list(found.loc[found['definition'] == name, 'date']) == expected
+
+
+def test_event_windows_nearest_alignment():
+    """Datas fora do indice vao para a posicao mais proxima; bordas ficam invalidas"""
+    index = pd.bdate_range('2020-01-01', periods=50)
+    series = pd.DataFrame({'A': np.arange(50.0), 'B': np.arange(50.0) ** 2}, index=index)
+    dates = [index[10] + pd.Timedelta(hours=30), index[2], pd.Timestamp('2019-06-01'), index[45]]
+
+    positions, valid, windows = events.event_windows(series, dates, pre=5, post=5)
+
+    np.testing.assert_array_equal(positions, [11, 2, 0, 45])
+    np.testing.assert_array_equal(valid, [True, False, False, False])
+    np.testing.assert_array_equal(windows[0, :, 1], np.arange(6.0, 17.0) ** 2)
+    assert np.isnan(windows[1]).all()
+
+
+def test_event_study_summary():
+    """Variacoes pre/pos e testes t da tabela iguais ao calculo por evento"""
+    rng = np.random.default_rng(1)
+    index = pd.bdate_range('2015-01-01', periods=1200)
+    stress = pd.DataFrame({'STRESS_INDEX': rng.standard_t(3, 1200)}, index=index)
+    series = pd.DataFrame({'RATIO': np.cumsum(rng.normal(size=1200)),
+                           'ETF': np.cumsum(rng.normal(size=1200))}, index=index)
+    defs = events.definitions(stress, ['STRESS_INDEX'], [1.5])
+
+    found, changes, summary = events.event_study(series, stress, defs, pre=60, post=60)
+
+    pre, post = [], []
+    for date in found['date']:
+        k = index.get_loc(date)
+        if k >= 60 and k + 60 < len(index):
+            pre.append(series['RATIO'].iloc[k - 1] - series['RATIO'].iloc[k - 60])
+            post.append(series['RATIO'].iloc[k + 60] - series['RATIO'].iloc[k + 1])
+
+    row = summary[summary['series'] == 'RATIO'].iloc[0]
+    assert row['events'] == len(found) and row['valid_pre'] == len(pre) > 2
+    assert np.isclose(row['mean_pre'], np.mean(pre)) and np.isclose(row['mean_post'], np.mean(post))
+    t_stat, p_value = stats.ttest_1samp(pre, 0)
+    assert np.isclose(row['t_pre'], t_stat) and np.isclose(row['p_pre'], p_value)
+    assert len(changes) == 2 * len(pre)
@@ -0,0 +1,71 @@
+"""
+Testes do motor de features (scripts/features.py)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'scripts'))
+
+import features
+
+
+def _prices():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range('2020-01-01', periods=300)
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (300, 3)), axis=0))
+    return pd.DataFrame(values, index=index, columns=['FXI', 'SPY', 'GLD'])
+
+
+def test_features_match_direct_pandas():
+    """Features vetorizadas reproduzem os calculos coluna a coluna"""
+    prices = _prices()
+    specs = {
+        'LOG': {'op': 'log_return', 'source': 'prices', 'dropna': True},
+        'VOL': {'op': 'rolling_vol', 'source': 'prices', 'window': 30, 'annualize': 252},
+        'Z_VOL': {'op': 'zscore', 'source': 'VOL', 'columns': ['FXI']},
+        'RATIO': {'op': 'ratio', 'source': 'prices', 'num': 'GLD', 'den': 'FXI', 'base': 100},
+        'RATIO_6M': {'op': 'diff', 'source': 'RATIO', 'periods': 126},
+    }
+    engine = features.FeatureEngine({'prices': prices}, specs)
+    
+    pd.testing.assert_frame_equal(engine.feature('LOG'), np.log(prices / prices.shift(1)).dropna())
+    
+    vol_fxi = prices['FXI'].pct_change().rolling(30).std() * (252 ** 0.5)
+    z_vol = (vol_fxi - vol_fxi.mean()) / vol_fxi.std()
+    pd.testing.assert_series_equal(engine.feature('Z_VOL')['FXI'], z_vol)
+    
+    ratio = prices['GLD'] / prices['FXI']
+    ratio = (ratio / ratio.iloc[0]) * 100
+    pd.testing.assert_series_equal(engine.feature('RATIO')['RATIO'], ratio, check_names=False)
+    pd.testing.assert_series_equal(engine.feature('RATIO_6M')['RATIO'], ratio.diff(126), check_names=False)
+
+
+def test_compute_all_skips_unavailable():
+    """Origens ausentes e tickers fora do universo sao ignorados"""
+    specs = {
+        'Z_MACRO': {'op': 'zscore', 'source': 'macro'},
+        'RATIO': {'op': 'ratio', 'source': 'prices', 'num': 'EWZ', 'den': 'SPY'},
+        'LOG': {'op': 'log_return', 'source': 'prices'},
+    }
+    engine = features.FeatureEngine({'prices': _prices(), 'macro': None}, specs)
+    
+    assert list(engine.compute_all()) == ['LOG']
+
+
+def test_pair_ratios_matrix():
+    """Razoes vetorizadas igualam o calculo par a par e ignoram tickers ausentes"""
+    prices = _prices()
+    prices.loc[prices.index[:10], 'GLD'] = np.nan
+    
+    ratios = features.pair_ratios(prices, [('FXI', 'SPY'), ('GLD', 'FXI'), ('EWZ', 'SPY')], base=100)
+    
+    assert list(ratios.columns) == ['FXI/SPY', 'GLD/FXI']
+    expected = prices['FXI'] / prices['SPY']
+    np.testing.assert_allclose(ratios['FXI/SPY'], expected / expected.iloc[0] * 100)
+    # normalizacao pela primeira observacao valida do par
+    assert ratios['GLD/FXI'].iloc[:10].isna().all()
+    assert ratios['GLD/FXI'].iloc[10] == 100
@@ -0,0 +1,203 @@
+"""
+Testes do motor lead-lag (scripts/leadlag.py)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'scripts'))
+
+import leadlag
+
+
+def _lagged_corr(x, y, lag):
+    if lag < 0:
+        return np.corrcoef(x[:lag], y[-lag:])[0, 1]
+    if lag > 0:
+        return np.corrcoef(x[lag:], y[:-lag])[0, 1]
+    return np.corrcoef(x, y)[0, 1]
+
+
+def test_ccf_matches_direct_pearson():
+    """FFT + somas acumuladas reproduzem Pearson de cada trecho sobreposto"""
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame(rng.normal(size=(300, 4)), columns=list('abcd'))
+    data['b'] = data['a'].shift(3) + 0.5 * data['b']
+    data = data.dropna()
+    
+    lags, pairs, ccf = leadlag.cross_correlation_matrix(data, 25)
+    
+    assert ccf.shape == (51, 6)
+    for k, (a, b) in enumerate(pairs):
+        expected = [_lagged_corr(data[a].to_numpy(), data[b].to_numpy(), lag) for lag in lags]
+        np.testing.assert_allclose(ccf[:, k], expected, atol=1e-12)
+    
+    # a precede b em 3 periodos
+    summary = leadlag.summarize_ccf(lags, pairs, ccf)
+    assert summary.iloc[0][['x', 'y', 'peak_lag']].tolist() == ['a', 'b', -3]
+
+
+def test_ccf_single_pair_series():
+    """Interface de um par devolve Series indexada pelo lag"""
+    rng = np.random.default_rng(2)
+    index = pd.date_range('2020-01-31', periods=60, freq='ME')
+    x = pd.Series(rng.normal(size=60), index=index)
+    y = pd.Series(rng.normal(size=60), index=index)
+    
+    ccf = leadlag.cross_correlation(x, y, 6)
+    
+    assert list(ccf.index) == list(range(-6, 7))
+    assert abs(ccf[0] - x.corr(y)) < 1e-12
+    assert abs(ccf[2] - _lagged_corr(x.to_numpy(), y.to_numpy(), 2)) < 1e-12
+
+
+def test_granger_matrix_matches_statsmodels():
+    """Matriz em lote reproduz o ssr_ftest do statsmodels para cada par"""
+    import warnings
+    from statsmodels.tsa.stattools import grangercausalitytests
+    
+    rng = np.random.default_rng(3)
+    data = pd.DataFrame(rng.normal(size=(150, 3)), columns=['a', 'b', 'c'])
+    data['b'] += 0.6 * data['a'].shift(2)
+    data = data.dropna()
+    
+    table = leadlag.granger_matrix(data, 4)
+    
+    assert len(table) == 3 * 2 * 4
+    for cause, effect in [('a', 'b'), ('c', 'a')]:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            expected = grangercausalitytests(data[[effect, cause]], maxlag=4, verbose=False)
+        rows = table[(table['cause'] == cause) & (table['effect'] == effect)]
+        for _, row in rows.iterrows():
+            f_stat, p_value, df_denom, _ = expected[row['lag']][0]['ssr_ftest']
+            assert abs(row['f_stat'] - f_stat) < 1e-9 * max(1, f_stat)
+            assert abs(row['p_value'] - p_value) < 1e-9
+            assert row['df_denom'] == df_denom
+    
+    # a -> b significante no lag 2
+    row = table[(table['cause'] == 'a') & (table['effect'] == 'b') & (table['lag'] == 2)]
+    assert row['p_value'].iloc[0] < 0.01
+    
+    # Apenas a defasagem pedida: mesmas linhas da matriz completa
+    single = leadlag.granger_matrix(data, 4, lags=[3])
+    pd.testing.assert_frame_equal(single, table[table['lag'] == 3].reset_index(drop=True))
+
+
+def test_rolling_var_matches_window_refit():
+    """Atualizacoes recursivas igualam o VAR reestimado na janela"""
+    import warnings
+    from statsmodels.tsa.api import VAR
+    
+    rng = np.random.default_rng(4)
+    index = pd.date_range('2000-01-31', periods=200, freq='ME')
+    data = pd.DataFrame(rng.normal(size=(200, 2)), index=index, columns=['x', 'y'])
+    data['y'] += 0.5 * data['x'].shift(1)
+    data = data.dropna()
+    
+    window, lag = 50, 3
+    model = leadlag.RollingVAR(2, lag, window=window)
+    for x in data.to_numpy():
+        model.update(x)
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        results = VAR(data.iloc[-window - lag:]).fit(lag)
+    
+    np.testing.assert_allclose(model.coefficients(lag), results.params.values, atol=1e-10)
+    np.testing.assert_allclose(model.sigma(lag), results.sigma_u_mle.values, atol=1e-10)
+    np.testing.assert_allclose(model.irf(lag, 5), results.irf(5).irfs, atol=1e-10)
+    
+    f_stat, _ = model.granger(0, 1, lag)
+    assert abs(f_stat - results.test_causality('y', ['x'], kind='f').test_statistic) < 1e-8
+    
+    rolling = leadlag.rolling_leadlag(data, 'x', 'y', lag, window=window)
+    assert len(rolling) == len(data) - lag - window + 1
+    assert (rolling['p_value'] < 0.05).all()
+
+
+def test_bootstrap_irf_bands(tmp_path):
+    """Bandas bootstrap reprodutiveis, independentes do numero de processos"""
+    import warnings
+    from statsmodels.tsa.api import VAR
+    
+    rng = np.random.default_rng(5)
+    index = pd.date_range('2010-01-31', periods=120, freq='ME')
+    data = pd.DataFrame(rng.normal(size=(120, 2)), index=index, columns=['x', 'y'])
+    data['y'] += 0.5 * data['x'].shift(1)
+    data = data.dropna()
+    
+    bands = leadlag.bootstrap_irf(data, 2, horizon=8, replications=600, seed=7)
+    parallel = leadlag.bootstrap_irf(data, 2, horizon=8, replications=600, seed=7, n_jobs=2)
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = VAR(data).fit(2).irf(8).irfs
+    
+    np.testing.assert_allclose(bands['irf'], expected, atol=1e-10)
+    np.testing.assert_array_equal(bands['lower'], parallel['lower'])
+    assert bands['lower'].shape == (9, 2, 2)
+    assert (bands['lower'] <= bands['upper']).all()
+    # resposta de y a x no horizonte 1 e claramente positiva
+    assert bands['lower'][1, 1, 0] > 0
+    
+    path = str(tmp_path / 'bands.npz')
+    leadlag.save_irf_bands(path, bands)
+    loaded = leadlag.load_irf_bands(path)
+    assert loaded['lag'] == 2 and list(loaded['names']) == ['x', 'y']
+    np.testing.assert_array_equal(loaded['upper'], bands['upper'])
+
+
+def test_select_var_order_matches_statsmodels():
+    """Uma unica QR reproduz os criterios de select_order para todas as ordens"""
+    import warnings
+    from statsmodels.tsa.api import VAR
+    
+    rng = np.random.default_rng(6)
+    index = pd.date_range('2005-01-31', periods=160, freq='ME')
+    data = pd.DataFrame(rng.normal(size=(160, 3)), index=index, columns=['x', 'y', 'z'])
+    data['y'] += 0.5 * data['x'].shift(2)
+    data = data.dropna()
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = VAR(data).select_order(8)
+    result = leadlag.select_var_order(data, 8)
+    
+    for criterion in ['aic', 'bic', 'hqic', 'fpe']:
+        np.testing.assert_allclose(result[criterion], expected.ics[criterion], rtol=1e-10)
+        assert result['selected'][criterion] == expected.selected_orders[criterion]
+
+
+def test_surrogates_and_ccf_significance():
+    """IAAFT preserva a distribuicao; lead real tem p-valor baixo e lags vazios nao"""
+    rng = np.random.default_rng(7)
+    x = pd.Series(rng.normal(size=200))
+    y = 0.6 * x.shift(2) + pd.Series(rng.normal(size=200))
+    
+    surrogates = leadlag.iaaft_surrogates(x.to_numpy(), 5, rng)
+    assert surrogates.shape == (5, 200)
+    np.testing.assert_allclose(np.sort(surrogates, axis=1), np.tile(np.sort(x), (5, 1)))
+    
+    phase = leadlag.phase_surrogates(x.to_numpy(), 5, rng)
+    np.testing.assert_allclose(np.abs(np.fft.rfft(phase, axis=1)),
+                               np.tile(np.abs(np.fft.rfft(x)), (5, 1)), atol=1e-8)
+    
+    for method in ['phase', 'iaaft']:
+        table = leadlag.surrogate_ccf_test(x, y, 4, n_surrogates=500, method=method, seed=1)
+        assert list(table.columns) == ['corr', 'lower', 'upper', 'p_value']
+        # x_{t-2} -> y_t: lag -2 no convencao corr(x_{t+L}, y_t)
+        assert table.loc[-2, 'p_value'] < 0.01
+        assert table.loc[-2, 'corr'] > table.loc[-2, 'upper']
+        assert table.drop(-2)['p_value'].min() > 0.01
+        assert table.attrs['p_value_global'] < 0.01
+    
+    # corr e a CCF da amostra aparada usada pelos surrogates (198 -> 192)
+    data = pd.concat([x, y], axis=1).dropna()
+    tail = data.iloc[-table.attrs['n_obs']:]
+    assert table.attrs['n_obs'] == 192
+    pd.testing.assert_series_equal(table['corr'], leadlag.cross_correlation(tail[0], tail[1], 4),
+                                   check_names=False)
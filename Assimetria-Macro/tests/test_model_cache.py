@@ -0,0 +1,108 @@
+"""
+Testes do cache de modelos estimados (scripts/model_cache.py)
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'scripts'))
+
+import model_cache
+
+
+def _data(seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2015-01-31', periods=60, freq='ME')
+    return pd.DataFrame(rng.normal(size=(60, 2)), index=index, columns=['a', 'b'])
+
+
+def test_cache_hit_and_roundtrip(tmp_path):
+    """Segunda chamada com mesmos dados/parametros nao recalcula"""
+    cache = model_cache.ModelCache(directory=str(tmp_path), max_bytes=10 ** 7, enabled=True)
+    data = _data()
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        return {'lag': 3, 'params': np.arange(6.0).reshape(3, 2), 'names': np.array(['a', 'b'])}
+    
+    first, hit_first = cache.get_or_compute('var', data, {'max_lag': 6}, compute)
+    second, hit_second = cache.get_or_compute('var', data, {'max_lag': 6}, compute)
+    
+    assert (hit_first, hit_second) == (False, True)
+    assert len(calls) == 1
+    assert second['lag'] == 3 and list(second['names']) == ['a', 'b']
+    np.testing.assert_array_equal(second['params'], first['params'])
+    
+    # Dados ou parametros diferentes geram outra chave
+    cache.get_or_compute('var', data, {'max_lag': 4}, compute)
+    changed = data.copy()
+    changed.iloc[0, 0] += 1e-9
+    cache.get_or_compute('var', changed, {'max_lag': 6}, compute)
+    assert len(calls) == 3
+
+
+def test_cache_dataframe_results(tmp_path):
+    """Tabelas (texto, inteiros, indice de datas) voltam identicas"""
+    cache = model_cache.ModelCache(directory=str(tmp_path), max_bytes=10 ** 7, enabled=True)
+    table = pd.DataFrame({'cause': ['a', 'b'], 'lag': [1, 2], 'p_value': [0.01, 0.5]},
+                         index=pd.date_range('2020-01-31', periods=2, freq='ME', name='date'))
+    
+    cache.get_or_compute('granger', _data(), {}, lambda: table)
+    cached, hit = cache.get_or_compute('granger', _data(), {}, lambda: None)
+    
+    assert hit
+    pd.testing.assert_frame_equal(cached, table, check_freq=False)
+
+
+def test_cache_lru_eviction(tmp_path):
+    """Entradas menos usadas recentemente saem quando o limite e excedido"""
+    payload = {'values': np.zeros(2000)}
+    size = 16_000 + 1_000
+    cache = model_cache.ModelCache(directory=str(tmp_path), max_bytes=int(2.5 * size), enabled=True)
+    
+    keys = [cache.key('var', _data(seed), {}) for seed in range(3)]
+    cache.put(keys[0], payload)
+    time.sleep(0.01)
+    cache.put(keys[1], payload)
+    time.sleep(0.01)
+    cache.get(keys[0])
+    time.sleep(0.01)
+    cache.put(keys[2], payload)
+    
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+
+
+def test_cache_shared_by_processes(tmp_path):
+    """Instancias independentes (tarefas paralelas) somam no mesmo limite LRU"""
+    payload = {'values': np.zeros(2000)}
+    size = 16_000 + 1_000
+    writers = [model_cache.ModelCache(directory=str(tmp_path), max_bytes=int(2.5 * size), enabled=True)
+               for _ in range(3)]
+    
+    keys = [writers[0].key('var', _data(seed), {}) for seed in range(3)]
+    for writer, key in zip(writers, keys):
+        writer.put(key, payload)
+        time.sleep(0.01)
+    
+    assert not os.path.exists(os.path.join(tmp_path, 'index.json'))
+    assert writers[2].get(keys[0]) is None
+    assert all(writer.get(key) is not None for writer, key in zip(writers[1:], keys[1:]))
+
+
+def test_cache_batch_roundtrip(tmp_path):
+    """get_many/put_many: so as chaves presentes voltam"""
+    cache = model_cache.ModelCache(directory=str(tmp_path), max_bytes=10 ** 7, enabled=True)
+    keys = [cache.key('adf', _data(seed), {}) for seed in range(3)]
+    
+    cache.put_many({keys[0]: {'stat': 1.5}, keys[1]: {'stat': -2.0}})
+    found = cache.get_many(keys)
+    
+    assert sorted(found) == sorted(keys[:2])
+    assert found[keys[1]]['stat'] == -2.0
@@ -0,0 +1,65 @@
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import resampling
+
+
+def test_block_resamples():
+    """Permutacoes em blocos sao permutacoes de blocos contiguos; bootstrap conserva T"""
+    rng = np.random.default_rng(0)
+    n, block = 23, 5
+
+    indices = resampling.block_permutations(n, block, 50, rng)
+    assert (np.sort(indices, axis=1) == np.arange(n)).all()
+    breaks = (np.diff(indices, axis=1) % n) != 1
+    assert (breaks.sum(axis=1) <= -(-n // block) - 1).all()
+
+    counts = resampling.block_bootstrap_counts(n, block, 50, rng)
+    assert (counts.sum(axis=1) == n).all()
+
+
+def test_regime_tests_table():
+    """Medias, teste t e reprodutibilidade por semente independente de n_jobs"""
+    rng = np.random.default_rng(1)
+    index = pd.bdate_range('2016-01-01', periods=600)
+    stress = pd.Series(rng.normal(size=600), index=index)
+    values = pd.Series(np.convolve(rng.normal(size=629), np.ones(30) / 30, 'valid'), index=index) + 0.05 * stress
+    values.iloc[:20] = np.nan
+
+    table = resampling.regime_tests(values, stress, [0.1, 0.25], block=30, n_resamples=400, seed=7,
+                                    chunk_size=100)
+    parallel = resampling.regime_tests(values, stress, [0.1, 0.25], block=30, n_resamples=400, seed=7,
+                                       n_jobs=2, chunk_size=100)
+    pd.testing.assert_frame_equal(table, parallel)
+
+    row = table.iloc[1]
+    high = values[stress > stress.quantile(0.75)].dropna()
+    low = values[stress < stress.quantile(0.25)].dropna()
+    assert row['n_high'] == len(high) and row['n_low'] == len(low)
+    assert np.isclose(row['diff'], high.mean() - low.mean())
+    assert np.isclose(row['p_ttest'], stats.ttest_ind(high, low).pvalue)
+    assert row['ci_low'] < row['diff'] < row['ci_high']
+    assert 1 / 401 <= row['p_permutation'] <= 1
+
+
+def test_empty_regime():
+    """Quantil sem observacoes em um regime: diferenca e p-valores NaN"""
+    rng = np.random.default_rng(2)
+    index = pd.bdate_range('2016-01-01', periods=300)
+    stress = pd.Series(np.r_[np.zeros(250), rng.uniform(1, 2, 50)], index=index)
+    values = pd.Series(rng.normal(size=300), index=index)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        table = resampling.regime_tests(values, stress, [0.25], block=10, n_resamples=200, seed=1)
+
+    row = table.iloc[0]
+    assert row['n_low'] == 0 and row['n_high'] > 0
+    assert np.isnan(row['diff']) and np.isnan(row['p_permutation']) and np.isnan(row['p_bootstrap'])
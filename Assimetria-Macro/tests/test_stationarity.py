@@ -0,0 +1,63 @@
+"""
+Testes de estacionariedade em lote (scripts/stationarity.py)
+"""
+
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'scripts'))
+
+import stationarity
+from model_cache import ModelCache
+
+
+def test_adf_matches_statsmodels():
+    """Uma QR por serie reproduz adfuller (estatistica, p-valor, lag, nobs)"""
+    from statsmodels.tsa.stattools import adfuller
+    
+    rng = np.random.default_rng(0)
+    for regression in ['c', 'ct', 'n']:
+        for autolag in ['aic', 'bic', None]:
+            x = np.cumsum(rng.normal(size=150)) + rng.normal(size=150)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                expected = adfuller(x, regression=regression,
+                                    autolag=autolag.upper() if autolag else None)
+            stat, p_value, lag, nobs = stationarity.adf_test(x, regression=regression, autolag=autolag)
+            
+            np.testing.assert_allclose([stat, p_value], expected[:2], rtol=1e-8)
+            assert (lag, nobs) == expected[2:4]
+
+
+def test_table_cache_and_auto_difference(tmp_path):
+    """Tabela por serie, cache pelo conteudo da serie e diferenciacao automatica"""
+    rng = np.random.default_rng(1)
+    index = pd.date_range('2010-01-31', periods=200, freq='ME')
+    data = pd.DataFrame({'walk': np.cumsum(rng.normal(size=200)),
+                         'noise': rng.normal(size=200),
+                         'flat': np.ones(200)}, index=index)
+    cache = ModelCache(directory=str(tmp_path), enabled=True)
+    batches = []
+    cache._evict = lambda: batches.append(1)
+    
+    table = stationarity.stationarity_table(data, maxlags=(None, 4), cache=cache)
+    assert len(batches) == 1  # uma gravacao em lote para as 6 (serie, maxlag)
+    assert len(table) == 6
+    rows = table.set_index(['series', 'maxlag'])
+    assert rows.loc[('walk', 4), 'needs_diff'] and not rows.loc[('noise', 4), 'needs_diff']
+    assert rows.loc[('flat', 4), 'decision'] == 'invalid'
+    
+    # mesma serie com outro nome reaproveita o cache
+    renamed = stationarity.stationarity_table(data[['walk']].rename(columns={'walk': 'copy'}),
+                                              maxlags=(None, 4), cache=cache)
+    entries = len(ModelCache(directory=str(tmp_path))._entries())
+    assert entries == 6
+    np.testing.assert_allclose(renamed['adf_stat'], table.loc[table['series'] == 'walk', 'adf_stat'])
+    
+    transformed, summary = stationarity.auto_difference(data[['walk', 'noise']], max_diff=2)
+    assert summary.set_index('series')['diff_order'].to_dict() == {'walk': 1, 'noise': 0}
+    np.testing.assert_allclose(transformed['walk'], data['walk'].diff().dropna())
@@ -0,0 +1,157 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from streaming import RollingWindow
+
+
+def test_rolling_window_matches_pandas():
+    """Somas moveis reproduzem rolling().std()/corr() do pandas, inclusive com NaN"""
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.normal(size=(200, 3)), columns=['a', 'b', 'c'])
+    data.iloc[50, 1] = np.nan
+
+    window = RollingWindow(20, 3)
+    for t, row in enumerate(data.to_numpy()):
+        window.push(row)
+        if t in (10, 60, 80, 199):
+            np.testing.assert_allclose(window.std(), data.rolling(20).std().iloc[t], rtol=1e-10)
+            expected = data['a'].rolling(20).corr(data['b']).iloc[t]
+            np.testing.assert_allclose(window.corr()[0, 1], expected, rtol=1e-10)
+
+    restored = RollingWindow.from_state(window.to_state('w'), 'w')
+    np.testing.assert_allclose(restored.corr(), window.corr())
+
+
+def _write_raw(prices, vol, macro=None):
+    prices.to_csv('data/raw/etf_prices.csv')
+    vol.to_csv('data/raw/volatility_proxy.csv')
+    if macro is not None:
+        macro.to_csv('data/raw/macro_indicators.csv')
+
+
+def _batch(process, sync):
+    process.compute_features()
+    process.aggregate_frequencies()
+    sync.calculate_rolling_correlation()
+    sync.calculate_absorption_ratio()
+
+
+def _read(name):
+    return pd.read_csv(f'data/processed/{name}.csv', index_col=0, parse_dates=True)
+
+
+@pytest.mark.parametrize('sync_mode', ['rolling', 'ewma'])
+def test_update_matches_batch(tmp_path, monkeypatch, sync_mode):
+    """Dias anexados pelo modo --update coincidem com o processamento completo"""
+    import importlib
+
+    process = importlib.import_module('01_process_data')
+    sync = importlib.import_module('03_synchronization')
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('ARTIFACT_FORMAT', 'csv')
+    monkeypatch.setenv('ROLLING_WINDOW', '20')
+    monkeypatch.setenv('SYNC_MODE', sync_mode)
+    monkeypatch.setenv('SYNC_HALF_LIVES', '10,25')
+    os.makedirs('data/raw')
+    os.makedirs('data/processed')
+
+    rng = np.random.default_rng(1)
+    index = pd.bdate_range('2020-01-01', periods=260, name='Date')
+    tickers = ['FXI', 'MCHI', 'KWEB', 'GLD', 'SPY', 'TLT']
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (260, 6)), axis=0)),
+                          index=index, columns=tickers)
+    vol = pd.DataFrame({'VOL_FXI': rng.uniform(0.1, 0.3, 260), 'VOL_SPY': rng.uniform(0.1, 0.3, 260)},
+                       index=index)
+    vol['VOL_RATIO'] = vol['VOL_FXI'] / vol['VOL_SPY']
+
+    _write_raw(prices.iloc[:-2], vol.iloc[:-2])
+    _batch(process, sync)
+
+    streamed = {}
+    for end in (-1, None):
+        _write_raw(prices.iloc[:end], vol.iloc[:end])
+        process.update_indices()
+        streamed = {name: _read(name) for name in
+                    ('etf_returns', 'synchronization_index', 'absorption_ratio', 'pair_ratios',
+                     'stress_index', 'monthly_data')}
+
+        os.rename('data/processed/stream_state.npz', 'state.npz')
+        _batch(process, sync)
+        os.rename('state.npz', 'data/processed/stream_state.npz')
+
+        for name in ('etf_returns', 'synchronization_index', 'absorption_ratio', 'pair_ratios'):
+            pd.testing.assert_frame_equal(streamed[name], _read(name), check_freq=False, rtol=1e-9)
+
+        # Dia novo usa os momentos da amostra inteira ate ele, como o batch
+        # (variacoes mensais dependem do mes anterior, renormalizado no batch)
+        pd.testing.assert_series_equal(streamed['stress_index'].iloc[-1], _read('stress_index').iloc[-1],
+                                       rtol=1e-9)
+        levels = ['STRESS_INDEX', 'EXPOSURE_RATIO', 'DEFENSIVE_RATIO']
+        pd.testing.assert_series_equal(streamed['monthly_data'][levels].iloc[-1],
+                                       _read('monthly_data')[levels].iloc[-1], rtol=1e-9)
+
+        # Restaura os artefatos do modo incremental para a proxima rodada
+        for name, frame in streamed.items():
+            frame.to_csv(f'data/processed/{name}.csv')
+
+    assert len(streamed['stress_index']) == 260
+
+
+@pytest.mark.parametrize('macro_offset', [2, -2])
+def test_update_with_offset_calendars(tmp_path, monkeypatch, macro_offset):
+    """Macro adiantado nao pula dias de precos; macro atrasado entra nas linhas ja gravadas"""
+    import importlib
+
+    process = importlib.import_module('01_process_data')
+    sync = importlib.import_module('03_synchronization')
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('ARTIFACT_FORMAT', 'csv')
+    monkeypatch.setenv('ROLLING_WINDOW', '20')
+    os.makedirs('data/raw')
+    os.makedirs('data/processed')
+
+    rng = np.random.default_rng(2)
+    index = pd.bdate_range('2020-01-01', periods=260, name='Date')
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (260, 6)), axis=0)),
+                          index=index, columns=['FXI', 'MCHI', 'KWEB', 'GLD', 'SPY', 'TLT'])
+    vol = pd.DataFrame({'VOL_FXI': rng.uniform(0.1, 0.3, 260), 'VOL_SPY': rng.uniform(0.1, 0.3, 260)},
+                       index=index)
+    vol['VOL_RATIO'] = vol['VOL_FXI'] / vol['VOL_SPY']
+    macro = pd.DataFrame({'VIX': rng.uniform(12, 30, 260), 'DXY': rng.normal(100, 2, 260)}, index=index)
+
+    # Lote com precos ate -4 e macro `macro_offset` dias adiante (ou atras)
+    _write_raw(prices.iloc[:-4], vol.iloc[:-4], macro.iloc[:-4 + macro_offset])
+    _batch(process, sync)
+
+    _write_raw(prices, vol, macro)
+    process.update_indices()
+    streamed = {name: _read(name) for name in ('etf_returns', 'synchronization_index', 'stress_index',
+                                               'monthly_data', 'daily_data')}
+
+    # Reexecucao sem dados novos regrava a cauda com os mesmos valores
+    process.update_indices()
+    for name, frame in streamed.items():
+        pd.testing.assert_frame_equal(_read(name), frame)
+
+    os.remove('data/processed/stream_state.npz')
+    _batch(process, sync)
+
+    for name in ('etf_returns', 'synchronization_index'):
+        pd.testing.assert_frame_equal(streamed[name], _read(name), check_freq=False, rtol=1e-9)
+
+    stress = _read('stress_index')
+    assert streamed['stress_index'].index.equals(stress.index)
+    pd.testing.assert_frame_equal(streamed['stress_index'].notna(), stress.notna())
+    pd.testing.assert_series_equal(streamed['stress_index'].iloc[-1], stress.iloc[-1], rtol=1e-9)
+    assert streamed['daily_data'].index.equals(_read('daily_data').index)
+    levels = ['STRESS_INDEX', 'EXPOSURE_RATIO', 'DEFENSIVE_RATIO']
+    pd.testing.assert_series_equal(streamed['monthly_data'][levels].iloc[-1],
+                                   _read('monthly_data')[levels].iloc[-1], rtol=1e-9)
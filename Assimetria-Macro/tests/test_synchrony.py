@@ -0,0 +1,166 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import synchrony
+
+
+def _random_returns(n_obs=300, n=5, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = [f'ETF{i}' for i in range(n)]
+    data = pd.DataFrame(rng.normal(0.001, 0.01, (n_obs, n)) + rng.normal(0, 0.01, (n_obs, 1)),
+                        columns=columns)
+    data.iloc[100, 2] = np.nan
+    data.iloc[180:200, 3] = np.nan
+    return data
+
+
+def _factor_returns(n_obs, n, seed):
+    """Mercado, tres setores e ruido idiossincratico heterogeneo"""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(size=(n_obs, 1)) @ rng.uniform(0.3, 1.2, (1, n))
+    sectors = rng.normal(size=(n_obs, 3)) @ rng.normal(scale=0.4, size=(3, n))
+    noise = rng.normal(size=(n_obs, n)) * rng.uniform(0.5, 2.0, n)
+    return pd.DataFrame(0.01 * (market + sectors + noise))
+
+
+def test_rolling_tensor_matches_pandas():
+    """Pares do tensor e SYNC_INDEX iguais ao rolling().corr() par a par do pandas"""
+    data = _random_returns()
+    window = 30
+
+    expected = {}
+    columns = list(data.columns)
+    for i, a in enumerate(columns):
+        for b in columns[i + 1:]:
+            expected[f'{a}_{b}'] = data[a].rolling(window).corr(data[b])
+    expected = pd.DataFrame(expected)
+    expected['SYNC_INDEX'] = expected.mean(axis=1)
+
+    result = synchrony.sync_index(data, window)
+
+    pd.testing.assert_frame_equal(result, expected, rtol=1e-9)
+
+
+def test_mean_correlation_without_tensor():
+    """Modo so-indice reproduz a media dos pares do tensor completo"""
+    data = _random_returns(n=40, seed=1)
+    window = 25
+
+    tensor = synchrony.rolling_correlation_tensor(data.to_numpy(), window)
+    upper = np.triu_indices(data.shape[1], 1)
+    expected = pd.DataFrame(tensor[:, upper[0], upper[1]]).mean(axis=1).to_numpy()
+
+    mean = synchrony.rolling_mean_correlation(data.to_numpy(), window, chunk_bytes=4096)
+
+    np.testing.assert_allclose(mean, expected, rtol=1e-9, atol=1e-12)
+    assert np.isnan(mean[:window - 1]).all()
+
+    index_only = synchrony.sync_index(data, window, pair_columns=False)
+    assert list(index_only.columns) == ['SYNC_INDEX']
+
+
+def test_absorption_ratio_warm_start():
+    """k dentro dos autovalores separados: partida a quente certificada e
+    estado gravado retoma o feed"""
+    from streaming import RollingWindow
+
+    data = _factor_returns(400, 120, seed=2)
+    window = 150
+
+    warm, tracker = synchrony.absorption_ratio(data, window, fraction=0.01, tol=1e-8)
+    exact, _ = synchrony.absorption_ratio(data, window, fraction=0.01, solver='eigh')
+
+    pd.testing.assert_frame_equal(warm, exact, rtol=0, atol=1e-8)
+    assert tracker.exact < len(data) // 20 and tracker.approximated == 0
+
+    eigenvalues = np.linalg.eigvalsh(data.iloc[-window:].corr().to_numpy())[::-1]
+    assert np.isclose(exact['EIGEN_SHARE'].iloc[-1], eigenvalues[0] / 120)
+    assert np.isclose(exact['ABSORPTION_RATIO'].iloc[-1], eigenvalues[0] / 120)
+
+    rolling = RollingWindow(window, 120, cross=False)
+    head = synchrony.AbsorptionTracker(0.01, tol=1e-8)
+    values = data.to_numpy()
+    for row in values[:300]:
+        rolling.push(row)
+        if rolling.ready:
+            head.update(rolling)
+    resumed = synchrony.AbsorptionTracker.from_state(head.to_state('absorption'), 'absorption')
+    for t in range(300, len(values)):
+        rolling.push(values[t])
+        np.testing.assert_allclose(resumed.update(rolling), exact.iloc[t], rtol=0, atol=1e-8)
+    assert resumed.exact == 0
+
+
+def test_absorption_ratio_default_speedup():
+    """Padroes (k = 20% de 300 ETFs, janela de 250 dias): lideres a quente e
+    cauda do ruido pela fracao do ultimo dia exato, varias vezes mais rapido
+    que eigh com erro medio da razao abaixo de tol"""
+    import time
+
+    data = _factor_returns(750, 300, seed=5)
+    window = 250
+
+    start = time.perf_counter()
+    exact, _ = synchrony.absorption_ratio(data, window, solver='eigh')
+    elapsed_exact = time.perf_counter() - start
+    start = time.perf_counter()
+    warm, tracker = synchrony.absorption_ratio(data, window)
+    elapsed_warm = time.perf_counter() - start
+
+    windows = len(data) - window + 1
+    error = (warm - exact).abs().dropna()
+    assert tracker.leading == 4 and tracker.approximated > 0.9 * windows
+    assert error['ABSORPTION_RATIO'].mean() < tracker.tol
+    assert error['ABSORPTION_RATIO'].max() < 5 * tracker.tol
+    assert error['EIGEN_SHARE'].max() < tracker.LEADING_SHARE * tracker.tol
+    # ~7x medido; margem para maquinas carregadas
+    assert elapsed_exact > 3 * elapsed_warm
+
+
+def test_absorption_ratio_covariance_and_noise():
+    """Covariancia igual aos autovalores do numpy; sem autovalor separado do
+    ruido todo dia e exato"""
+    data = _factor_returns(300, 120, seed=6)
+    window = 150
+
+    cov, _ = synchrony.absorption_ratio(data, window, matrix='cov')
+    eigenvalues = np.linalg.eigvalsh(data.iloc[-window:].cov().to_numpy())[::-1]
+    assert np.isclose(cov['EIGEN_SHARE'].iloc[-1], eigenvalues[0] / eigenvalues.sum())
+    assert abs(cov['ABSORPTION_RATIO'].iloc[-1] - eigenvalues[:24].sum() / eigenvalues.sum()) < 5e-3
+
+    noise = pd.DataFrame(np.random.default_rng(7).normal(size=(300, 120)))
+    warm, tracker = synchrony.absorption_ratio(noise, window)
+    exact, _ = synchrony.absorption_ratio(noise, window, solver='eigh')
+    pd.testing.assert_frame_equal(warm, exact, rtol=1e-12)
+    assert tracker.exact == len(noise) - window + 1 and tracker.iterations == 0
+
+
+def test_ewma_matches_pandas_and_resumes():
+    """Modo EWMA igual ao ewm().corr() do pandas; estado gravado retoma o feed"""
+    data = _random_returns(n=4, seed=3).dropna()
+    half_lives = [10, 45]
+
+    result, _ = synchrony.ewma_sync_index(data, half_lives)
+
+    columns = list(data.columns)
+    for h in half_lives:
+        expected = {}
+        for i, a in enumerate(columns):
+            for b in columns[i + 1:]:
+                expected[f'{a}_{b}'] = data[a].ewm(halflife=h, min_periods=h).corr(data[b])
+        expected = pd.DataFrame(expected)
+        np.testing.assert_allclose(result[f'SYNC_INDEX_HL{h}'], expected.mean(axis=1), rtol=1e-9)
+        if h == half_lives[0]:
+            np.testing.assert_allclose(result[expected.columns], expected, rtol=1e-9)
+            np.testing.assert_allclose(result['SYNC_INDEX'], expected.mean(axis=1), rtol=1e-9)
+
+    head, tracker = synchrony.ewma_sync_index(data.iloc[:150], half_lives)
+    resumed = synchrony.EwmaCorrelation.from_state(tracker.to_state('ewma'), 'ewma')
+    for row in data.iloc[150:].to_numpy():
+        resumed.update(row)
+    np.testing.assert_allclose(resumed.row(), result.iloc[-1], rtol=1e-12)